@@ -1,6 +1,16 @@
+import os
 import dash
+import diskcache
+from dash.long_callback import DiskcacheLongCallbackManager
 
-app = dash.Dash(__name__, suppress_callback_exceptions=True)
+# QC runs are executed as background jobs, their progress and result are kept in this disk cache (QC_JOBS_CACHE_PATH to change it)
+try :
+    jobs_cache_path = os.environ['QC_JOBS_CACHE_PATH']
+except :
+    jobs_cache_path = "cache/jobs"
+long_callback_manager = DiskcacheLongCallbackManager(diskcache.Cache(jobs_cache_path))
+
+app = dash.Dash(__name__, suppress_callback_exceptions=True, long_callback_manager=long_callback_manager)
 app.title = "Quality checks"
 app._favicon = ("favicon.png")
 server = app.server
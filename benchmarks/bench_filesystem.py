@@ -0,0 +1,164 @@
+"""Compare the filesystem indexer of localData.getFileSystem with the previous os.listdir/os.stat implementation.
+
+Usage (from the repository root) :
+    python -m benchmarks.bench_filesystem                          # synthetic project of 300 scans
+    python -m benchmarks.bench_filesystem --scans 2000 --vignettes 200
+    python -m benchmarks.bench_filesystem --project zooscan_lov/Zooscan_xxx   # real project, relative to localData.base_path
+"""
+import argparse
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from zipfile import ZipFile, BadZipFile
+from unittest import mock
+
+import pandas as pd
+
+import labels
+import localData
+from benchmarks.synthetic_project import make_project
+
+
+def legacy_folderstats(folderpath, items=None, depth=0, idx=1):
+    """Reference implementation : previous localData._recursive_folderstats, kept to measure the new indexer against it."""
+    items = items if items is not None else []
+    foldersize, num_files = 0, 0
+
+    if os.access(folderpath, os.R_OK):
+        dirs = list(filter(lambda x: "DS_Store" not in x, os.listdir(folderpath)))
+        for f in dirs:
+            filepath = os.path.join(folderpath, f)
+            stats = os.stat(filepath)
+            foldersize += stats.st_size
+            idx += 1
+
+            if os.path.isdir(filepath):
+                idx, items, _foldersize, _num_files = legacy_folderstats(filepath, items, depth + 1, idx)
+                foldersize += _foldersize
+                num_files += _num_files
+            else:
+                filename, extension = os.path.splitext(f)
+                extension = extension[1:] if extension else None
+                inside_name = "None"
+                try:
+                    inside_name = ZipFile(filepath, 'r').namelist() if extension == "zip" else "None"
+                    inside_name = inside_name[0] if inside_name else "None"
+                except BadZipFile:
+                    inside_name = labels.errors["global.bad_zip_file"]
+                items.append([idx, filepath, filename, extension, stats.st_size, False, None, depth, inside_name])
+                num_files += 1
+
+    os.stat(folderpath)
+    return idx, items, foldersize, num_files
+
+
+def legacy_get_file_system(subpath):
+    columns = ['id', 'path', 'name', 'extension', 'size', 'folder', 'num_files', 'depth', "inside_name"]
+    idx, items, foldersize, num_files = legacy_folderstats(localData.base_path + subpath)
+    return pd.DataFrame(items, columns=columns)
+
+
+class _CountingEntry:
+    """os.DirEntry proxy counting the stat() calls that are not served by the DirEntry cache"""
+
+    def __init__(self, entry, counter):
+        self._entry = entry
+        self._counter = counter
+        self._stat = None
+        self.name = entry.name
+        self.path = entry.path
+
+    def stat(self, **kwargs):
+        if self._stat is None:
+            self._counter["DirEntry.stat"] += 1
+            self._stat = self._entry.stat(**kwargs)
+        return self._stat
+
+    def is_dir(self, **kwargs):
+        return self._entry.is_dir(**kwargs)
+
+    def is_file(self, **kwargs):
+        return self._entry.is_file(**kwargs)
+
+
+@contextmanager
+def count_fs_calls():
+    """Count the filesystem calls issued from python (listdir, scandir, stat, access, zip opening) while in the context"""
+    counter = {"os.listdir": 0, "os.scandir": 0, "os.stat": 0, "os.access": 0, "DirEntry.stat": 0, "zip open": 0}
+    real_listdir, real_scandir, real_stat, real_access = os.listdir, os.scandir, os.stat, os.access
+    real_zip_init = ZipFile.__init__
+
+    def listdir(*args, **kwargs):
+        counter["os.listdir"] += 1
+        return real_listdir(*args, **kwargs)
+
+    def scandir(*args, **kwargs):
+        counter["os.scandir"] += 1
+        return [_CountingEntry(e, counter) for e in real_scandir(*args, **kwargs)]
+
+    def stat(*args, **kwargs):
+        counter["os.stat"] += 1
+        return real_stat(*args, **kwargs)
+
+    def access(*args, **kwargs):
+        counter["os.access"] += 1
+        return real_access(*args, **kwargs)
+
+    def zip_init(self, *args, **kwargs):
+        counter["zip open"] += 1
+        return real_zip_init(self, *args, **kwargs)
+
+    with mock.patch("os.listdir", listdir), mock.patch("os.scandir", scandir), mock.patch("os.stat", stat), \
+         mock.patch("os.access", access), mock.patch.object(ZipFile, "__init__", zip_init):
+        yield counter
+
+
+def run(name, fct, subpath, repeat):
+    with count_fs_calls() as counter:
+        df = fct(subpath)
+    durations = []
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        fct(subpath)
+        durations.append(time.perf_counter() - start_time)
+    calls = {k: v for k, v in counter.items() if v}
+    print("{:<10} files : {:>7}   best of {} : {:8.4f} s   fs calls : {:>8}  {}".format(
+        name, len(df), repeat, min(durations), sum(calls.values()), calls))
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--project", help="project subpath relative to localData.base_path, a synthetic project is generated if not given")
+    parser.add_argument("--scans", type=int, default=300, help="number of scans of the synthetic project")
+    parser.add_argument("--vignettes", type=int, default=50, help="number of vignettes by scan of the synthetic project")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.project:
+            subpath = args.project
+        else:
+            localData.base_path = tmp + "/"
+            subpath = "Zooscan_synthetic"
+            make_project(os.path.join(tmp, subpath), args.scans, nb_vignettes=args.vignettes)
+
+        legacy = run("legacy", legacy_get_file_system, subpath, args.repeat)
+        current = run("scandir", localData.getFileSystem, subpath, args.repeat)
+        # zip files are only opened when a check asks for their inside_name, and never reopened while unchanged
+        for run_nb in (1, 2):
+            with count_fs_calls() as counter:
+                inside_name = localData.getInsideName(current)
+            print("inside_name resolution on demand, run {} : {} zip opened".format(run_nb, counter["zip open"]))
+
+        # the previous indexer stored "N" (first letter of "None") as inside_name of the files that are not zip
+        zip_files = legacy["extension"] == "zip"
+        columns = [c for c in legacy.columns if c != "inside_name"]
+        assert legacy[columns].equals(current[columns]) \
+            and legacy.loc[zip_files, "inside_name"].equals(inside_name[zip_files]), "the two indexers do not return the same fs dataframe"
+        print("fs dataframes are identical")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Compare the rendering of the result tables of a pdf report with their previous implementation,
+splitting eatch cell with multi_cell to measure it and again to write it.
+
+The tables are made of the labels of the checks, one row by scan.
+The report fonts (assets/fonts) are used if they are installed, else the helvetica core font.
+
+Usage (from the repository root) :
+    python -m benchmarks.bench_pdf_report                          # 2000 scans
+    python -m benchmarks.bench_pdf_report --scans 500 --repeat 5
+"""
+import argparse
+import os
+import random
+import time
+from unittest import mock
+
+import pandas as pd
+from fpdf import FPDF
+
+import labels
+import pdf_generator
+
+FONTS_PATH = "assets/fonts/Arial-Unicode-Regular.ttf"
+NB_CHECKS = 8
+
+
+def legacy_write_multiline_datatable(pdf, df):
+    """Reference implementation : previous pdf_generator.write_multiline_datatable and write_multiline_row"""
+    col_width = pdf.epw / 10
+    pdf.ln(pdf.font_size * 1.5 * pdf_generator.SPACING)
+    pdf_generator.write_multiline_row_headers(df.head(), pdf, col_width)
+    for i in df.index:
+        row = []
+        for index in df.head():
+            if index != "index":
+                row.append(str(df[index][i]))
+        pdf_generator.set_font_size(pdf, '', 10)
+        line_height = pdf.font_size * 1.5
+        pdf.set_text_color(51, 51, 51)
+        legacy_write_multiline_row(row, pdf, line_height, col_width)
+
+
+def legacy_write_multiline_row(row, pdf, line_height, col_width):
+    row_height_lines = 1
+    lines_in_row = []
+    for datum in row:
+        output = pdf.multi_cell(col_width, line_height, datum, border=1, ln=3, split_only=True)
+        lines_in_row.append(len(output))
+        if len(output) > row_height_lines:
+            row_height_lines = len(output)
+    if pdf.will_page_break(row_height_lines * line_height):
+        pdf.add_page()
+    for tlines, datum in zip(lines_in_row, row):
+        text = datum.rstrip('\n') + (1 + row_height_lines - tlines) * '\n'
+        if text.startswith("#"):
+            pdf.set_text_color(237, 67, 55)
+            pdf.multi_cell(col_width, line_height, text, border=1, ln=3)
+            pdf.set_text_color(51, 51, 51)
+        else:
+            pdf.multi_cell(col_width, line_height, text, border=1, ln=3)
+    pdf.ln(row_height_lines * line_height)
+
+
+def make_table(nb_scans, seed):
+    """Return a result table of nb_scans scans, made of the labels of the checks"""
+    rnd = random.Random(seed)
+    texts = [label for label in list(labels.errors.values()) + list(labels.sucess.values()) if isinstance(label, str)] + ["0.0847", "1000", "999999", "4"]
+    table = {"List scan ID": ["smp" + str(i // 3).zfill(5) + "_d" + str(i % 3 + 1) + "_1" for i in range(nb_scans)]}
+    for i in range(NB_CHECKS):
+        table["check " + str(i + 1)] = [rnd.choice(texts) for j in range(nb_scans)]
+    return pd.DataFrame(table)
+
+
+def new_pdf(core_font):
+    if core_font:
+        pdf = FPDF('L', 'mm', 'A4')
+        pdf.set_font('helvetica', '', 12)
+        pdf.add_page()
+        return pdf
+    return pdf_generator.create_pdf_report_for_project("benchmark")
+
+
+def run(name, fct, df, core_font, repeat):
+    durations = []
+    for i in range(repeat):
+        pdf = new_pdf(core_font)
+        start_time = time.perf_counter()
+        fct(pdf, df)
+        durations.append(time.perf_counter() - start_time)
+    print("{:<10} rows : {:>6}   pages : {:>4}   best of {} : {:8.4f} s".format(name, len(df), pdf.page, repeat, min(durations)))
+    return pdf.page, min(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scans", type=int, default=2000, help="number of rows of the table")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    df = make_table(args.scans, args.seed)
+    core_font = not os.path.exists(FONTS_PATH)
+    if core_font:
+        print("{} not found : helvetica core font used, labels out of latin-1 are replaced".format(FONTS_PATH))
+        df = df.applymap(lambda text: text.encode("latin-1", "replace").decode("latin-1"))
+
+    with mock.patch.object(pdf_generator, "set_font_size", (lambda pdf, weight, size: pdf.set_font('helvetica', weight, size)) if core_font else pdf_generator.set_font_size):
+        legacy_pages, legacy_duration = run("legacy", legacy_write_multiline_datatable, df.reset_index(), core_font, args.repeat)
+        current_pages, current_duration = run("current", pdf_generator.write_multiline_datatable, df, core_font, args.repeat)
+    assert legacy_pages == current_pages, "write_multiline_datatable does not write the same number of pages as the previous implementation"
+    print("same number of pages, speedup x{:.1f}".format(legacy_duration / current_duration))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Compare check_raw_files and check_process_post_scan with their previous implementation, looping over the scan ids.
+
+Usage (from the repository root) :
+    python -m benchmarks.bench_process_checks                      # synthetic project of 2000 scans
+    python -m benchmarks.bench_process_checks --scans 500
+    python -m benchmarks.bench_process_checks --project zooscan_lov/Zooscan_xxx   # real project, relative to localData.base_path
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import labels
+import localData
+import libQC_zooscan_implementation
+from benchmarks.synthetic_project import make_project
+from enums import Mode
+
+
+def legacy_check_raw_files(_id, _mode, local_data):
+    """Reference implementation : previous libQC_zooscan_implementation.check_raw_files"""
+    fs = local_data.get("fs")
+    dataToTest = fs.loc[([True if "/_raw/" in i else False for i in fs['path'].values]), ["path", "name", "extension", "size", "mtime"]]
+    dataToTest["inside_name"] = localData.getInsideName(dataToTest)
+    result = local_data.get("dataframe")[['scan_id']].drop_duplicates()
+    result["raw_files"] = ""
+
+    ids = [id[:-2] if id.endswith('_1') else id for id in result.scan_id.unique()]
+    for id in ids:
+        datascanId = dataToTest.loc[([True if id in i else False for i in dataToTest['name'].values]), ["name", "extension", "inside_name"]]
+        count_log = datascanId.loc[datascanId.extension == "txt", 'name'].str.count("_log").sum()
+        count_meta = datascanId.loc[datascanId.extension == "txt", 'name'].str.count("_meta").sum()
+        count_raw_tif = datascanId.loc[datascanId.extension == "tif", 'name'].str.count("_raw").sum()
+        raw_zip = datascanId.loc[datascanId.extension == "zip", ['name', 'inside_name']]
+        count_raw_zip = raw_zip['name'].str.count("_raw").sum()
+
+        if count_raw_zip == 1 and raw_zip['name'].values != raw_zip['inside_name'].values:
+            result.loc[result["scan_id"] == id + "_1", 'raw_files'] += labels.errors["process.raw_files.rename_zip"]
+        elif count_log == 1 and count_meta == 1 and (count_raw_tif == 1 or count_raw_zip == 1):
+            result.loc[result["scan_id"] == id + "_1", 'raw_files'] = labels.sucess["process.raw_files.ok"]
+        if count_log < 1 or count_meta < 1 or (count_raw_tif < 1 and count_raw_zip < 1):
+            result.loc[result["scan_id"] == id + "_1", 'raw_files'] += labels.errors["process.raw_files.missing"]
+        if count_log > 1 or count_meta > 1 or count_raw_tif > 1 or count_raw_zip > 1:
+            result.loc[result["scan_id"] == id + "_1", 'raw_files'] += labels.errors["process.raw_files.duplicate"]
+
+    result.loc[result["raw_files"] == "", "raw_files"] = labels.errors["process.raw_files.inconsistent_scan_id"]
+    result.rename(columns={'scan_id': 'List scan ID', 'raw_files': 'RAW files'}, inplace=True)
+    return result
+
+
+def legacy_check_process_post_scan(_id, _mode, local_data):
+    """Reference implementation : previous libQC_zooscan_implementation.check_process_post_scan"""
+    fs = local_data.get("fs")
+    dataToTest = fs.loc[([True if "/_work/" in i else False for i in fs['path'].values]), ["path", "name", "extension", "size", "mtime"]]
+    dataToTest["inside_name"] = localData.getInsideName(dataToTest)
+    result = local_data.get("dataframe")[['scan_id']].drop_duplicates()
+    result["process_post_scan"] = ""
+
+    for id in result["scan_id"].values:
+        datascanId = dataToTest.loc[([True if id in i else False for i in dataToTest['name'].values]), ["name", "extension", "inside_name"]]
+        count_tsv = len(datascanId.loc[datascanId.extension == "tsv", 'name'])
+        work_zip = datascanId.loc[datascanId.extension == "zip", ['name', 'inside_name']]
+        count_work_zip = len(work_zip['name'])
+
+        if count_work_zip == 1 and labels.errors["global.bad_zip_file"] == work_zip['inside_name'].values:
+            result.loc[result["scan_id"] == id, 'process_post_scan'] += labels.errors["global.bad_zip_file"]
+        elif count_work_zip == 1 and work_zip['name'].values + ".tif" != work_zip['inside_name'].values:
+            result.loc[result["scan_id"] == id, 'process_post_scan'] += labels.errors["process.post_scan.rename_zip"]
+        elif count_work_zip == 1 and count_tsv == 1:
+            result.loc[result["scan_id"] == id, 'process_post_scan'] = labels.sucess["process.post_scan.ok"]
+        else:
+            if count_tsv < 1:
+                result.loc[result["scan_id"] == id, 'process_post_scan'] += labels.errors["process.post_scan.unprocessed"]
+            if count_tsv > 1:
+                result.loc[result["scan_id"] == id, 'process_post_scan'] += labels.errors["process.post_scan.duplicate.tsv"]
+            if count_work_zip < 1:
+                result.loc[result["scan_id"] == id, 'process_post_scan'] += labels.errors["process.post_scan.missing.zip"]
+            if count_work_zip > 1:
+                result.loc[result["scan_id"] == id, 'process_post_scan'] += labels.errors["process.post_scan.duplicate.zip"]
+
+    result.rename(columns={'scan_id': 'List scan ID', 'process_post_scan': 'POST SCAN'}, inplace=True)
+    return result
+
+
+def run(name, fct, local_data, repeat):
+    durations = []
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        df = fct(name, Mode.TSV, local_data)
+        durations.append(time.perf_counter() - start_time)
+    print("{:<40} scans : {:>6}   best of {} : {:8.4f} s".format(fct.__name__, len(df), repeat, min(durations)))
+    return df, min(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--project", help="project subpath relative to localData.base_path, a synthetic project is generated if not given")
+    parser.add_argument("--scans", type=int, default=2000, help="number of scans of the synthetic project")
+    parser.add_argument("--vignettes", type=int, default=2, help="number of vignettes by scan of the synthetic project")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        localData.cache_path = ""
+        if args.project:
+            subpath = args.project
+        else:
+            localData.base_path = tmp + "/"
+            subpath = "Zooscan_synthetic"
+            make_project(os.path.join(tmp, subpath), args.scans, nb_vignettes=args.vignettes)
+        local_data = localData.getdata(Mode.TSV, subpath)
+
+        for legacy, current in [(legacy_check_raw_files, libQC_zooscan_implementation.check_raw_files),
+                                (legacy_check_process_post_scan, libQC_zooscan_implementation.check_process_post_scan)]:
+            legacy_result, legacy_duration = run("legacy", legacy, local_data, args.repeat)
+            current_result, current_duration = run("current", current, local_data, args.repeat)
+            assert legacy_result.reset_index(drop=True).equals(current_result.reset_index(drop=True)), \
+                "{} does not return the same result as the previous implementation".format(current.__name__)
+            print("identical results, speedup x{:.1f}".format(legacy_duration / current_duration))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Compare the numeric and range tests of the checks with their previous implementation, probing eatch cell with float() or int().
+
+Eatch test is run on a column of text cells mixing numbers, invalid values and error labels, as read in the ecotaxa tables.
+The current implementation time includes the typing of the column (localData.numericColumn).
+
+Usage (from the repository root) :
+    python -m benchmarks.bench_range_checks                        # 1 000 000 cells
+    python -m benchmarks.bench_range_checks --cells 100000 --repeat 5
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+import labels
+import localData
+import libQC_zooscan_implementation
+
+MISSING_LABELS = [labels.errors["global.missing_ecotaxa_table"], labels.errors["global.missing_column"]]
+BW_RATIOS = ["0.1", "0.2", "0.3", "0", "-0.1", "nan", "inf", "1e-1", " 0.2", "abc", ""] + MISSING_LABELS
+MOTODA_FRACTIONS = ["1", "2", "4", "8", "3", "6", "16", "0", "-2", "abc", ""] + MISSING_LABELS
+
+
+def legacy_is_float(value):
+    """Reference implementation : previous libQC_zooscan_implementation.is_float"""
+    try:
+        float(value)
+        return True
+    except BaseException:
+        return False
+
+
+def legacy_is_int(value):
+    """Reference implementation : previous libQC_zooscan_implementation.is_int"""
+    try:
+        int(value)
+        return True
+    except BaseException:
+        return False
+
+
+def legacy_bw_ratio(values):
+    """Reference implementation : previous check_bw_ratio test of eatch cell"""
+    return pd.Series(values).map(lambda x: x if x in MISSING_LABELS
+                                 else labels.sucess["process.bw_ratio.ok"] if legacy_is_float(x) and float(x) < 0.25 and float(x) > 0
+                                 else labels.errors["process.bw_ratio.not_ok"]).values
+
+
+def current_bw_ratio(values):
+    data = _typed("process_particle_bw_ratio", values)
+    return libQC_zooscan_implementation.range_status(data, "process_particle_bw_ratio", labels.sucess["process.bw_ratio.ok"],
+                                                     labels.errors["process.bw_ratio.not_ok"], low=0, high=0.25)
+
+
+def legacy_motoda_status(values):
+    """Reference implementation : previous generic test of the motoda fraction of check_motoda_check"""
+    return pd.Series(values).map(lambda x: x if x == labels.errors["global.missing_ecotaxa_table"]
+                                 else labels.errors["global.not_numeric"] if not legacy_is_int(x)
+                                 else labels.sucess["acquisition.motoda.check.ok"]).values
+
+
+def current_motoda_status(values):
+    data = _typed("acq_sub_part", values)
+    return libQC_zooscan_implementation.numeric_status(data, "acq_sub_part", labels.sucess["acquisition.motoda.check.ok"])
+
+
+def legacy_power_of_two(values):
+    """Reference implementation : previous test of check_motoda_check, the motoda fraction being 1 or a power of 2"""
+    return pd.Series(values).map(lambda x: legacy_is_int(x) and int(x) > 0 and (int(x) & (int(x) - 1)) == 0).values.astype(bool)
+
+
+def current_power_of_two(values):
+    motoda = _typed("acq_sub_part", values)["acq_sub_part"].fillna(0).values.astype(np.int64)
+    return (motoda > 0) & ((motoda & (motoda - 1)) == 0)
+
+
+def _typed(col, values):
+    """Return the given text cells as the typed column of the global dataframe, followed by its error column"""
+    number, error = localData.numericColumn(values, localData.TSV_NUMERIC_COLS[col])
+    return pd.DataFrame({col : number, col + localData.ERROR_SUFFIX : error})
+
+
+def run(name, fct, values, repeat):
+    durations = []
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        result = fct(values)
+        durations.append(time.perf_counter() - start_time)
+    print("{:<25} cells : {:>8}   best of {} : {:8.4f} s".format(name, len(values), repeat, min(durations)))
+    return result, min(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, default=1000000, help="number of cells of the tested columns")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    bw_ratios = np.array([rnd.choice(BW_RATIOS) for i in range(args.cells)], dtype=object)
+    motoda_fractions = np.array([rnd.choice(MOTODA_FRACTIONS) for i in range(args.cells)], dtype=object)
+
+    for name, legacy, current, values in [("bw ratio range", legacy_bw_ratio, current_bw_ratio, bw_ratios),
+                                          ("motoda numeric status", legacy_motoda_status, current_motoda_status, motoda_fractions),
+                                          ("motoda power of two", legacy_power_of_two, current_power_of_two, motoda_fractions)]:
+        legacy_result, legacy_duration = run("legacy " + name, legacy, values, args.repeat)
+        current_result, current_duration = run("current " + name, current, values, args.repeat)
+        assert (np.asarray(legacy_result) == np.asarray(current_result)).all(), \
+            "{} does not return the same result as the previous implementation".format(current.__name__)
+        print("identical results, speedup x{:.1f}".format(legacy_duration / current_duration))
+
+
+if __name__ == '__main__':
+    main()
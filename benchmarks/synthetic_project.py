@@ -0,0 +1,131 @@
+import os
+import random
+from zipfile import ZipFile
+
+# Columns read by the QC, with the ecotaxa type of eatch one ([t] text, [f] float)
+QC_COLS = {
+    'sample_id': "[t]",
+    'process_img_background_img': "[t]",
+    'process_particle_bw_ratio': "[f]",
+    "process_particle_pixel_size_mm": "[f]",
+    "process_img_resolution": "[f]",
+    "acq_sub_part": "[f]",
+    "process_particle_sep_mask": "[t]",
+    'acq_min_mesh': "[f]",
+    'acq_max_mesh': "[f]",
+    'sample_net_type': "[t]",
+    'sample_comment': "[t]",
+    'sample_scan_operator': "[t]",
+    'acq_sub_method': "[t]",
+}
+
+# Resolution / pixel size couples accepted by check_pixel_size
+PIXEL_SIZES = [("300", "0.0847"), ("600", "0.0408"), ("1200", "0.0204"), ("2400", "0.0106"), ("4800", "0.0053")]
+
+FRAC_CHAINS = [["d1", "d2"], ["d1", "d2", "d3"], ["tot"], ["plankton"], ["d1"]]
+MESHES = {"d1": ("1000", "999999"), "d2": ("200", "1000"), "d3": ("100", "200"), "tot": ("100", "999999"), "plankton": ("100", "999999")}
+
+
+def _write_zip(path, inside_name):
+    with ZipFile(path, 'w') as z:
+        z.writestr(inside_name, b"\0" * 64)
+
+
+def _write_tsv(path, values, nb_objects, nb_extra_cols):
+    extra_cols = ["object_feature_" + str(i) for i in range(nb_extra_cols)]
+    header = ["img_file_name", "object_id"] + extra_cols + list(values.keys())
+    types = ["[t]", "[t]"] + ["[f]"] * nb_extra_cols + [QC_COLS.get(c, "[t]") for c in values.keys()]
+    with open(path, "w", encoding="ISO-8859-1") as f:
+        f.write("\t".join(header) + "\n")
+        f.write("\t".join(types) + "\n")
+        for i in range(nb_objects):
+            row = ["img_" + str(i) + ".jpg", "obj_" + str(i)] + [str(i * 0.5)] * nb_extra_cols + list(values.values())
+            f.write("\t".join(row) + "\n")
+
+
+def _write_meta(path, sample_id, frac, values):
+    with open(path, "w", encoding="ISO-8859-1") as f:
+        f.write("SampleId= " + sample_id + "\n")
+        f.write("Scanop= " + values['sample_scan_operator'] + "\n")
+        f.write("Nettype= " + values['sample_net_type'] + "\n")
+        f.write("FracId= " + frac + "\n")
+        f.write("Observation= no\n")
+        f.write("Sample_comment= " + values['sample_comment'] + "\n")
+
+
+def make_project(root, nb_scans, nb_vignettes=20, nb_objects=5, nb_extra_cols=20, seed=0):
+    """Create under root a synthetic Zooscan project of about nb_scans scans, with a deterministic mix of valid and faulty scans.
+    Scan ids never contains each others so that substring and exact scan id matching give the same result."""
+    rnd = random.Random(seed)
+    os.makedirs(os.path.join(root, "Zooscan_config"), exist_ok=True)
+    os.makedirs(os.path.join(root, "Zooscan_meta"), exist_ok=True)
+    os.makedirs(os.path.join(root, "Zooscan_scan", "_raw"), exist_ok=True)
+    os.makedirs(os.path.join(root, "Zooscan_scan", "_work"), exist_ok=True)
+    open(os.path.join(root, "Zooscan_config", "process_install_both_config_large.ini"), "w").close()
+    with open(os.path.join(root, "Zooscan_meta", "zooscan_sample_header_table.csv"), "w") as f:
+        f.write("sampleid;ship\n")
+    raw = os.path.join(root, "Zooscan_scan", "_raw")
+    work = os.path.join(root, "Zooscan_scan", "_work")
+
+    scan_ids = []
+    sample_nb = 0
+    while len(scan_ids) < nb_scans:
+        sample_nb += 1
+        sample_id = "smp" + str(sample_nb).zfill(5)
+        chain = rnd.choice(FRAC_CHAINS)
+        net_type = "rg" if chain == ["tot"] and rnd.random() < 0.5 else rnd.choice(["wp2", "bongo", "manta"])
+        resolution, pixel_size = rnd.choice(PIXEL_SIZES)
+        for frac in chain:
+            scan_id = sample_id + "_" + frac + "_1"
+            scan_ids.append(scan_id)
+            base = scan_id[:-2]
+            fault = rnd.random()
+            motoda = rnd.choice(["1", "2", "4", "8", "3"]) if frac == "d1" else rnd.choice(["2", "4", "16", "1", "6"])
+            min_mesh, max_mesh = MESHES[frac]
+            values = {
+                'sample_id': sample_id,
+                'process_img_background_img': rnd.choice(["large_back.tif", "narrow_back.tif"]),
+                'process_particle_bw_ratio': rnd.choice(["0.1", "0.2", "0.3", "nan"]),
+                "process_particle_pixel_size_mm": pixel_size if fault > 0.05 else "0.0999",
+                "process_img_resolution": resolution,
+                "acq_sub_part": motoda if fault > 0.03 else "abc",
+                "process_particle_sep_mask": rnd.choice(["include", "exclude"]),
+                'acq_min_mesh': min_mesh if fault > 0.04 else max_mesh,
+                'acq_max_mesh': max_mesh,
+                'sample_net_type': net_type,
+                'sample_comment': rnd.choice(["nan", "no comment", "broken jar"]),
+                'sample_scan_operator': rnd.choice(["marion_vilain", "tarik_baibai"]),
+                'acq_sub_method': "motoda",
+            }
+            if fault < 0.02:
+                del values['process_particle_bw_ratio']
+
+            # _raw files
+            if fault > 0.06:
+                open(os.path.join(raw, scan_id + "_log.txt"), "w").close()
+            open(os.path.join(raw, scan_id + "_meta.txt"), "w").close()
+            if fault < 0.08:
+                open(os.path.join(raw, scan_id + "_meta_old.txt"), "w").close()
+            with open(os.path.join(raw, base + "_raw_1.tif"), "wb") as f:
+                f.write(b"\0" * (1024 if fault > 0.01 else 2048))
+            if fault > 0.5:
+                _write_zip(os.path.join(raw, base + "_raw_1.zip"), base + "_raw_1" if fault > 0.52 else "renamed_raw_1")
+
+            # _work files
+            scan_dir = os.path.join(work, scan_id)
+            os.makedirs(scan_dir)
+            if fault > 0.07:
+                _write_tsv(os.path.join(scan_dir, "ecotaxa_" + scan_id + ".tsv"), values, nb_objects, nb_extra_cols)
+            _write_meta(os.path.join(scan_dir, scan_id + "_meta.txt"), sample_id, frac, values)
+            if 0.09 < fault < 0.1:
+                with open(os.path.join(scan_dir, scan_id + "_vis1.zip"), "wb") as f:
+                    f.write(b"not a zip")
+            elif fault > 0.1:
+                _write_zip(os.path.join(scan_dir, scan_id + "_vis1.zip"), scan_id + "_vis1.tif" if fault > 0.11 else "renamed.tif")
+            for ext in ["_dat1.pid", "_msk1.gif", "_out1.gif"]:
+                open(os.path.join(scan_dir, scan_id + ext), "w").close()
+            if fault > 0.3:
+                open(os.path.join(scan_dir, scan_id + "_sep.gif"), "w").close()
+            for i in range(rnd.choice([0, nb_vignettes, nb_vignettes * 50, nb_vignettes * 100]) if fault < 0.15 else nb_vignettes):
+                open(os.path.join(scan_dir, scan_id + "_" + str(i + 1) + ".jpg"), "w").close()
+    return scan_ids
@@ -1,7 +1,23 @@
+import math
+import os
 from dash import dash_table, dcc, html
+import numpy as np
+import pandas as pd
 from enums import SUPPORTED_DATA_COMPONANT
 import labels
 
+# Result tables of more rows are paged, filtered and sorted on the server : only their visible page is sent to the browser (QC_TABLE_PAGE_SIZE)
+try :
+    table_page_size = int(os.environ['QC_TABLE_PAGE_SIZE'])
+except :
+    table_page_size = 100
+
+# Hidden field of the result tables rows : indexes of the columns whose cell shows an error label, as |0|3|
+ERROR_COLUMNS = "_error_columns"
+
+# Operators of the DataTable filter queries, with their aliases
+FILTER_OPERATORS = {"=" : "eq", "!=" : "ne", "<" : "lt", "<=" : "le", ">" : "gt", ">=" : "ge"}
+
 
 def generate_header():
     return html.Div([
@@ -38,6 +54,8 @@ def generate_check_block(checkBlock):
     return html.Div([  # -- check list title --###
                     # dcc.Store stores the intermediate value
                     dcc.Store(id='intermediate-value-'+ checkBlock["id"]),
+                    # dcc.Store stores the id of the last QC run, computed as a background job (see localResults)
+                    dcc.Store(id='result-'+ checkBlock["id"]),
                     html.Div([
                         html.Div(
                             checkBlock["title"],
@@ -57,6 +75,21 @@ def generate_check_block(checkBlock):
                             alt="Save "+checkBlock["title"]+" QCs on plankton server",
                             title="Save "+checkBlock["title"]+" QCs on plankton server",
                             n_clicks=0,
+                            hidden=True),
+                        # -- progress of the running QC, shown only while it runs --###
+                        html.Progress(
+                            className="progressQC-bar",
+                            id="progressQC-bar-" + checkBlock["id"],
+                            hidden=True),
+                        html.Span(
+                            className="progressQC-label",
+                            id="progressQC-label-" + checkBlock["id"]),
+                        html.Button(
+                            "Cancel",
+                            className="cancelQC-btn",
+                            id="cancelQC-btn-" + checkBlock["id"],
+                            title="Cancel the running "+checkBlock["title"]+" QCs",
+                            n_clicks=0,
                             hidden=True)
                     ],
                         className="check-block-title"),
@@ -134,18 +167,31 @@ def emptyResult(block_id, projects):
     return emptyResLayout
 
 
-def sub_block_execution_result(subBlock, data):
+def sub_block_execution_result(subBlock, data, project="", sub_block=0):
+    """Return the result tables of a sub block, the sub_block-th of the project. 
+    The tables of more than table_page_size rows only get their first page, the others are served by page (see table_page)"""
     results_content= [html.H3(subBlock)]
-    for result in data :
+    for figure, result in enumerate(data) :
         if result["type"] == SUPPORTED_DATA_COMPONANT.DATA_TABLE or result["type"] == SUPPORTED_DATA_COMPONANT.DATA_TABLE_XS:
+            dataframe = result["dataframe"]
+            errors = error_columns(dataframe)
+            style_data_conditional = style_table_data(dataframe, errors)
+            dataframe = dataframe.assign(**{ERROR_COLUMNS : errors})
+            paged = len(dataframe) > table_page_size
+            if paged :
+                # filtering, sorting and paging are done on the server, from the results of the run
+                actions = {"filter_action" : "custom", "sort_action" : "custom", "page_action" : "custom",
+                           "page_current" : 0, "page_size" : table_page_size, "page_count" : math.ceil(len(dataframe) / table_page_size)}
+                dataframe = dataframe.iloc[:table_page_size]
+            else :
+                actions = {"filter_action" : "native",  # allow filtering of data by user ('native') or not ('none')
+                           "sort_action" : "native"}    # enables data to be sorted per-column by user or not ('none')
             dash_comp = dash_table.DataTable(
-                id='tbl-' + subBlock,
-                data=result["dataframe"].to_dict('records'),  # the contents of the table
+                id={"type" : "result-table-paged" if paged else "result-table", "project" : project, "sub_block" : sub_block, "figure" : figure},
+                data=dataframe.to_dict('records'),  # the contents of the table
                 columns=[{"name": i, "id": i} for i in result["dataframe"].columns],
-                filter_action="native",     # allow filtering of data by user ('native') or not ('none')
-                sort_action="native",       # enables data to be sorted per-column by user or not ('none')
                 sort_mode="single",         # sort across 'multi' or 'single' columns
-                style_data_conditional=style_table_data(result["dataframe"]),
+                style_data_conditional=style_data_conditional,
                 fixed_rows={'headers': True},
                 style_cell={                # ensure adequate header width when text is shorter than cell's text, and allign the text to left (default right)
                     'minWidth': 120, 'width': 120, 'textAlign': 'left', 'font-family': '"IMTITLE", Sans-serif', 'padding': '5px'
@@ -160,7 +206,8 @@ def sub_block_execution_result(subBlock, data):
                     'whiteSpace': 'normal',
                     'height': 'auto',
                     'font-size': '14px'
-                }
+                },
+                **actions
             )
             if result["type"] == SUPPORTED_DATA_COMPONANT.DATA_TABLE_XS :
                 dash_comp.fill_width=False
@@ -172,6 +219,60 @@ def sub_block_execution_result(subBlock, data):
     return div
 
 
+def table_page(dataframe, page_current, page_size, sort_by, filter_query):
+    """Return the rows of the given page of a result table, filtered and sorted as asked by its DataTable, and its number of pages"""
+    for filter_part in (filter_query or "").split(" && ") :
+        col, operator, value = split_filter_part(filter_part)
+        if col in dataframe.columns :
+            dataframe = dataframe.loc[filter_mask(dataframe[col], operator, value)]
+    if sort_by and sort_by[0]["column_id"] in dataframe.columns :
+        values = dataframe[sort_by[0]["column_id"]]
+        numbers = pd.to_numeric(values, errors="coerce")
+        # numbers first, in numeric order, then the labels
+        order = np.lexsort((values.astype(str).values, numbers.fillna(0).values, numbers.isna().values))
+        dataframe = dataframe.iloc[order[::-1] if sort_by[0]["direction"] == "desc" else order]
+    page = dataframe.iloc[page_current * page_size : (page_current + 1) * page_size]
+    return page.assign(**{ERROR_COLUMNS : error_columns(page)}).to_dict('records'), max(1, math.ceil(len(dataframe) / page_size))
+
+def split_filter_part(filter_part):
+    """Return the column, the operator (eq, ne, lt, le, gt, ge, contains or datestartswith, prefixed by i if case insensitive) and the value 
+    of a part of a DataTable filter query : {column} operator value. None if it can't be read"""
+    filter_part = filter_part.strip()
+    col, sep, condition = filter_part[1:].partition("} ")
+    if not filter_part.startswith("{") or not sep :
+        return None, None, None
+    operator, _, value = condition.strip().partition(" ")
+    case = "i" if operator[:1] == "i" and operator[1:] else ""
+    operator = operator[1:] if operator[:1] in ("i", "s") and operator[1:] else operator
+    operator = case + FILTER_OPERATORS.get(operator, operator)
+    value = value.strip()
+    if len(value) > 1 and value[0] == value[-1] and value[0] in ("'", '"', '`') :
+        value = value[1:-1].replace("\\" + value[0], value[0])
+    else :
+        try :
+            value = float(value)
+        except ValueError :
+            pass
+    return col, operator, value
+
+def filter_mask(values, operator, value):
+    """Return the mask of the given values (numbers or labels) matching a filter query condition (see split_filter_part)"""
+    case = not operator.startswith("i")
+    operator = operator.lstrip("i")
+    texts = values.astype(str)
+    if operator == "contains" :
+        return texts.str.contains(str(value), case=case, regex=False).values
+    if operator == "datestartswith" :
+        return texts.str.startswith(str(value)).values
+    if isinstance(value, float) :
+        numbers = pd.to_numeric(values, errors="coerce")
+        compare = {"eq" : numbers == value, "ne" : numbers != value, "lt" : numbers < value, "le" : numbers <= value, "gt" : numbers > value, "ge" : numbers >= value}
+        return compare.get(operator, numbers == value).values
+    if not case :
+        texts, value = texts.str.lower(), value.lower()
+    compare = {"eq" : texts == value, "ne" : texts != value, "lt" : texts < value, "le" : texts <= value, "gt" : texts > value, "ge" : texts >= value}
+    return compare.get(operator, texts == value).values
+
 def qc_execution_result(project, qcExecutionLayout):
     return html.Div([
         html.P("⭐️ "+project+" ⭐️", className="project-sep"),
@@ -181,7 +282,9 @@ def qc_execution_result(project, qcExecutionLayout):
 
 #TODO JCE : add this color to header background where at leat one QC exec is a ko
 # background-color : #ed43371f,
-def style_table_data(dataframe):
+def style_table_data(dataframe, errors):
+    """Return the conditional styles of a result table, whose rows error columns are given (see error_columns) : 
+    one rule by column showing at least one error label"""
     ret = [{
         'if': {'state': 'active'},
         'backgroundColor': 'lightgrey',
@@ -192,13 +295,24 @@ def style_table_data(dataframe):
         'z-index': '200'
     }]
     #Red text if cell (header and data) contains an error message 
-    for errors_label in labels.errors.values():
-        ret += [{
-            'if': {
-                'filter_query': '{{{}}} contains "{}"'.format(col, errors_label),
-                'column_id': col
-            },
-            'color': '#ED4337'
-        }for col in dataframe.columns
-        ]
+    flags = "".join(set(errors))
+    ret += [{
+        'if': {
+            'filter_query': '{{{}}} contains "|{}|"'.format(ERROR_COLUMNS, i),
+            'column_id': col
+        },
+        'color': '#ED4337'
+    } for i, col in enumerate(dataframe.columns) if "|{}|".format(i) in flags
+    ]
     return ret
+
+def error_columns(dataframe):
+    """Return for eatch row of the given result table the indexes of the columns whose cell contains an error label, as |0|3| ("|" if none).
+    Eatch distinct value of a column is tested once"""
+    error_labels = set(labels.errors.values())
+    errors = np.full(len(dataframe), "|", dtype=object)
+    for i, col in enumerate(dataframe.columns) :
+        codes, values = pd.factorize(dataframe[col].astype(str))
+        is_error = np.array([any(label in value for label in error_labels) for value in values], dtype=bool)[codes]
+        errors[is_error] += str(i) + "|"
+    return errors
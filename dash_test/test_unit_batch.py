@@ -0,0 +1,51 @@
+# 1. imports of dash app
+from dash.testing.application_runners import import_app
+import localData
+import pandas as pd
+import json
+import qc_batch
+
+
+def _write_scan(work, scan_id, sample_id) :
+    scan = work / scan_id
+    scan.mkdir()
+    (scan / ("ecotaxa_"+scan_id+".tsv")).write_text("sample_id\tacq_sub_part\n[t]\t[f]\n"+sample_id+"\t4\n")
+    (scan / (scan_id+"_meta.txt")).write_text("SampleId= "+sample_id+"\n")
+    (scan / (scan_id+"_1.jpg")).write_text("")
+
+def test_batch_run(dash_duo, tmp_path, monkeypatch) :
+    monkeypatch.setattr(localData, "base_path", str(tmp_path) + "/")
+    monkeypatch.setattr(localData, "cache_path", "")
+    for project in ["Zooscan_a", "Zooscan_b"] :
+        work = tmp_path / "zooscan_test" / project / "Zooscan_scan" / "_work"
+        work.mkdir(parents=True)
+        _write_scan(work, "wp_d1_1", "wp")
+        _write_scan(work, "wp_d2_1", "wp")
+    # A project without _work folder, and a folder that is not a project
+    (tmp_path / "zooscan_test" / "Zooscan_missing").mkdir()
+    (tmp_path / "zooscan_test" / "other").mkdir()
+    output = tmp_path / "out"
+
+    # All the zooscan_ drives, the QC of one project can't run
+    assert qc_batch.main(["--output", str(output), "--format", "csv", "json", "--workers", "1"]) == 1
+    projects = pd.read_csv(output / "projects.csv", keep_default_na=False)
+    assert list(projects["project"]) == ["Zooscan_a", "Zooscan_b", "Zooscan_missing"]
+    assert list(projects["status"]) == ["ok", "ok", "error"]
+    assert "The QC can't execute for this project" in projects["message"][2]
+    assert list(projects["nb_scans"]) == [2, 2, 0]
+
+    results = pd.read_csv(output / "results.csv", keep_default_na=False)
+    assert list(results.columns) == qc_batch.RESULT_COLS
+    assert set(results["project"]) == {"Zooscan_a", "Zooscan_b"}
+    assert set(results["sub_block"]) == {"acquisition", "process"}
+    raw_files = results.loc[(results["project"] == "Zooscan_a") & (results["check"] == "RAW files")]
+    assert list(raw_files["row"]) == ["wp_d1_1", "wp_d2_1"]
+    with open(output / "results.json") as f :
+        assert len(json.load(f)) == len(results)
+    timings = pd.read_csv(output / "timings.csv")
+    assert set(timings["project"]) == {"Zooscan_a", "Zooscan_b"}
+    assert set(timings["status"]) == {"ok"}
+
+    # Selected projects only
+    assert qc_batch.main(["zooscan_test", "--projects", "Zooscan_b", "--output", str(output)]) == 0
+    assert list(pd.read_csv(output / "projects.csv")["project"]) == ["Zooscan_b"]
@@ -0,0 +1,63 @@
+# 1. imports of dash app
+from dash.testing.application_runners import import_app
+import pandas as pd
+import componants
+from enums import SUPPORTED_DATA_COMPONANT
+
+
+def test_split_filter_part(dash_duo) :
+    assert componants.split_filter_part('{Sample comment} contains "broken jar"') == ("Sample comment", "contains", "broken jar")
+    assert componants.split_filter_part("{acq min mesh} >= 200") == ("acq min mesh", "ge", 200.0)
+    assert componants.split_filter_part("{RAW files} i= files ok") == ("RAW files", "ieq", "files ok")
+    assert componants.split_filter_part("{List scan ID} scontains wp") == ("List scan ID", "contains", "wp")
+    assert componants.split_filter_part("not a query") == (None, None, None)
+
+
+def test_table_page(dash_duo) :
+    df = pd.DataFrame({"List scan ID" : ["wp_d" + str(i) + "_1" for i in range(250)],
+                       "acq min mesh" : [i if i % 10 else "#NOT NUMERIC" for i in range(250)]})
+    rows, page_count = componants.table_page(df, 1, 100, [], "")
+    assert page_count == 3 and len(rows) == 100 and rows[0]["List scan ID"] == "wp_d100_1"
+    # Numbers and labels are filtered and sorted together : numbers in numeric order, then labels
+    rows, page_count = componants.table_page(df, 0, 100, [{"column_id" : "acq min mesh", "direction" : "asc"}], "{acq min mesh} < 30")
+    assert page_count == 1 and [row["acq min mesh"] for row in rows] == [i for i in range(30) if i % 10]
+    rows, page_count = componants.table_page(df, 0, 30, [{"column_id" : "acq min mesh", "direction" : "desc"}], "")
+    assert page_count == 9 and rows[24]["acq min mesh"] == "#NOT NUMERIC" and rows[25]["acq min mesh"] == 249
+    rows, page_count = componants.table_page(df, 0, 100, None, '{acq min mesh} icontains "not" && {List scan ID} contains d1')
+    assert [row["List scan ID"] for row in rows] == ["wp_d10_1", "wp_d100_1", "wp_d110_1", "wp_d120_1", "wp_d130_1", "wp_d140_1", "wp_d150_1", "wp_d160_1", "wp_d170_1", "wp_d180_1", "wp_d190_1"]
+    assert componants.table_page(df, 0, 100, None, "{List scan ID} = nothing") == ([], 1)
+
+
+def test_paged_result_table(dash_duo, monkeypatch) :
+    monkeypatch.setattr(componants, "table_page_size", 100)
+    small = pd.DataFrame({"List scan ID" : ["wp_d1_1"], "RAW files" : ["Files OK"]})
+    large = pd.DataFrame({"List scan ID" : ["wp_d" + str(i) + "_1" for i in range(250)], "RAW files" : ["Files OK"] * 250})
+    layout = componants.sub_block_execution_result("process", [{"dataframe" : small, "type" : SUPPORTED_DATA_COMPONANT.DATA_TABLE},
+                                                               {"dataframe" : large, "type" : SUPPORTED_DATA_COMPONANT.DATA_TABLE_XS}], "Zooscan_a", 1)
+    native, paged = layout.children[1:]
+    assert native.id == {"type" : "result-table", "project" : "Zooscan_a", "sub_block" : 1, "figure" : 0}
+    assert native.filter_action == "native" and len(native.data) == 1
+    # Only the first page is sent with the layout
+    assert paged.id == {"type" : "result-table-paged", "project" : "Zooscan_a", "sub_block" : 1, "figure" : 1}
+    assert paged.page_action == "custom" and paged.filter_action == "custom" and paged.sort_action == "custom"
+    assert len(paged.data) == 100 and paged.page_count == 3
+
+
+def test_error_styles(dash_duo) :
+    df = pd.DataFrame({"List scan ID" : ["wp_d1_1", "wp_d2_1", "wp_d3_1"],
+                       "RAW files" : ["Files OK", "#MISSING FILE", "#MISSING FILE#DUPLICATE FILE"],
+                       "acq min mesh" : [1000, 200, "#NOT NUMERIC"],
+                       "Sieve Bug" : ["sieve OK", "sieve OK", "sieve OK"]})
+    errors = componants.error_columns(df)
+    assert list(errors) == ["|", "|1|", "|1|2|"]
+    # One rule by column showing an error, on the hidden error columns field
+    styles = componants.style_table_data(df, errors)
+    assert [style["if"] for style in styles[1:]] == [{"filter_query" : '{_error_columns} contains "|1|"', "column_id" : "RAW files"},
+                                                    {"filter_query" : '{_error_columns} contains "|2|"', "column_id" : "acq min mesh"}]
+    layout = componants.sub_block_execution_result("process", [{"dataframe" : df, "type" : SUPPORTED_DATA_COMPONANT.DATA_TABLE}])
+    table = layout.children[1]
+    assert [row["_error_columns"] for row in table.data] == ["|", "|1|", "|1|2|"]
+    assert [column["id"] for column in table.columns] == list(df.columns)
+    # Served pages have their error columns too
+    rows, page_count = componants.table_page(df, 0, 2, [{"column_id" : "acq min mesh", "direction" : "desc"}], "")
+    assert [row["_error_columns"] for row in rows] == ["|1|2|", "|"]
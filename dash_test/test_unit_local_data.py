@@ -0,0 +1,481 @@
+# 1. imports of dash app
+from dash.testing.application_runners import import_app
+from enums import Mode
+import localData
+import pandas as pd
+import numpy as np
+import labels
+from zipfile import ZipFile
+import os
+import time
+import pytest
+
+
+def test_get_file_system(dash_duo) :
+    project="Zooscan_test/test_subBlock_acquisition_check_motoda_check_2"
+    fs = localData.getFileSystem(project)
+
+    # Only files are listed, folders are walked through
+    assert not fs["folder"].any()
+    assert sorted(fs["name"].values) == sorted([".gitkeep", "ecotaxa_wp_d1_1", "metadata", "zooscan_sample_header_table", 
+                                               "zooscan_sample_header_table_20211115_114332", "zooscan_scan_header_table"])
+
+    # name and extension are splitted, depth is relative to the project folder
+    tsv = fs.loc[fs["extension"]=="tsv"]
+    assert tsv["name"].values[0] == "ecotaxa_wp_d1_1"
+    assert tsv["path"].values[0].endswith("/Zooscan_scan/_work/wp_d1_1/ecotaxa_wp_d1_1.tsv")
+    assert tsv["depth"].values[0] == 3
+    assert fs.loc[fs["name"]==".gitkeep", "extension"].values[0] is None
+
+    # Ids are unique
+    assert fs["id"].is_unique
+
+def test_get_inside_name(dash_duo, tmp_path, monkeypatch) :
+    monkeypatch.setattr(localData, "base_path", str(tmp_path) + "/")
+    raw = tmp_path / "Zooscan_test" / "Zooscan_scan" / "_raw"
+    raw.mkdir(parents=True)
+    with ZipFile(raw / "wp_d1_raw_1.zip", "w") as z :
+        z.writestr("wp_d1_raw_1", "data")
+    (raw / "wp_d2_raw_1.zip").write_text("not a zip")
+    (raw / "wp_d1_1_log.txt").write_text("log")
+
+    # zip files are not opened while indexing the file system
+    fs = localData.getFileSystem("Zooscan_test")
+    assert "inside_name" not in fs.columns
+
+    # but on demand, "None" for files that are not zip
+    inside_name = localData.getInsideName(fs)
+    assert inside_name[fs["name"]=="wp_d1_raw_1"].values[0] == "wp_d1_raw_1"
+    assert inside_name[fs["name"]=="wp_d2_raw_1"].values[0] == "#BAD ZIP FILE"
+    assert inside_name[fs["name"]=="wp_d1_1_log"].values[0] == "None"
+
+    # unchanged zip files are not reopened
+    hits = localData._zip_inside_name.cache_info().hits
+    localData.getInsideName(fs)
+    assert localData._zip_inside_name.cache_info().hits == hits + 2
+
+    # a zip rewritten since the file system was indexed is opened again
+    with ZipFile(raw / "wp_d1_raw_1.zip", "w") as z :
+        z.writestr("wp_d1_raw_1_renamed", "other data")
+    inside_name = localData.getInsideName(fs)
+    assert inside_name[fs["name"]=="wp_d1_raw_1"].values[0] == "wp_d1_raw_1_renamed"
+
+def _write_scan(work, scan_id, sample_id) :
+    scan = work / scan_id
+    scan.mkdir()
+    (scan / ("ecotaxa_"+scan_id+".tsv")).write_text("sample_id\tacq_sub_part\n[t]\t[f]\n"+sample_id+"\t4\n")
+    (scan / (scan_id+"_meta.txt")).write_text("SampleId= "+sample_id+"\n")
+    (scan / (scan_id+"_1.jpg")).write_text("")
+
+def test_project_cache(dash_duo, tmp_path, monkeypatch) :
+    monkeypatch.setattr(localData, "base_path", str(tmp_path) + "/")
+    monkeypatch.setattr(localData, "cache_path", str(tmp_path / "cache"))
+    work = tmp_path / "Zooscan_test" / "Zooscan_scan" / "_work"
+    work.mkdir(parents=True)
+    _write_scan(work, "wp_d1_1", "wp")
+    _write_scan(work, "wp_d2_1", "wp")
+
+    first = localData.getdata(Mode.TSV, "Zooscan_test")
+    # Second execution : the unchanged scans are not read again
+    read_scans = []
+    read_scan = localData._readScan
+    monkeypatch.setattr(localData, "_readScan", lambda work_path, folder_name, *args : read_scans.append(folder_name) or read_scan(work_path, folder_name, *args))
+    second = localData.getdata(Mode.TSV, "Zooscan_test")
+    assert read_scans == []
+    assert sorted(second["fs"]["path"].values) == sorted(first["fs"]["path"].values)
+    assert second["dataframe"].sort_values("scan_id").equals(first["dataframe"].sort_values("scan_id"))
+    assert second["meta"].equals(first["meta"])
+
+    # A modified tsv, an added vignette or a new scan are read again
+    (work / "wp_d1_1" / "ecotaxa_wp_d1_1.tsv").write_text("sample_id\tacq_sub_part\n[t]\t[f]\nwp\t8\n")
+    (work / "wp_d2_1" / "wp_d2_1_2.jpg").write_text("")
+    _write_scan(work, "wp_d3_1", "wp")
+    third = localData.getdata(Mode.TSV, "Zooscan_test")
+    assert sorted(read_scans) == ["wp_d1_1", "wp_d2_1", "wp_d3_1"]
+    assert third["dataframe"].loc[third["dataframe"]["scan_id"]=="wp_d1_1", "acq_sub_part"].values[0] == 8
+    assert third["fs"]["name"].isin(["wp_d2_1_2"]).any()
+    assert third["fs"]["id"].is_unique
+
+def test_project_cache_checked_files(dash_duo, tmp_path, monkeypatch) :
+    monkeypatch.setattr(localData, "base_path", str(tmp_path) + "/")
+    monkeypatch.setattr(localData, "cache_path", str(tmp_path / "cache"))
+    work = tmp_path / "Zooscan_test" / "Zooscan_scan" / "_work"
+    work.mkdir(parents=True)
+    _write_scan(work, "wp_d1_1", "wp")
+    vis = work / "wp_d1_1" / "wp_d1_1_vis1.zip"
+    with ZipFile(vis, "w") as z :
+        z.writestr("wp_d1_1_vis1.tif", "data")
+    first = localData.getdata(Mode.TSV, "Zooscan_test")
+    assert list(localData.getInsideName(first["fs"].loc[first["fs"]["role"]=="vis_zip"])) == ["wp_d1_1_vis1.tif"]
+
+    # A vis zip rewritten in place does not change the folder mtime, but the scan is read again
+    folder_mtime = os.stat(work / "wp_d1_1").st_mtime_ns
+    with ZipFile(vis, "w") as z :
+        z.writestr("wp_d1_1_renamed_vis1.tif", "other data")
+    os.utime(work / "wp_d1_1", ns=(folder_mtime, folder_mtime))
+    second = localData.getdata(Mode.TSV, "Zooscan_test")
+    vis_zip = second["fs"].loc[second["fs"]["role"]=="vis_zip"]
+    assert list(vis_zip["size"]) == [os.stat(vis).st_size]
+    assert list(localData.getInsideName(vis_zip)) == ["wp_d1_1_renamed_vis1.tif"]
+
+def test_project_cache_nested_folders(dash_duo, tmp_path, monkeypatch) :
+    monkeypatch.setattr(localData, "base_path", str(tmp_path) + "/")
+    monkeypatch.setattr(localData, "cache_path", str(tmp_path / "cache"))
+    work = tmp_path / "Zooscan_test" / "Zooscan_scan" / "_work"
+    work.mkdir(parents=True)
+    _write_scan(work, "wp_d1_1", "wp")
+    # Folders without files : only sub folders, or empty
+    (work / "wp_d1_1" / "multiples_to_separate" / "part_1").mkdir(parents=True)
+    (work / "wp_d1_1" / "empty").mkdir()
+    localData.getdata(Mode.TSV, "Zooscan_test")
+
+    # A folder and its file added in a folder that only holds sub folders, or in an empty one
+    (work / "wp_d1_1" / "multiples_to_separate" / "part_2").mkdir()
+    (work / "wp_d1_1" / "multiples_to_separate" / "part_2" / "wp_d1_1_sep.gif").write_text("")
+    second = localData.getdata(Mode.TSV, "Zooscan_test")
+    assert second["fs"]["name"].isin(["wp_d1_1_sep"]).any()
+    (work / "wp_d1_1" / "empty" / "nested").mkdir()
+    (work / "wp_d1_1" / "empty" / "nested" / "wp_d1_1_2.jpg").write_text("")
+    third = localData.getdata(Mode.TSV, "Zooscan_test")
+    assert third["fs"]["name"].isin(["wp_d1_1_2"]).any()
+
+def test_incremental_getdata(dash_duo, tmp_path, monkeypatch) :
+    monkeypatch.setattr(localData, "base_path", str(tmp_path) + "/")
+    monkeypatch.setattr(localData, "cache_path", "")
+    work = tmp_path / "Zooscan_test" / "Zooscan_scan" / "_work"
+    work.mkdir(parents=True)
+    for scan_id in ["wp_d1_1", "wp_d2_1", "wp_d3_1"] :
+        _write_scan(work, scan_id, "wp")
+    localData.getdata(Mode.TSV, "Zooscan_test", incremental=True)
+
+    # One scan modified, one removed, one added : only the modified and the added ones are read
+    read_scans = []
+    read_scan = localData._readScan
+    monkeypatch.setattr(localData, "_readScan", lambda work_path, folder_name, *args : read_scans.append(folder_name) or read_scan(work_path, folder_name, *args))
+    (work / "wp_d1_1" / "wp_d1_1_2.jpg").write_text("")
+    for f in (work / "wp_d3_1").iterdir() :
+        f.unlink()
+    (work / "wp_d3_1").rmdir()
+    _write_scan(work, "wp_d4_1", "wp")
+    patched = localData.getdata(Mode.TSV, "Zooscan_test", incremental=True)
+    assert sorted(read_scans) == ["wp_d1_1", "wp_d4_1"]
+
+    # Same result as a full read
+    full = localData.getdata(Mode.TSV, "Zooscan_test")
+    assert patched["dataframe"].sort_values("scan_id").equals(full["dataframe"].sort_values("scan_id"))
+    assert sorted(patched["fs"]["path"].values) == sorted(full["fs"]["path"].values)
+    assert patched["meta"].sort_index().equals(full["meta"].sort_index())
+    assert sorted(patched["dataframe"]["scan_id"].unique()) == ["wp_d1_1", "wp_d2_1", "wp_d4_1"]
+
+def test_read_scans_pool(dash_duo, tmp_path, monkeypatch) :
+    monkeypatch.setattr(localData, "base_path", str(tmp_path) + "/")
+    monkeypatch.setattr(localData, "cache_path", "")
+    work = tmp_path / "Zooscan_test" / "Zooscan_scan" / "_work"
+    work.mkdir(parents=True)
+    for scan_id in ["wp_d1_1", "wp_d2_1", "wp_d3_1"] :
+        _write_scan(work, scan_id, "wp")
+    (work / "wp_d4_1").mkdir()
+
+    monkeypatch.setattr(localData, "read_workers", 1)
+    sequential = localData.getdata(Mode.TSV, "Zooscan_test")
+    monkeypatch.setattr(localData, "read_workers", 4)
+    parallel = localData.getdata(Mode.TSV, "Zooscan_test")
+    assert parallel["dataframe"].equals(sequential["dataframe"])
+    assert parallel["fs"].equals(sequential["fs"])
+
+    # Columns that are not in the tsv and missing tsv are reported as before
+    df = parallel["dataframe"].set_index("scan_id")
+    assert df.loc["wp_d1_1", "sample_id"] == "wp"
+    assert pd.isna(df.loc["wp_d1_1", "acq_min_mesh"]) and df.loc["wp_d1_1", "acq_min_mesh_error"] == labels.errors["global.missing_column"]
+    assert df.loc["wp_d4_1", "STATUS"] == labels.errors["global.missing_ecotaxa_table"]
+
+def test_first_row_only(dash_duo, tmp_path, monkeypatch) :
+    monkeypatch.setattr(localData, "base_path", str(tmp_path) + "/")
+    monkeypatch.setattr(localData, "cache_path", str(tmp_path / "cache"))
+    work = tmp_path / "Zooscan_test" / "Zooscan_scan" / "_work"
+    work.mkdir(parents=True)
+    _write_scan(work, "wp_d1_1", "wp")
+    (work / "wp_d2_1").mkdir()
+    (work / "wp_d2_1" / "ecotaxa_wp_d2_1.tsv").write_text("object_id\tsample_id\tacq_sub_part\n[t]\t[t]\t[f]\n"+"".join("obj_"+str(i)+"\twp\t4\n" for i in range(100)))
+
+    full = localData.getdata(Mode.TSV, "Zooscan_test")
+    first = localData.getdata(Mode.TSV, "Zooscan_test", first_row_only=True)
+    assert len(full["dataframe"]) == 101
+    # One line by scan, with the values of the first object
+    assert sorted(first["dataframe"]["scan_id"].values) == ["wp_d1_1", "wp_d2_1"]
+    assert first["dataframe"].equals(full["dataframe"].groupby("scan_id").head(1))
+
+    # Both reading modes have their own cache
+    assert len(localData.getdata(Mode.TSV, "Zooscan_test")["dataframe"]) == 101
+    assert len(localData.getdata(Mode.TSV, "Zooscan_test", first_row_only=True)["dataframe"]) == 2
+
+def test_memory_limit(dash_duo, tmp_path, monkeypatch) :
+    import libQC_zooscan_implementation as impl
+    monkeypatch.setattr(localData, "base_path", str(tmp_path) + "/")
+    monkeypatch.setattr(localData, "cache_path", str(tmp_path / "cache"))
+    work = tmp_path / "Zooscan_test" / "Zooscan_scan" / "_work"
+    work.mkdir(parents=True)
+    _write_scan(work, "wp_d1_1", "wp")
+    (work / "wp_d2_1").mkdir()
+    # 2500 objects read by chunks of 1000, 3 distinct rows (one with an empty cell) spread over the chunks
+    (work / "wp_d2_1" / "ecotaxa_wp_d2_1.tsv").write_text("object_id\tsample_id\tacq_sub_part\n[t]\t[t]\t[f]\n"
+                                                          + "".join("obj_"+str(i)+"\twp\t"+["4", "8", ""][i % 1200 // 500]+"\n" for i in range(2500)))
+    full = localData.getdata(Mode.TSV, "Zooscan_test")
+    monkeypatch.setattr(localData, "memory_limit", 1)
+    assert localData._chunkRows(localData.TSV_COLS) == 1000
+    bounded = localData.getdata(Mode.TSV, "Zooscan_test")
+
+    # Only the distinct rows of eatch scan are kept, in the order of their first object
+    assert len(full["dataframe"]) == 2501
+    assert sorted(bounded["dataframe"].loc[bounded["dataframe"]["scan_id"] == "wp_d2_1", "acq_sub_part"].fillna(0)) == [0, 4, 8]
+    assert bounded["dataframe"].equals(full["dataframe"].drop_duplicates())
+    for check in [impl.check_sep_mask, impl.check_motoda_check, impl.check_frame_type] :
+        assert check("id", Mode.TSV, bounded).equals(check("id", Mode.TSV, full))
+    # Own cache file, and the peak memory is known
+    assert len(list((tmp_path / "cache").glob("*_distinct.pkl"))) == 1
+    assert localData.getdata(Mode.TSV, "Zooscan_test")["dataframe"].equals(bounded["dataframe"])
+    assert localData.peakMemory() > 0
+
+def test_classify_files(dash_duo, tmp_path, monkeypatch) :
+    monkeypatch.setattr(localData, "base_path", str(tmp_path) + "/")
+    monkeypatch.setattr(localData, "cache_path", str(tmp_path / "cache"))
+    project = tmp_path / "Zooscan_test"
+    (project / "Zooscan_config").mkdir(parents=True)
+    (project / "Zooscan_config" / "process_install_both_config.ini").write_text("")
+    raw = project / "Zooscan_scan" / "_raw"
+    raw.mkdir(parents=True)
+    for name in ["wp_d1_1_log.txt", "wp_d1_1_meta.txt", "wp_d1_raw_1.tif", "wp_d1_raw_1.zip"] :
+        (raw / name).write_text("")
+    work = project / "Zooscan_scan" / "_work"
+    work.mkdir()
+    _write_scan(work, "wp_d1_1", "wp")
+    (work / "wp_d1_1" / "wp_d1_1_vis1.zip").write_text("")
+    (work / "wp_d1_1" / "wp_d1_1_sep.gif").write_text("")
+    (work / "wp_d1_1" / "multiples_to_separate").mkdir()
+    (work / "wp_d1_1" / "multiples_to_separate" / "wp_d1_1_2.jpg").write_text("")
+
+    expected = {"Zooscan_config/process_install_both_config.ini" : ("Zooscan_config", None, "ini"),
+                "Zooscan_scan/_raw/wp_d1_1_log.txt" : ("_raw", "wp_d1_1", "log"),
+                "Zooscan_scan/_raw/wp_d1_1_meta.txt" : ("_raw", "wp_d1_1", "meta"),
+                "Zooscan_scan/_raw/wp_d1_raw_1.tif" : ("_raw", "wp_d1_1", "raw_tif"),
+                "Zooscan_scan/_raw/wp_d1_raw_1.zip" : ("_raw", "wp_d1_1", "raw_zip"),
+                "Zooscan_scan/_work/wp_d1_1/ecotaxa_wp_d1_1.tsv" : ("_work", "wp_d1_1", "tsv"),
+                "Zooscan_scan/_work/wp_d1_1/wp_d1_1_meta.txt" : ("_work", "wp_d1_1", "meta"),
+                "Zooscan_scan/_work/wp_d1_1/wp_d1_1_1.jpg" : ("_work", "wp_d1_1", "vignette"),
+                "Zooscan_scan/_work/wp_d1_1/wp_d1_1_vis1.zip" : ("_work", "wp_d1_1", "vis_zip"),
+                "Zooscan_scan/_work/wp_d1_1/wp_d1_1_sep.gif" : ("_work", "wp_d1_1", "sep_gif"),
+                "Zooscan_scan/_work/wp_d1_1/multiples_to_separate/wp_d1_1_2.jpg" : ("multiples_to_separate", "wp_d1_1", None)}
+    # Same classification when read, and when taken from the cache
+    for _ in range(2) :
+        fs = localData.getdata(Mode.TSV, "Zooscan_test")["fs"]
+        assert str(fs["area"].dtype) == "category" and str(fs["role"].dtype) == "category"
+        classes = {os.path.relpath(row.path, project) : tuple(None if pd.isnull(value) else value for value in (row.area, row.scan_id, row.role)) 
+                   for row in fs.itertuples()}
+        assert classes == expected
+
+def test_read_meta(dash_duo, tmp_path) :
+    work = tmp_path / "_work"
+    (work / "wp_d1_1").mkdir(parents=True)
+    (work / "wp_d2_1").mkdir()
+    (work / "wp_d1_1" / "wp_d1_1_meta.txt").write_bytes("SampleId= wp\r\nSample_comment= filtr\xe9\r\nSample_comment= other\r\nno field\r\n".encode("ISO-8859-1"))
+    (work / "wp_d2_1" / "wp_d2_1_meta.txt").write_text("SampleId= wp\nObservation= côte\n", encoding="utf-8")
+    paths = [str(work / "wp_d1_1" / "wp_d1_1_meta.txt"), str(work / "wp_d2_1" / "wp_d2_1_meta.txt"), str(work / "wp_d3_1" / "wp_d3_1_meta.txt")]
+
+    meta = localData.metaToGlobalData(localData._readMeta(paths), str(work))
+    assert list(meta.index) == ["wp_d1_1", "wp_d2_1", "wp_d3_1"]
+    # First value of eatch field, in latin-1 or utf-8 files
+    assert meta.loc["wp_d1_1", "Sample_comment"] == "filtré"
+    assert meta.loc["wp_d2_1", "Observation"] == "côte"
+    assert pd.isnull(meta.loc["wp_d1_1", "Observation"])
+    assert list(meta["STATUS"]) == ["", "", labels.errors["global.bad_meta_txt_file"]]
+
+def test_frac_columns(dash_duo) :
+    scan_ids = pd.Series(["wp_d1_1", "wp_d12_1", "wp_tot_1", "wp_plankton_1", "wp_tot_d2_1", "wp_d0_1", "wp_1", "wp_d1_1"])
+    frac_id, frac_index = localData.fracColumns(scan_ids)
+    assert list(frac_id) == ["_d1_", "_d12_", "_tot_", "_plankton_", "_d2_", localData.FRAC_TYPE_NOT_HANDLED, localData.FRAC_TYPE_NOT_HANDLED, "_d1_"]
+    assert list(frac_index.fillna(0)) == [1, 12, 0, 0, 2, 0, 0, 1]
+
+def test_typed_columns(dash_duo, tmp_path, monkeypatch) :
+    monkeypatch.setattr(localData, "base_path", str(tmp_path) + "/")
+    monkeypatch.setattr(localData, "cache_path", "")
+    numbers, errors = localData.numericColumn(np.array(["4", " 8", "4.0", "1e3", "4.5", "abc", "", "1_6", labels.errors["global.missing_column"]], dtype=object), "Int64")
+    assert list(numbers.fillna(-1)) == [4, 8, 4, 1000, -1, -1, -1, -1, -1]
+    assert list(errors.astype(object)[4:]) == ["4.5", "abc", "", "1_6", labels.errors["global.missing_column"]] and pd.isna(errors[:4]).all()
+    numbers, errors = localData.numericColumn(np.array(["0.0847", "8.47e-2", "x"], dtype=object), "Float64")
+    assert list(numbers.fillna(-1)) == [0.0847, 0.0847, -1]
+
+    work = tmp_path / "Zooscan_test" / "Zooscan_scan" / "_work"
+    work.mkdir(parents=True)
+    _write_scan(work, "wp_d1_1", "wp")
+    _write_scan(work, "wp_d2_1", "wp")
+    (work / "wp_d3_1").mkdir()
+    df = localData.getdata(Mode.TSV, "Zooscan_test")["dataframe"]
+    # Categories for the text columns, nullable numbers followed by the text of the cells that are not numbers
+    assert all(df[col].dtype == "category" for col in ["scan_id", "sample_id", "sample_net_type", "sample_scan_operator", "acq_sub_part_error"])
+    assert df["acq_sub_part"].dtype == "Int64" and df["process_particle_pixel_size_mm"].dtype == "Float64"
+    assert list(df.columns[df.columns.get_loc("acq_sub_part"):][:2]) == ["acq_sub_part", "acq_sub_part_error"]
+    df = df.set_index("scan_id")
+    assert df.loc["wp_d1_1", "acq_sub_part"] == 4 and pd.isna(df.loc["wp_d1_1", "acq_sub_part_error"])
+    assert pd.isna(df.loc["wp_d3_1", "acq_sub_part"]) and df.loc["wp_d3_1", "acq_sub_part_error"] == labels.errors["global.missing_ecotaxa_table"]
+    assert df.loc["wp_d1_1", "acq_min_mesh_error"] == labels.errors["global.missing_column"]
+
+def test_getdata_requirements(dash_duo, tmp_path, monkeypatch) :
+    monkeypatch.setattr(localData, "base_path", str(tmp_path) + "/")
+    monkeypatch.setattr(localData, "cache_path", "")
+    project = tmp_path / "Zooscan_test"
+    work = project / "Zooscan_scan" / "_work"
+    work.mkdir(parents=True)
+    _write_scan(work, "wp_d1_1", "wp")
+    (project / "Zooscan_scan" / "_raw").mkdir()
+    (project / "Zooscan_scan" / "_raw" / "wp_d1_raw_1.tif").write_text("")
+    (project / "Zooscan_config").mkdir()
+    (project / "Zooscan_config" / "process_install_both_config_large.ini").write_text("")
+    (project / "Zooscan_back").mkdir()
+    (project / "Zooscan_back" / "back_large_1.tif").write_text("")
+    (work / "wp_d1_1" / "wp_d1_1_meta.txt").write_text("SampleId= wp\nObservation= no\n")
+
+    # Only the requested columns, areas and meta fields are loaded
+    data = localData.getdata(Mode.TSV, "Zooscan_test", cols=["acq_sub_part"], fs_areas=["_raw"], meta_fields=["Observation"])
+    assert sorted(data["dataframe"].columns) == ["STATUS", "acq_sub_part", "acq_sub_part_error", "fracID", "frac_index", "scan_id"]
+    assert list(data["fs"]["name"].values) == ["wp_d1_raw_1"]
+    assert data["fs"]["depth"].values[0] == 2
+    assert list(data["meta"].columns) == ["path", "STATUS", "Observation"]
+    assert data["meta"].loc["wp_d1_1", "Observation"] == "no"
+
+    # A check without tsv column still has one line by object
+    data = localData.getdata(Mode.TSV, "Zooscan_test", cols=[], fs_areas=["_work", "Zooscan_config"], meta_fields=[])
+    assert list(data["dataframe"]["scan_id"].values) == ["wp_d1_1"]
+    assert sorted(data["fs"]["name"].values) == ["ecotaxa_wp_d1_1", "process_install_both_config_large", "wp_d1_1_1", "wp_d1_1_meta"]
+    assert list(data["meta"].columns) == ["path", "STATUS"]
+
+    # Same file system as a full walk on the walked areas
+    full = localData.getdata(Mode.TSV, "Zooscan_test")
+    assert "back_large_1" in full["fs"]["name"].values
+    areas = full["fs"].loc[full["fs"]["name"] != "back_large_1"].drop(columns="id").sort_values("path").reset_index(drop=True)
+    data = localData.getdata(Mode.TSV, "Zooscan_test", fs_areas=["_raw", "_work", "Zooscan_config"])
+    assert data["fs"].drop(columns="id").sort_values("path").reset_index(drop=True).equals(areas)
+
+def test_block_requirements(dash_duo) :
+    from libQC_zooscan import Lib_zooscan
+    lib = Lib_zooscan().lib
+    block = lib.getBlock("during_analysis")
+    acquisition = block.getSubBlock("acquisition")
+
+    # A sub block only asks for the data of its checks, the block for the union of its sub blocks
+    requirements = acquisition.requirements()
+    assert requirements["fs_areas"] == ["_work"]
+    assert requirements["meta_fields"] == ["Observation", "Sample_comment"]
+    assert "process_img_background_img" not in requirements["cols"]
+    assert requirements["first_row_only"]
+    assert sorted(block.requirements()["cols"]) == sorted(localData.TSV_COLS)
+    assert block.requirements()["fs_areas"] == ["Zooscan_config", "_raw", "_work"]
+
+def test_block_projects_pool(dash_duo, tmp_path, monkeypatch) :
+    import libQC_classes
+    from libQC_zooscan import Lib_zooscan
+    monkeypatch.setattr(localData, "base_path", str(tmp_path) + "/")
+    monkeypatch.setattr(localData, "cache_path", "")
+    for project in ["Zooscan_a", "Zooscan_b"] :
+        work = tmp_path / "drive" / project / "Zooscan_scan" / "_work"
+        work.mkdir(parents=True)
+        _write_scan(work, "wp_d1_1", "wp")
+        _write_scan(work, "wp_d2_1", "wp")
+    block = Lib_zooscan().lib.getBlock("during_analysis")
+    projects = ["Zooscan_a", "Zooscan_missing", "Zooscan_b"]
+
+    monkeypatch.setattr(libQC_classes, "project_workers", 1)
+    sequential = block.runCallback(projects, "drive")
+    monkeypatch.setattr(libQC_classes, "project_workers", 3)
+    pooled = block.runCallback(projects, "drive")
+
+    # Same results in the same order, a failing project does not stop the others
+    assert [pdf["project"] for pdf in pooled["pdf"]] == projects
+    assert [str(layout) for layout in pooled["dash"]] == [str(layout) for layout in sequential["dash"]]
+    assert "The QC can't execute for this project" in str(pooled["dash"][1])
+    for pdf_pooled, pdf_sequential in zip(pooled["pdf"], sequential["pdf"]) :
+        assert pdf_pooled["path"] == pdf_sequential["path"]
+        assert [sub_block["title"] for sub_block in pdf_pooled["subBlocks"]] == [sub_block["title"] for sub_block in pdf_sequential["subBlocks"]]
+        for sub_block_pooled, sub_block_sequential in zip(pdf_pooled["subBlocks"], pdf_sequential["subBlocks"]) :
+            for result_pooled, result_sequential in zip(sub_block_pooled["data"], sub_block_sequential["data"]) :
+                assert result_pooled["dataframe"].equals(result_sequential["dataframe"])
+    assert len(pooled["pdf"][0]["subBlocks"]) == 2
+
+def test_sub_block_checks_pool(dash_duo, monkeypatch) :
+    import libQC_classes
+    def check(name, delay, fail=False) :
+        def callback(_id, _mode, local_data) :
+            time.sleep(delay)
+            if fail :
+                raise ValueError(name + " failed")
+            return pd.DataFrame({"scan_id" : local_data.get("scans"), name : [name] * len(local_data.get("scans"))})
+        return libQC_classes.Check(name, "", name, "table", 1, callback)
+    sub_block = libQC_classes.SubBlock("sub", "", 1, "sub")
+    sub_block.addChecks(check("slow", 0.3), check("fast", 0), check("other", 0.1))
+    local_data = {"scans" : ["a_1", "b_1"]}
+
+    monkeypatch.setattr(libQC_classes, "check_workers", 1)
+    sequential = {"subBlocks" : []}
+    sub_block.runCallback(Mode.TSV, local_data, sequential)
+    monkeypatch.setattr(libQC_classes, "check_workers", 3)
+    pooled = {"subBlocks" : []}
+    sub_block.runCallback(Mode.TSV, local_data, pooled)
+
+    # Same result, in the checks order, and one timing record by check
+    assert pooled["subBlocks"][0]["data"][0]["dataframe"].equals(sequential["subBlocks"][0]["data"][0]["dataframe"])
+    assert list(pooled["subBlocks"][0]["data"][0]["dataframe"].columns) == ["scan_id", "slow", "fast", "other"]
+    assert [t["check"] for t in pooled["timings"]] == ["slow", "fast", "other"]
+    assert all(t["sub_block"] == "sub" and t["status"] == "ok" for t in pooled["timings"])
+    assert pooled["timings"][0]["seconds"] >= 0.3 and pooled["timings"][1]["seconds"] < 0.3
+
+    # The first failing check is raised once all the checks ended, all of them are timed
+    sub_block.addChecks(check("failing", 0, fail=True), check("failing_too", 0, fail=True))
+    failing = {"subBlocks" : []}
+    with pytest.raises(ValueError, match="^failing failed$") :
+        sub_block.runCallback(Mode.TSV, local_data, failing)
+    assert [t["status"] for t in failing["timings"]] == ["ok", "ok", "ok", "error", "error"]
+    assert failing["subBlocks"] == []
+
+def test_zooscan_checks_pool(dash_duo, monkeypatch) :
+    import libQC_classes
+    from libQC_zooscan import Lib_zooscan
+    monkeypatch.setattr(localData, "cache_path", "")
+    block = Lib_zooscan().lib.getBlock("during_analysis")
+    for project in ["test_subBlock_acquisition_check_sieve_bug_3", "test_subBlock_acquisition_check_motoda_check_1"] :
+        monkeypatch.setattr(libQC_classes, "check_workers", 1)
+        sequential = block.runProject(project, "Zooscan_test")[1]
+        # The real checks of a sub block read the same project tables at the same time
+        monkeypatch.setattr(libQC_classes, "check_workers", 8)
+        local_data = localData.getdata(block.mode, "Zooscan_test/" + project, **block.requirements())
+        for sub_block, sub_block_sequential in zip(block.subBlocks, sequential["subBlocks"]) :
+            pooled = {"subBlocks" : []}
+            sub_block.runCallback(block.mode, local_data, pooled)
+            assert [t["status"] for t in pooled["timings"]] == ["ok"] * len(sub_block.checks)
+            for result_pooled, result_sequential in zip(pooled["subBlocks"][0]["data"], sub_block_sequential["data"]) :
+                assert result_pooled["dataframe"].equals(result_sequential["dataframe"])
+        assert len(sequential["subBlocks"]) == len(block.subBlocks)
+
+def test_block_progress(dash_duo, tmp_path, monkeypatch) :
+    import libQC_classes
+    from libQC_zooscan import Lib_zooscan
+    monkeypatch.setattr(localData, "base_path", str(tmp_path) + "/")
+    monkeypatch.setattr(localData, "cache_path", "")
+    work = tmp_path / "drive" / "Zooscan_a" / "Zooscan_scan" / "_work"
+    work.mkdir(parents=True)
+    _write_scan(work, "wp_d1_1", "wp")
+    block = Lib_zooscan().lib.getBlock("during_analysis")
+    nb_checks = len([check for sub_block in block.subBlocks for check in sub_block.checks])
+    projects = ["Zooscan_a", "Zooscan_missing"]
+
+    for workers in [1, 2] :
+        monkeypatch.setattr(libQC_classes, "project_workers", workers)
+        steps = []
+        block.runCallback(projects, "drive", lambda done, total, step : steps.append((done, total, step)))
+        # Always increasing up to the total number of checks, eatch project end is reported
+        assert [done for done, total, step in steps] == sorted(done for done, total, step in steps)
+        assert all(total == 2 * nb_checks for done, total, step in steps)
+        assert steps[-1][0] == 2 * nb_checks
+        assert set(projects) <= set(step for done, total, step in steps)
+        if workers == 1 :
+            # One step by check of the project that runs, its checks are named
+            assert len(steps) == nb_checks + 2
+            assert steps[0][2].startswith("Zooscan_a : ")
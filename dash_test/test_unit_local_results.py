@@ -0,0 +1,63 @@
+# 1. imports of dash app
+from dash.testing.application_runners import import_app
+import pandas as pd
+import pytest
+import componants
+import localResults
+import pdf_generator
+from enums import SUPPORTED_DATA_COMPONANT
+
+
+def test_results_store(dash_duo, tmp_path, monkeypatch) :
+    monkeypatch.setattr(localResults, "results_path", str(tmp_path / "results"))
+    df = pd.DataFrame({"List scan ID" : ["wp_d1_1", "wp_d2_1"], "RAW files" : ["Files OK", "#MISSING FILE"]})
+    pdfs_data = [{"project" : project, "subBlocks" : [{"title" : "process", "data" : [{"dataframe" : df, "type" : SUPPORTED_DATA_COMPONANT.DATA_TABLE}]}]}
+                 for project in ["Zooscan_a", "Zooscan_b"]]
+
+    # The page only gets the run id, the results are read back project by project
+    run_id = localResults.save(pdfs_data)
+    assert isinstance(run_id, str)
+    assert localResults.exists(run_id)
+    projects = list(localResults.projects(run_id))
+    assert [data["project"] for data in projects] == ["Zooscan_a", "Zooscan_b"]
+    assert projects[1]["subBlocks"][0]["data"][0]["dataframe"].equals(df)
+    assert projects[1]["subBlocks"][0]["data"][0]["type"] == SUPPORTED_DATA_COMPONANT.DATA_TABLE
+
+    # An empty run, an unknown run
+    assert list(localResults.projects(localResults.save([]))) == []
+    assert not localResults.exists("unknown")
+    with pytest.raises(KeyError) :
+        list(localResults.projects("unknown"))
+
+    # The reports are generated as the projects are read
+    generated = []
+    monkeypatch.setattr(pdf_generator, "generate_project", lambda data : generated.append(data["project"]))
+    pdf_generator.generate(localResults.projects(run_id))
+    assert generated == ["Zooscan_a", "Zooscan_b"]
+
+
+def test_results_table(dash_duo, tmp_path, monkeypatch) :
+    monkeypatch.setattr(localResults, "results_path", str(tmp_path / "results"))
+    dfs = [pd.DataFrame({"List scan ID" : [project + "_" + str(i)]}) for project in ["a", "b"] for i in range(2)]
+    run_id = localResults.save({"project" : project, "subBlocks" : [{"title" : "sub " + str(j), "data" : [{"dataframe" : dfs[2 * i + j], "type" : "DataTable"}]} for j in range(2)]}
+                               for i, project in enumerate(["Zooscan_a", "Zooscan_b"]))
+    assert localResults.table(run_id, "Zooscan_b", 1, 0).equals(dfs[3])
+    assert localResults.table(run_id, "Zooscan_a", 0, 0).equals(dfs[0])
+    with pytest.raises(KeyError) :
+        localResults.table("unknown", "Zooscan_a", 0, 0)
+
+
+def test_results_layout(dash_duo, tmp_path, monkeypatch) :
+    monkeypatch.setattr(localResults, "results_path", str(tmp_path / "results"))
+    df = pd.DataFrame({"List scan ID" : ["wp_d1_1", "wp_d2_1"], "RAW files" : ["Files OK", "#MISSING FILE"]})
+    layout = [componants.qc_execution_result("Zooscan_a", [componants.sub_block_execution_result("process", [{"dataframe" : df, "type" : SUPPORTED_DATA_COMPONANT.DATA_TABLE}], "Zooscan_a", 0)])]
+
+    # The layout of the result is kept with the run, the page only gets the run id
+    run_id = localResults.save([{"project" : "Zooscan_a", "subBlocks" : []}], layout)
+    assert localResults.project_names(run_id) == ["Zooscan_a"]
+    assert str(localResults.layout(run_id)) == str(layout)
+    empty_run = localResults.save([], componants.emptyResult("during_analysis", []))
+    assert localResults.project_names(empty_run) == []
+    assert str(localResults.layout(empty_run)) == str(componants.emptyResult("during_analysis", []))
+    with pytest.raises(KeyError) :
+        localResults.layout("unknown")
@@ -0,0 +1,71 @@
+# 1. imports of dash app
+from dash.testing.application_runners import import_app
+import os
+from datetime import datetime
+import pandas as pd
+import pytest
+from fpdf import FPDF, FPDF_VERSION
+import pdf_generator
+
+
+def test_split_cell_text(dash_duo, monkeypatch) :
+    monkeypatch.setattr(pdf_generator, "_cell_lines", {})
+    pdf = FPDF('L', 'mm', 'A4')
+    pdf.add_page()
+    pdf.set_font('helvetica', '', 10)
+    col_width = pdf.epw / 10
+    # Same lines as multi_cell, the text fitting in the cell or not, with line breaks or not
+    for text in ["", "Files OK", "#MISSING ecotaxa table", "#SIEVE different from others (d1)", "a\nb", "wp_d1_1_with_a_very_long_scan_id_1", "Ratio OK\n"] :
+        assert pdf_generator.split_cell_text(pdf, text, col_width) == tuple(pdf.multi_cell(col_width, pdf.font_size, text, split_only=True))
+    # Lines are kept by font and width
+    assert ("helvetica", "", 10, col_width, "Files OK") in pdf_generator._cell_lines
+    pdf.set_font('helvetica', 'B', 10)
+    assert pdf_generator.split_cell_text(pdf, "#MISSING ecotaxa table", col_width / 2) == tuple(pdf.multi_cell(col_width / 2, pdf.font_size, "#MISSING ecotaxa table", split_only=True))
+    assert ("helvetica", "B", 10, col_width / 2, "#MISSING ecotaxa table") in pdf_generator._cell_lines
+
+
+def test_write_datatable(dash_duo, monkeypatch) :
+    monkeypatch.setattr(pdf_generator, "set_font_size", lambda pdf, weight, size : pdf.set_font('helvetica', weight, size))
+    pdf = FPDF('L', 'mm', 'A4')
+    pdf.add_page()
+    pdf.set_font('helvetica', '', 12)
+    df = pd.DataFrame({"List scan ID" : ["wp_d" + str(i) + "_1" for i in range(100)], "RAW files" : ["Files OK", "#MISSING\n#DUPLICATE"] * 50})
+    pdf_generator.write_multiline_datatable(pdf, df)
+    # The header and 50 rows of one line and 50 of two lines : all the rows on pages of about 35 lines
+    assert pdf.page == 5
+    assert pdf.x == pdf.l_margin
+
+
+def test_generate_pool(dash_duo, tmp_path, monkeypatch) :
+    # Core font : the workers are forked with the patched module
+    monkeypatch.setattr(pdf_generator, "FONTS", [])
+    monkeypatch.setattr(pdf_generator, "set_font_size", lambda pdf, weight, size : pdf.set_font('helvetica', weight, size))
+    monkeypatch.setattr(pdf_generator.localData, "base_path", str(tmp_path) + "/")
+    monkeypatch.setattr(pdf_generator, "pdf_workers", 2)
+    df = pd.DataFrame({"List scan ID" : ["wp_d1_1", "wp_d2_1"], "RAW files" : ["Files OK", "#MISSING FILE"]})
+    projects = ["Zooscan_" + str(i) for i in range(5)]
+    pdf_generator.generate({"project" : project, "path" : "drive/" + project + "/", "title" : "QC_" + project,
+                            "subBlocks" : [{"title" : "process", "data" : [{"dataframe" : df, "type" : "DataTable"}]}]} for project in projects)
+    for project in projects :
+        assert (tmp_path / "drive" / project / "Zooscan_reports" / ("QC_" + project + ".pdf")).stat().st_size > 0
+
+
+def _report(texts):
+    """Return the bytes of a report of the given texts, written with the report fonts"""
+    pdf = pdf_generator.create_pdf_report_for_project("Zooscan_test")
+    pdf.set_creation_date(datetime(2022, 1, 1))
+    pdf_generator.write_multiline_datatable(pdf, pd.DataFrame({"List scan ID" : ["wp_d1_1", "wp_d2_1"], "RAW files" : texts}))
+    return bytes(pdf.output())
+
+
+@pytest.mark.skipif(not all(os.path.exists(fname) for family, style, fname in pdf_generator.FONTS), reason="report fonts not installed")
+def test_shared_report_fonts(dash_duo, monkeypatch) :
+    assert FPDF_VERSION == pdf_generator.FONTS_CACHE_FPDF_VERSION, "add_report_fonts to check against the FPDF.add_font of this fpdf2 version"
+    texts = [["Files OK", "#MISSING FILE"], ["Ratio OK", "#SIEVE différent (d1) µm"]]
+    # Two reports of the same process share the parsed fonts, eatch embedding the subset of its own glyphs
+    monkeypatch.setattr(pdf_generator, "_fonts", {})
+    shared = [_report(report_texts) for report_texts in texts]
+    assert len(pdf_generator._fonts) == len(pdf_generator.FONTS)
+    # Same reports as with the fonts parsed for eatch report
+    monkeypatch.setattr(pdf_generator, "add_report_fonts", lambda pdf : [pdf.add_font(family, style=style, fname=fname) for family, style, fname in pdf_generator.FONTS])
+    assert shared == [_report(report_texts) for report_texts in texts]
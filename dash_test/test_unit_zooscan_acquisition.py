@@ -123,10 +123,10 @@ def test_subBlock_acquisition_check_motoda_check(dash_duo) :
     res_3 = impl.check_motoda_check("check_motoda_check", Mode.TSV, data_3) 
     # "#Motoda identical": if acq_sub_part is identical throughout the project
     ## wp_d1_1
-    assert res_3.loc[res_3["List scan ID"]=="wp_d1_1"]["MOTODA Fraction"].values[0] == "4"
+    assert res_3.loc[res_3["List scan ID"]=="wp_d1_1"]["MOTODA Fraction"].values[0] == 4
     assert res_3.loc[res_3["List scan ID"]=="wp_d1_1"]["MOTODA check"].values[0] == "#Identical Motoda"
     ## wp_d2_1
-    assert res_3.loc[res_3["List scan ID"]=="wp_d2_1"]["MOTODA Fraction"].values[0] == "4"
+    assert res_3.loc[res_3["List scan ID"]=="wp_d2_1"]["MOTODA Fraction"].values[0] == 4
     assert res_3.loc[res_3["List scan ID"]=="wp_d2_1"]["MOTODA check"].values[0] == "#Identical Motoda"
 
     project_4="Zooscan_test/test_subBlock_acquisition_check_motoda_check_4" 
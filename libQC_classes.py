@@ -5,10 +5,26 @@ import pandas as pd
 import time
 import labels
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
+from types import MappingProxyType
 
 now= datetime.now()
 logging.basicConfig(filename="logs/"+str(now.year)+"-"+str(now.month)+".log", level = logging.INFO, format="%(asctime)s | %(levelname)s | %(threadName)s |%(message)s")
 
+# Number of projects run at the same time by a block, in a pool of processes (1 to run them one after another)
+try :
+    project_workers = int(os.environ['QC_PROJECT_WORKERS'])
+except :
+    project_workers = min(4, os.cpu_count() or 1)
+
+# Number of checks of a sub block run at the same time, in a pool of threads sharing the project data (1 to run them one after another)
+try :
+    check_workers = int(os.environ['QC_CHECK_WORKERS'])
+except :
+    check_workers = min(8, (os.cpu_count() or 1) + 4)
+
 class ChecksLib():
     def __init__(self):
         self.blocks = []
@@ -19,9 +35,9 @@ class ChecksLib():
     def getBlock(self, _id):
         return next((x for x in self.blocks if x.id == _id), None)
 
-    def runCallback(self, projects, drive, block_id):
+    def runCallback(self, projects, drive, block_id, progress=None):
         block = self.getBlock(block_id)
-        QC_execution = block.runCallback(projects, drive)
+        QC_execution = block.runCallback(projects, drive, progress)
         return QC_execution
 
     def listChecks(self):
@@ -42,38 +58,93 @@ class Block:
     def getSubBlock(self, _id):
         return next((x for x in self.subBlocks if x.id == _id), None)
 
-    def runCallback(self, projects, drive):
-        """Run block's QC, and return execution result as dash componants"""
+    def runCallback(self, projects, drive, progress=None):
+        """Run block's QC, and return execution result as dash componants.
+        progress, if given, is called with the number of checks done, the total number of checks and the last project / check done"""
         QC_execution = {"dash" : [], "pdf" : []}
         logging.info("--- run for {} projects : {} ---".format(len(projects), projects))
-        for project in projects:
-            start_time = time.time()
-            pdf = {"project" : project, 
-                   "subBlocks" : []}
-            try :
-                # Get data
-                local_data = localData.getdata(self.mode, drive + "/" + project)
-                logging.info("--- Get local data for project '{}' in : {} seconds ---".format(project, time.time() - start_time))
-                #If critical status error  : generate associated result componant
-                if labels.errors["global.missing_directory.work"] in local_data["dataframe"]["STATUS"].values :
-                    qcExecutionData="The QC can't execute for this project because of : "+ local_data["dataframe"]["STATUS"][0]
-                else : 
-                    # Run blocks
-                    qcExecutionData = [subBlock.runCallback(self.mode, local_data, pdf) for subBlock in self.subBlocks]
-            except Exception as e:
-                qcExecutionData="The QC can't execute for this project because of : "+ str(e)
-                logging.warning("***** runCallback error for project '{}' : {}".format(project, e))
-            
+        for project, (qcExecutionData, pdf) in zip(projects, self.runProjects(projects, drive, progress)):
             # Generate and agregate dash componants
             QC_execution["dash"].append(componants.qc_execution_result(project, qcExecutionData))
 
             # Save the created pdf 
-            pdf["path"]=drive + "/" + project+ "/"
-            pdf["title"] = "QC_"+self.title+"_"+project+"_"+str(datetime.now())
-            QC_execution["pdf"].append(pdf)
+            QC_execution["pdf"].append(self.setPdfDestination(pdf, project, drive))
 
         return QC_execution
 
+    def setPdfDestination(self, pdf, project, drive):
+        """Set the folder and the title of the pdf report of a project, and return its pdf data"""
+        pdf["path"]=drive + "/" + project+ "/"
+        pdf["title"] = "QC_"+self.title+"_"+project+"_"+str(datetime.now())
+        return pdf
+
+    def runProjects(self, projects, drive, progress=None):
+        """Run block's QC on the given projects, project_workers of them at the same time in separate processes. 
+        Return the execution result and the pdf data of eatch project, in the same order"""
+        nb_checks = len([check for subBlock in self.subBlocks for check in subBlock.checks])
+        total = len(projects) * nb_checks
+        done = 0
+        def checkDone(project, check):
+            nonlocal done
+            done += 1
+            progress(done, total, project + " : " + check.title)
+        def projectDone(nb_projects_done, project):
+            # Checks not run (project in error) are counted as done too
+            nonlocal done
+            done = nb_projects_done * nb_checks
+            if progress is not None :
+                progress(done, total, project)
+
+        if project_workers <= 1 or len(projects) <= 1 :
+            results = []
+            for project in projects :
+                results.append(self.runProject(project, drive, None if progress is None else partial(checkDone, project)))
+                projectDone(len(results), project)
+            return results
+        results = [None] * len(projects)
+        with ProcessPoolExecutor(max_workers=min(project_workers, len(projects))) as executor :
+            # Checks run in the workers are not reported one by one, only their project is once it ends
+            futures = {executor.submit(self.runProject, project, drive) : i for i, project in enumerate(projects)}
+            for nb_projects_done, future in enumerate(as_completed(futures), 1) :
+                project = projects[futures[future]]
+                try :
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    # The worker process itself failed (killed, result that can't be sent back...) : only its project is in error
+                    results[futures[future]] = ("The QC can't execute for this project because of : "+ str(e), {"project" : project, "subBlocks" : [], "timings" : []})
+                    logging.warning("***** runCallback worker error for project '{}' : {}".format(project, e))
+                projectDone(nb_projects_done, project)
+        return results
+
+    def runProject(self, project, drive, check_done=None):
+        """Run block's QC on one project, and return the execution result (dash componants or error message) and the pdf data.
+        check_done, if given, is called with eatch check once it ran"""
+        start_time = time.time()
+        pdf = {"project" : project, 
+               "subBlocks" : [],
+               "timings" : []}
+        try :
+            # Get data, only the scans modified since the previous execution are read again
+            # Only the data needed by the block's checks are loaded
+            local_data = localData.getdata(self.mode, drive + "/" + project, incremental=True, **self.requirements())
+            logging.info("--- Get local data for project '{}' in : {} seconds ---".format(project, time.time() - start_time))
+            #If critical status error  : generate associated result componant
+            if labels.errors["global.missing_directory.work"] in local_data["dataframe"]["STATUS"].values :
+                qcExecutionData="The QC can't execute for this project because of : "+ local_data["dataframe"]["STATUS"][0]
+            else : 
+                # Run blocks
+                qcExecutionData = [subBlock.runCallback(self.mode, local_data, pdf, check_done) for subBlock in self.subBlocks]
+        except Exception as e:
+            qcExecutionData="The QC can't execute for this project because of : "+ str(e)
+            logging.warning("***** runCallback error for project '{}' : {}".format(project, e))
+        # Peak memory of the process that ran the project
+        pdf["peak_memory_mb"] = localData.peakMemory()
+        return qcExecutionData, pdf
+
+    def requirements(self):
+        """Return the data needed by the block's checks, as localData.getdata arguments"""
+        return dataRequirements([check for subBlock in self.subBlocks for check in subBlock.checks])
+
     def listChecks(self):
         return {
             "title": self.title,
@@ -96,26 +167,59 @@ class SubBlock:
     def getCheck(self, _id):
         return next((x for x in self.checks if x.id == _id), None)
 
-    def runCallback(self, mode, local_data, pdf):
+    def runCallback(self, mode, local_data, pdf, check_done=None):
         """Run sub block's QC, save the result in project forlder and return execution result as dash componants"""
         # For eatch checks of this sub block, run its callback and store the result in frames array.
-        frames = [{"type": check.type, "fig_number" : check.fig_number, "data" : check.callback(check.id, mode, local_data) } for check in self.checks]
+        frames = [{"type": check.type, "fig_number" : check.fig_number, "data" : data} for check, data in zip(self.checks, self.runChecks(mode, local_data, pdf, check_done))]
         result=[]
         # Concat all frame concat depending fig nb to create a unique result dataframe for this sub block. 
         for nb in range(1, self.number_of_fig+1):
             frames_for_fig_n = [d for d in frames if d['fig_number'] == nb]
             type_for_fig_n=list(set([frame["type"] for frame in frames_for_fig_n]))
             dataframe_for_fig_n=[frame["data"] for frame in frames_for_fig_n]
-            result.append({"dataframe" : pd.concat(dataframe_for_fig_n).groupby([dataframe_for_fig_n[0].columns[0]]).first().reset_index(), "type" : type_for_fig_n[0]})
+            result.append({"dataframe" : pd.concat(dataframe_for_fig_n).groupby([dataframe_for_fig_n[0].columns[0]], observed=True).first().sort_index().reset_index(), "type" : type_for_fig_n[0]})
 
         # Save the result of the execution as html in the project folder
         pdf["subBlocks"].append({"title" : self.title, "data" : result})
 
         # Generate the dash layout, depending on execution result type
-        resultLayout = componants.sub_block_execution_result(self.title, result)
+        resultLayout = componants.sub_block_execution_result(self.title, result, pdf.get("project", ""), len(pdf["subBlocks"]) - 1)
 
         return resultLayout
 
+    def runChecks(self, mode, local_data, pdf, check_done=None):
+        """Run the callbacks of the sub block's checks, check_workers of them at the same time on the same read only project data.
+        Return their results in the checks order, and add the execution time of eatch check to pdf["timings"]"""
+        outcomes = [None] * len(self.checks)
+        if check_workers <= 1 or len(self.checks) <= 1 :
+            local_data = MappingProxyType(local_data)
+            for i, check in enumerate(self.checks) :
+                outcomes[i] = runCheck(check, mode, local_data)
+                if check_done is not None :
+                    check_done(check)
+        else :
+            with ThreadPoolExecutor(max_workers=min(check_workers, len(self.checks)), thread_name_prefix="check") as executor :
+                futures = {executor.submit(runCheck, check, mode, checkData(local_data)) : i for i, check in enumerate(self.checks)}
+                # Checks are collected as soon as they end, a slow one does not delay the others
+                for future in as_completed(futures) :
+                    outcomes[futures[future]] = future.result()
+                    if check_done is not None :
+                        check_done(self.checks[futures[future]])
+
+        timings = [dict(timing, sub_block=self.id) for data, timing, error in outcomes]
+        pdf.setdefault("timings", []).extend(timings)
+        logging.info("-- TIME : {} : {} : {}".format(self.id, mode, ", ".join("{} {:.3f}s {}".format(t["check"], t["seconds"], t["status"]) for t in timings)))
+
+        # Same error as a run one check after another : the one of the first failing check of the sub block
+        errors = [error for data, timing, error in outcomes if error is not None]
+        if errors :
+            raise errors[0]
+        return [data for data, timing, error in outcomes]
+
+    def requirements(self):
+        """Return the data needed by the sub block's checks, as localData.getdata arguments"""
+        return dataRequirements(self.checks)
+
     def listChecks(self):
         return {
             "title": self.title,
@@ -126,13 +230,20 @@ class SubBlock:
 
 
 class Check:
-    def __init__(self, _title, _description, _id, _type, _fig_number, _callback):
+    def __init__(self, _title, _description, _id, _type, _fig_number, _callback, _tsv_cols=(), _fs_areas=(), _meta_fields=(), _per_object_rows=False):
         self.title = _title
         self.description = _description
         self.id = _id
         self.fig_number=_fig_number
         self.type = _type
         self.callback = _callback
+        # Data used by the callback : ecotaxa tables columns (scan_id and STATUS are always there), 
+        # file system areas (keys of localData.FS_AREAS) and meta.txt fields
+        self.tsv_cols = list(_tsv_cols)
+        self.fs_areas = list(_fs_areas)
+        self.meta_fields = list(_meta_fields)
+        # False if the callback only uses per scan constant fields of the ecotaxa tables : their first object is enough
+        self.per_object_rows = _per_object_rows
 
     def listChecks(self):
         return {
@@ -142,6 +253,34 @@ class Check:
         }
 
 
+def checkData(local_data):
+    """Return the project data given to a check run in a thread : read only, with its own shallow copy of eatch table.
+    The copies share the values of the project tables, not their pandas state (block consolidation, columns cache) that changes when a table is read"""
+    return MappingProxyType({key : value.copy(deep=False) if isinstance(value, (pd.DataFrame, pd.Series)) else value for key, value in local_data.items()})
+
+def runCheck(check, mode, local_data):
+    """Run the callback of a check, and return its result, its timing record and the raised exception (None if it succeeded)"""
+    data, error = None, None
+    start_time = time.perf_counter()
+    try :
+        data = check.callback(check.id, mode, local_data)
+    except Exception as e:
+        error = e
+    timing = {"check" : check.id,
+              "seconds" : time.perf_counter() - start_time,
+              "status" : "ok" if error is None else "error"}
+    return data, timing, error
+
+
+def dataRequirements(checks):
+    """Return the union of the data needed by the given checks, as localData.getdata arguments"""
+    cols = set(col for check in checks for col in check.tsv_cols)
+    return {"first_row_only" : not any(check.per_object_rows for check in checks),
+            "cols" : [col for col in localData.TSV_COLS if col in cols] + sorted(cols - set(localData.TSV_COLS)),
+            "fs_areas" : sorted(set(area for check in checks for area in check.fs_areas)),
+            "meta_fields" : sorted(set(field for check in checks for field in check.meta_fields))}
+
+
 class result:
     def __init__(self, _status, _dataframe):
         self.status = _status
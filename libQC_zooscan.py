@@ -22,20 +22,20 @@ class Lib_zooscan():
       
 
       #Create checks
-      check_frame_type = Check("FRAME type", libQC_zooscan_implementation.check_frame_type.__doc__ , "frame_type", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_frame_type)
-      check_raw_files = Check("RAW files", libQC_zooscan_implementation.check_raw_files.__doc__ , "raw_files", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_raw_files)
-      check_scan_weight = Check("SCAN weight",  libQC_zooscan_implementation.check_scan_weight.__doc__ , "scan_weight", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_scan_weight)
-      check_process_post_scan = Check("Process POST SCAN", libQC_zooscan_implementation.check_process_post_scan.__doc__ , "process_post_scan", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_process_post_scan)
-      check_bw_ratio = Check("B/W ratio", libQC_zooscan_implementation.check_bw_ratio.__doc__ , "bw_ratio", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_bw_ratio)
-      check_pixel_size = Check("PIXEL size",  libQC_zooscan_implementation.check_pixel_size.__doc__ , "pixel_size", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_pixel_size)
-      check_sep_mask = Check("SEP MASK", libQC_zooscan_implementation.check_sep_mask.__doc__ , "sep_mask", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1,  libQC_zooscan_implementation.check_sep_mask)
-      check_process_post_sep = Check("Process POST SEP",  libQC_zooscan_implementation.check_process_post_sep.__doc__ , "process_post_sep", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_process_post_sep)
+      check_frame_type = Check("FRAME type", libQC_zooscan_implementation.check_frame_type.__doc__ , "frame_type", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_frame_type, _tsv_cols=['process_img_background_img'], _fs_areas=["Zooscan_config"])
+      check_raw_files = Check("RAW files", libQC_zooscan_implementation.check_raw_files.__doc__ , "raw_files", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_raw_files, _fs_areas=["_raw"])
+      check_scan_weight = Check("SCAN weight",  libQC_zooscan_implementation.check_scan_weight.__doc__ , "scan_weight", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_scan_weight, _fs_areas=["_raw"])
+      check_process_post_scan = Check("Process POST SCAN", libQC_zooscan_implementation.check_process_post_scan.__doc__ , "process_post_scan", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_process_post_scan, _fs_areas=["_work"])
+      check_bw_ratio = Check("B/W ratio", libQC_zooscan_implementation.check_bw_ratio.__doc__ , "bw_ratio", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_bw_ratio, _tsv_cols=['process_particle_bw_ratio'])
+      check_pixel_size = Check("PIXEL size",  libQC_zooscan_implementation.check_pixel_size.__doc__ , "pixel_size", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_pixel_size, _tsv_cols=['process_particle_pixel_size_mm', 'process_img_resolution'])
+      check_sep_mask = Check("SEP MASK", libQC_zooscan_implementation.check_sep_mask.__doc__ , "sep_mask", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1,  libQC_zooscan_implementation.check_sep_mask, _tsv_cols=['acq_sub_part'], _fs_areas=["_work"])
+      check_process_post_sep = Check("Process POST SEP",  libQC_zooscan_implementation.check_process_post_sep.__doc__ , "process_post_sep", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_process_post_sep, _tsv_cols=['process_particle_sep_mask'])
    
-      check_sieve_bug = Check("Sieve Bug", libQC_zooscan_implementation.check_sieve_bug.__doc__, "sieve_bug", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_sieve_bug)
-      check_motoda_check = Check("MOTODA check", libQC_zooscan_implementation.check_motoda_check.__doc__, "motoda_check", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_motoda_check)
-      check_motoda_comparaison = Check("MOTODA comparison", libQC_zooscan_implementation.check_motoda_comparaison.__doc__, "motoda_comparaison", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_motoda_comparaison)
-      check_motoda_quality = Check("MOTODA quality", libQC_zooscan_implementation.check_motoda_quality.__doc__, "motoda_quality", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_motoda_quality)
-      check_spelling= Check("Spelling", libQC_zooscan_implementation.check_spelling.__doc__, "spelling", SUPPORTED_DATA_COMPONANT.DATA_TABLE_XS, 2, libQC_zooscan_implementation.check_spelling)
+      check_sieve_bug = Check("Sieve Bug", libQC_zooscan_implementation.check_sieve_bug.__doc__, "sieve_bug", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_sieve_bug, _tsv_cols=['acq_min_mesh', 'acq_max_mesh', 'sample_id'])
+      check_motoda_check = Check("MOTODA check", libQC_zooscan_implementation.check_motoda_check.__doc__, "motoda_check", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_motoda_check, _tsv_cols=['acq_sub_part', 'sample_net_type'])
+      check_motoda_comparaison = Check("MOTODA comparison", libQC_zooscan_implementation.check_motoda_comparaison.__doc__, "motoda_comparaison", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_motoda_comparaison, _tsv_cols=['acq_sub_part', 'sample_comment', 'sample_id'], _meta_fields=["Sample_comment", "Observation"])
+      check_motoda_quality = Check("MOTODA quality", libQC_zooscan_implementation.check_motoda_quality.__doc__, "motoda_quality", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.check_motoda_quality, _tsv_cols=['sample_net_type', 'acq_sub_part'], _fs_areas=["_work"])
+      check_spelling= Check("Spelling", libQC_zooscan_implementation.check_spelling.__doc__, "spelling", SUPPORTED_DATA_COMPONANT.DATA_TABLE_XS, 2, libQC_zooscan_implementation.check_spelling, _tsv_cols=['sample_scan_operator', 'acq_sub_method'])
 
       checks_gps = Check("GPS", libQC_zooscan_implementation.noCb.__doc__ , "GPS", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.noCb)
       checks_date = Check("Check sampling dates", libQC_zooscan_implementation.noCb.__doc__ , "Dates", SUPPORTED_DATA_COMPONANT.DATA_TABLE, 1, libQC_zooscan_implementation.noCb)
@@ -62,6 +62,6 @@ class Lib_zooscan():
       """Return an object containing all availables quallity checks"""
       return self.lib.listChecks()
    
-   def runCallback(self, projects, drive, block_id):
+   def runCallback(self, projects, drive, block_id, progress=None):
       """Run block's QC, and return execution result as dash componants"""
-      return self.lib.runCallback(projects, drive, block_id)
\ No newline at end of file
+      return self.lib.runCallback(projects, drive, block_id, progress)
\ No newline at end of file
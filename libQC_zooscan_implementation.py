@@ -1,7 +1,7 @@
 import labels
-import time
+import localData
 import numpy as np
-import re
+import pandas as pd
 import logging
 from datetime import datetime
 
@@ -10,36 +10,64 @@ logging.basicConfig(filename="logs/"+str(now.year)+"-"+str(now.month)+".log", le
 
 #### TOOLS
 
-def is_float(value):
-    """Return true if value is a float else return false"""
-    try:
-        float(value)
-        return True
-    except BaseException:
-        return False
-
-def is_int(value):
-    """Return true if value is an int else return false"""
-    try:
-        int(value)
-        return True
-    except BaseException:
-        return False
-def is_not_int(value):
-    return not(is_int(value))
-
-def get_frac_id(str) : 
-    '''Return the frac id from the giver str if this one is in the non exaustive list of frac type [d1, d2, d3, dN, tot, plankton] '''
-    frac_types = ["(_d){1}([1-9])+(_){1}", "(_tot_){1}", "(_plankton_){1}"]
-
-    for element in frac_types:
-        m = re.search(element, str)
-        if m:
-            return m.group(0)
-    return "frac_type_not_handled"
-
-def is_power_of_two(n):
-    return (n & (n-1) == 0) and n != 0
+def count_by_scan(files, scan_ids, **flags):
+    """Return for eatch of the given scan ids the number of files flagged by eatch of the given boolean arrays, 
+    files being grouped in one pass on their scan_id column. Return a dictionary {flag name : array of counts}"""
+    counts = pd.DataFrame(flags, index=files.index).groupby(np.asarray(files["scan_id"].values, dtype=object)).sum()
+    counts = counts.reindex(scan_ids, fill_value=0)
+    return {name : counts[name].values for name in flags}
+
+def number_or_label(data, col):
+    """Return the values of a numeric column of the ecotaxa tables (see localData.TSV_NUMERIC_COLS) as an object array :
+    the number, or the text of the cell if it is not a number (error label or invalid value)"""
+    return np.where(data[col].isna().values, data[col + localData.ERROR_SUFFIX].astype(object).values, data[col].astype(object).values)
+
+def numeric_status(data, col, ok_label):
+    """Return for eatch line of the given data the generic label of a numeric column of the ecotaxa tables : 
+    "#MISSING ecotaxa table", "#NOT NUMERIC" if the cell is not a number, else ok_label"""
+    status = np.where(data[col].isna().values, labels.errors["global.not_numeric"], ok_label).astype(object)
+    status[is_error(data, col, labels.errors["global.missing_ecotaxa_table"])] = labels.errors["global.missing_ecotaxa_table"]
+    return status
+
+def range_status(data, col, ok_label, ko_label, low=None, high=None):
+    """Return for eatch line of the given data the label of a numeric column of the ecotaxa tables (see localData.TSV_NUMERIC_COLS) checked against a range : 
+    "#MISSING ecotaxa table" or "#MISSING column", ok_label if the cell is a number strictly between low and high (None for no bound), 
+    else ko_label (out of range or not a number)"""
+    numbers = data[col].to_numpy(dtype=float, na_value=np.nan)
+    in_range = ~np.isnan(numbers)
+    if low is not None :
+        in_range &= numbers > low
+    if high is not None :
+        in_range &= numbers < high
+    status = np.where(in_range, ok_label, ko_label).astype(object)
+    for label in (labels.errors["global.missing_column"], labels.errors["global.missing_ecotaxa_table"]) :
+        status[is_error(data, col, label)] = label
+    return status
+
+def is_error(data, col, label):
+    """Return the mask of the lines of the given data whose numeric column col holds the given label instead of a number"""
+    return (data[col + localData.ERROR_SUFFIX] == label).values
+
+def frac_chain_pairs(data, cols):
+    """Align the dN line of eatch sample of the given data (scan_id, sample_id, frac_index and the given cols) with its dN+1 line, by a self merge.
+    Only the fractions d1, d2 ... following each other from d1 without gap are aligned, the first line of eatch fraction is used.
+    Return a dataframe with one line by pair : sample_id, frac_index (N), scan_id and cols of dN, and scan_id and cols of dN+1 suffixed by _next"""
+    chain = data[["scan_id", "sample_id", "frac_index"] + cols]
+    chain = chain.loc[chain["sample_id"].notnull() & chain["frac_index"].notnull()].drop_duplicates(["sample_id", "frac_index"])
+    chain = chain.sort_values(["sample_id", "frac_index"], kind="stable")
+    # Indexes are unique and sorted : the chain has no gap as long as dN is the Nth fraction of the sample
+    chain = chain.loc[chain["frac_index"].values == chain.groupby("sample_id", sort=False).cumcount().values + 1]
+    return chain.merge(chain.assign(frac_index=chain["frac_index"] - 1), on=["sample_id", "frac_index"], suffixes=("", "_next"))
+
+def set_frac_chain_labels(result, col, pairs, ko, pair_labels):
+    """Set in col the label of the given ko pairs (see frac_chain_pairs) to all the lines of the dN and dN+1 scans of the pair.
+    As when walking the chain from d1, the dN / dN+1 pair label wins over the dN-1 / dN one."""
+    ko_pairs = pairs.loc[ko].assign(label=np.asarray(pair_labels, dtype=object)[ko])
+    updates = pd.concat([ko_pairs[["sample_id", "frac_index", "scan_id_next", "label"]].rename(columns={"scan_id_next" : "scan_id"}),
+                         ko_pairs[["sample_id", "frac_index", "scan_id", "label"]]])
+    updates = updates.sort_values(["sample_id", "frac_index"], kind="stable").drop_duplicates("scan_id", keep="last").set_index("scan_id")["label"]
+    to_update = result["scan_id"].isin(updates.index)
+    result.loc[to_update, col] = result.loc[to_update, "scan_id"].map(updates).values
 
 def independent_concat(df1_max, col1, df2_min, col2): 
     ''' set the df2_min size of a collumn in order to integrate it into de bigger df'''
@@ -74,15 +102,13 @@ def check_frame_type(_id, _mode, local_data):
         - "#MISSING column" : if process_img_background_img column is missing from the ecotaxa.tsv table
         - "#Frame NOT OK" : if any other issue
     """
-    start_time = time.time()
 
     # Get only usefull columns
     result = local_data.get("dataframe")[['scan_id', 'process_img_background_img']]
 
     # Get only usefull file name : .ini in Zooscan_config folder
     fs = local_data.get("fs")
-    dataToTest = fs.loc[([True if "/Zooscan_config/" in i else False for i in fs['path'].values])
-                        & (fs['extension'].values == "ini"), ["name", "extension"]].name.values
+    dataToTest = fs.loc[(fs['role'] == "ini").values, ["name", "extension"]].name.values
     ini_file_name = dataToTest[0] if len(dataToTest)==1 else ""
 
     # Replace by large or narrow or associated error code
@@ -98,7 +124,6 @@ def check_frame_type(_id, _mode, local_data):
     # Rename collums to match the desiered output
     result.rename(columns={'scan_id': 'List scan ID', 'process_img_background_img': 'Frame type'}, inplace=True)
 
-    logging.info("-- TIME : {} seconds -- : {} : {} : callback check_frame_type".format((time.time() - start_time), _id, _mode))
     return result
 
 def check_raw_files(_id, _mode, local_data):
@@ -113,53 +138,34 @@ def check_raw_files(_id, _mode, local_data):
         - "#bug RENAME ZIP FILE" : if a zip is present, but the inside name isn't the same as the zip name
         - "Files OK" :  Everything is OK, the number of files is as expected
     """
-    start_time = time.time()
 
-    # Get only usefull column size : where path contains /_raw/
+    # Get only usefull column size : files of the _raw folder
     fs = local_data.get("fs")
-    dataToTest = fs.loc[([True if "/_raw/" in i else False for i in fs['path'].values]), ["name", "extension", "inside_name"]]
+    dataToTest = fs.loc[(fs['area'] == "_raw").values, ["path", "name", "extension", "size", "mtime", "scan_id", "role"]]
+    dataToTest["inside_name"] = localData.getInsideName(dataToTest)
     result = local_data.get("dataframe")[['scan_id']].drop_duplicates()
-    result["raw_files"] = ""
 
-    # Extract scan ids
-    ids= [id[:-2] if id.endswith('_1') else id for id in result.scan_id.unique()]
-
-    # foreatch scan id
-    for id in ids:
-        datascanId = dataToTest.loc[([True if id in i else False for i in dataToTest['name'].values]), ["name", "extension", "inside_name"]]
-
-        # count of scanID_log.txt should be 1
-        count_log = datascanId.loc[datascanId.extension == "txt", 'name'].str.count("_log").sum()
-
-        # count of scanID_meta.txt should be 1
-        count_meta = datascanId.loc[datascanId.extension == "txt", 'name'].str.count("_meta").sum()
-
-        # count of sampleID_fracID_raw_1.tif and sampleID_fracID_raw_1.zip should be 1 and/or 1
-        count_raw_tif = datascanId.loc[datascanId.extension == "tif", 'name'].str.count("_raw").sum()
-        raw_zip = datascanId.loc[datascanId.extension == "zip", ['name', 'inside_name']]
-        count_raw_zip = raw_zip['name'].str.count("_raw").sum()
-
-        # if a zip is present, check that the inside name is the same as the zip name
-        if count_raw_zip == 1 and raw_zip['name'].values != raw_zip['inside_name'].values:
-            result.loc[result["scan_id"] == id + "_1", 'raw_files'] += labels.errors["process.raw_files.rename_zip"]
-
-        # if the count of files is as expected
-        elif count_log == 1 and count_meta == 1 and (count_raw_tif == 1 or count_raw_zip == 1):
-            result.loc[result["scan_id"] == id + "_1", 'raw_files'] = labels.sucess["process.raw_files.ok"]
-
-        # if less than expected
-        if count_log < 1 or count_meta < 1 or (count_raw_tif < 1 and count_raw_zip < 1):
-            result.loc[result["scan_id"] == id + "_1", 'raw_files'] += labels.errors["process.raw_files.missing"]
-
-        # if more than excepted
-        if count_log > 1 or count_meta > 1 or count_raw_tif > 1 or count_raw_zip > 1:
-            result.loc[result["scan_id"] == id + "_1", 'raw_files'] += labels.errors["process.raw_files.duplicate"]
+    # foreatch scan id : count of scanID_log.txt, scanID_meta.txt, sampleID_fracID_raw_1.tif and sampleID_fracID_raw_1.zip, and of zip with another inside name
+    role = dataToTest["role"].values
+    counts = count_by_scan(dataToTest, result["scan_id"].values, log=role == "log", meta=role == "meta", raw_tif=role == "raw_tif", raw_zip=role == "raw_zip",
+                           rename_zip=(role == "raw_zip") & (dataToTest["name"].values != dataToTest["inside_name"].values))
+    count_log, count_meta, count_raw_tif, count_raw_zip = counts["log"], counts["meta"], counts["raw_tif"], counts["raw_zip"]
+
+    # if a zip is present, check that the inside name is the same as the zip name, else check that the count of files is as expected
+    raw_files = np.select([(count_raw_zip == 1) & (counts["rename_zip"] > 0),
+                           (count_log == 1) & (count_meta == 1) & ((count_raw_tif == 1) | (count_raw_zip == 1))],
+                          [labels.errors["process.raw_files.rename_zip"], labels.sucess["process.raw_files.ok"]], "").astype(object)
+    # if less than expected
+    raw_files += np.where((count_log < 1) | (count_meta < 1) | ((count_raw_tif < 1) & (count_raw_zip < 1)), labels.errors["process.raw_files.missing"], "")
+    # if more than excepted
+    raw_files += np.where((count_log > 1) | (count_meta > 1) | (count_raw_tif > 1) | (count_raw_zip > 1), labels.errors["process.raw_files.duplicate"], "")
+    # _raw files are named after the scan id without its _1 suffix
+    result["raw_files"] = np.where(result["scan_id"].str.endswith("_1").values, raw_files, "")
     
     result.loc[result["raw_files"]=="", "raw_files"]=labels.errors["process.raw_files.inconsistent_scan_id"]
     # Rename collums to match the desiered output
     result.rename(columns={'scan_id': 'List scan ID', 'raw_files': 'RAW files'}, inplace=True)
 
-    logging.info("-- TIME : {} seconds -- : {} : {} : callback check_raw_files".format((time.time() - start_time), _id, _mode))
     return result
 
 def check_scan_weight(_id, _mode, local_data):
@@ -169,11 +175,10 @@ def check_scan_weight(_id, _mode, local_data):
         - "#BUG weight" : all these .tif have not the same weight
         - "Weight OK" : all these .tif have the same weight
     """
-    start_time = time.time()
 
     # Get only usefull column size :  where path contains /_raw/ and extension == .tif
     fs = local_data.get("fs")
-    dataToTest = fs.loc[([True if "/_raw/" in i else False for i in fs['path'].values]) & (fs['extension'].values == "tif"), "size"]
+    dataToTest = fs.loc[(fs['area'] == "_raw").values & (fs['extension'].values == "tif"), "size"]
     result = local_data.get("dataframe")[['scan_id']]
 
     # check that all these tif have the same weight
@@ -188,7 +193,6 @@ def check_scan_weight(_id, _mode, local_data):
     # Rename collums to match the desiered output
     result.rename(columns={'scan_id': 'List scan ID', 'scan_weight': 'SCAN weight'}, inplace=True)
 
-    logging.info("-- TIME : {} seconds -- : {} : {} : callback check_scan_weight".format((time.time() - start_time), _id, _mode))
     return result
 
 def check_process_post_scan(_id, _mode, local_data):
@@ -210,62 +214,40 @@ def check_process_post_scan(_id, _mode, local_data):
         - "Process OK" : if the count of files is as expected
     """
     #JCE TODO "N images named" not tested
-    start_time = time.time()
 
-    # Get only usefull column size : where path contains /_raw/
+    # Get only usefull column size : files of the _work folder
     fs = local_data.get("fs")
-    dataToTest = fs.loc[([True if "/_work/" in i else False for i in fs['path'].values]), ["path", "name", "extension", "inside_name"]]
+    dataToTest = fs.loc[fs['area'].isin(["_work", "multiples_to_separate"]).values, ["path", "name", "extension", "size", "mtime", "scan_id", "role"]]
+    dataToTest["inside_name"] = localData.getInsideName(dataToTest)
     result = local_data.get("dataframe")[['scan_id']].drop_duplicates()
-    result["process_post_scan"] = ""
-
-    # Extract scan ids
-    ids = result["scan_id"].values
-
-    # foreatch scan id
-    for id in ids:
-        #get lines related to curent id
-        datascanId = dataToTest.loc[([True if id in i else False for i in dataToTest['name'].values]), ["name", "extension", "inside_name"]]
 
-        # count of scanID.tsv should be 1
-        count_tsv = len(datascanId.loc[datascanId.extension == "tsv", 'name'])
-
-        # count of scanID_vis1.zip should be 1
-        work_zip = datascanId.loc[datascanId.extension== "zip", ['name', 'inside_name']]
-        count_work_zip = len(work_zip['name'])
-
-        # if a zip is present, check that this zip is not corrupted
-        if count_work_zip == 1 and labels.errors["global.bad_zip_file"] == work_zip['inside_name'].values:
-            result.loc[result["scan_id"] == id, 'process_post_scan'] += labels.errors["global.bad_zip_file"]
-
-        # if a zip is present, check that the inside name is the same as the zip name
-        elif count_work_zip == 1 and work_zip['name'].values+".tif" != work_zip['inside_name'].values:
-            result.loc[result["scan_id"] == id, 'process_post_scan'] += labels.errors["process.post_scan.rename_zip"]
-
-        # if the count of files is as expected
-        elif count_work_zip == 1 and count_tsv == 1 :
-            result.loc[result["scan_id"] == id, 'process_post_scan'] = labels.sucess["process.post_scan.ok"]
-
-        else :
-            # if less tsv than expected
-            if count_tsv < 1:
-                result.loc[result["scan_id"] == id, 'process_post_scan'] += labels.errors["process.post_scan.unprocessed"]
-                
-            # if more tsv than excepted
-            if count_tsv > 1:
-                result.loc[result["scan_id"] == id, 'process_post_scan'] += labels.errors["process.post_scan.duplicate.tsv"]
-
-            # if less zip than expected
-            if count_work_zip < 1:
-                result.loc[result["scan_id"] == id, 'process_post_scan'] += labels.errors["process.post_scan.missing.zip"]
-
-            # if more zip than excepted
-            if count_work_zip > 1:
-                result.loc[result["scan_id"] == id, 'process_post_scan'] += labels.errors["process.post_scan.duplicate.zip"]
+    # foreatch scan id : count of ecotaxa_scanID.tsv and of scanID_vis1.zip, corrupted or with another inside name
+    work_zip = dataToTest["extension"].values == "zip"
+    inside_name = dataToTest["inside_name"].values
+    counts = count_by_scan(dataToTest, result["scan_id"].values, tsv=dataToTest["role"].values == "tsv", work_zip=work_zip,
+                           bad_zip=work_zip & (inside_name == labels.errors["global.bad_zip_file"]),
+                           rename_zip=work_zip & (dataToTest["name"].values + ".tif" != inside_name))
+    count_tsv, count_work_zip = counts["tsv"], counts["work_zip"]
+
+    # if a zip is present, check that this zip is not corrupted, then that the inside name is the same as the zip name, then that the count of files is as expected
+    process_post_scan = np.select([(count_work_zip == 1) & (counts["bad_zip"] > 0),
+                                   (count_work_zip == 1) & (counts["rename_zip"] > 0),
+                                   (count_work_zip == 1) & (count_tsv == 1)],
+                                  [labels.errors["global.bad_zip_file"], labels.errors["process.post_scan.rename_zip"], labels.sucess["process.post_scan.ok"]], "").astype(object)
+    unexpected = process_post_scan == ""
+    # if less tsv than expected
+    process_post_scan += np.where(unexpected & (count_tsv < 1), labels.errors["process.post_scan.unprocessed"], "")
+    # if more tsv than excepted
+    process_post_scan += np.where(unexpected & (count_tsv > 1), labels.errors["process.post_scan.duplicate.tsv"], "")
+    # if less zip than expected
+    process_post_scan += np.where(unexpected & (count_work_zip < 1), labels.errors["process.post_scan.missing.zip"], "")
+    # if more zip than excepted
+    process_post_scan += np.where(unexpected & (count_work_zip > 1), labels.errors["process.post_scan.duplicate.zip"], "")
+    result["process_post_scan"] = process_post_scan
 
     # Rename collums to match the desiered output
     result.rename(columns={'scan_id': 'List scan ID', 'process_post_scan': 'POST SCAN'}, inplace=True)
 
-    logging.info("-- TIME : {} seconds -- : {} : {} : callback check_process_post_scan".format((time.time() - start_time), _id, _mode))
     return result
 
 def check_bw_ratio(_id, _mode, local_data):
@@ -277,16 +259,13 @@ def check_bw_ratio(_id, _mode, local_data):
             - "#Ratio NOK" :  if the value of the process_particle_bw_ratio in the ecotaxatable.tsv is out of range or not even a number.
             - "Ratio OK" : if the value of the process_particle_bw_ratio in the ecotaxatable.tsv is between 0 and 0,25.
     """
-    start_time = time.time()
 
     # Get only usefull columns
-    result = local_data.get("dataframe")[['scan_id', 'process_particle_bw_ratio']]
+    data = local_data.get("dataframe")
 
     # Replace by ratio OK or associated error code
-    result.process_particle_bw_ratio = result.process_particle_bw_ratio.map(lambda x: x if labels.errors["global.missing_ecotaxa_table"] == x
-                                                                            else x if x==labels.errors["global.missing_column"]
-                                                                            else labels.sucess["process.bw_ratio.ok"] if is_float(x) and float(x) < 0.25 and float(x) > 0
-                                                                            else labels.errors["process.bw_ratio.not_ok"])
+    result = data[['scan_id']].assign(process_particle_bw_ratio=range_status(data, "process_particle_bw_ratio", labels.sucess["process.bw_ratio.ok"], 
+                                                                             labels.errors["process.bw_ratio.not_ok"], low=0, high=0.25))
 
     # Keep only one line by couples : id / ratio
     result = result.drop_duplicates()
@@ -294,9 +273,11 @@ def check_bw_ratio(_id, _mode, local_data):
     # Rename collums to match the desiered output
     result.rename(columns={'scan_id': 'List scan ID', 'process_particle_bw_ratio': 'B/W ratio'}, inplace=True)
 
-    logging.info("-- TIME : {} seconds -- : {} : {} : callback check_bw_ratio".format((time.time() - start_time), _id, _mode))
     return result
 
+# Pixel size (mm) consistent with eatch scan resolution (dpi)
+PIXEL_SIZES = {300 : 0.0847, 600 : 0.0408, 1200 : 0.0204, 2400 : 0.0106, 4800 : 0.0053}
+
 def check_pixel_size(_id, _mode, local_data):
     """The idea here is to reveal an old zooprocess bug that was mistaken about the pixel size to apply for morphometric calculations. The purpose is to check that the pixel_size is consistent with the process_img_resolution. 
 
@@ -313,36 +294,24 @@ def check_pixel_size(_id, _mode, local_data):
             - "#Size NOK" : if the pixel size is not consistent with the resolution.
             - pixel size value : if the pixel size is consistent with the resolution.
     """
-    start_time = time.time()
 
-    # Get only usefull columns
-    dataToTest = local_data.get("dataframe")[['scan_id', 'process_particle_pixel_size_mm', 'process_img_resolution']].groupby('scan_id').first().reset_index()
-    result = local_data.get("dataframe")[['scan_id']].drop_duplicates()
-    result["pixel_size"] = ""
+    # Get only usefull columns, a scan is tested with the values of its first line
+    first = local_data.get("dataframe")[['scan_id', 'process_particle_pixel_size_mm', 'process_particle_pixel_size_mm_error', 'process_img_resolution']].drop_duplicates("scan_id")
+    result = first[['scan_id']].copy()
 
-    for i in range(0, len(dataToTest.scan_id)):
-        id = dataToTest.scan_id.values[i]
-        size = dataToTest.process_particle_pixel_size_mm.values[i]
-        resolution = dataToTest.process_img_resolution.values[i]
-        
-        if((size == "0.0847" and resolution == "300") 
-        or (size == "0.0408" and resolution == "600") 
-        or (size == "0.0204" and resolution == "1200")
-        or (size == "0.0106" and resolution == "2400")
-        or (size == "0.0053" and resolution == "4800")) : 
-            result.loc[result["scan_id"] == id, 'pixel_size'] = size
-        else :
-            result.loc[result["scan_id"] == id, 'pixel_size'] = labels.errors["global.missing_ecotaxa_table"] if size == labels.errors["global.missing_ecotaxa_table"] \
-                                                                else labels.errors["global.missing_column"] if size==labels.errors["global.missing_column"] \
-                                                                else labels.errors["process.pixel_size.not_ok"]
-
-    # Keep only one line by couples : id / is resolution coerent
-    result = result.drop_duplicates()
+    size = first["process_particle_pixel_size_mm"]
+    consistent = (size == first["process_img_resolution"].map(PIXEL_SIZES)).fillna(False).values.astype(bool)
+    result["pixel_size"] = np.select([consistent, 
+                                      is_error(first, "process_particle_pixel_size_mm", labels.errors["global.missing_ecotaxa_table"]), 
+                                      is_error(first, "process_particle_pixel_size_mm", labels.errors["global.missing_column"])],
+                                     [size.astype(object).values, 
+                                      labels.errors["global.missing_ecotaxa_table"], 
+                                      labels.errors["global.missing_column"]],
+                                     labels.errors["process.pixel_size.not_ok"])
 
     # Rename collums to match the desiered output
     result.rename(columns={'scan_id': 'List scan ID', 'pixel_size': 'PIXEL size'}, inplace=True)
 
-    logging.info("-- TIME : {} seconds -- : {} : {} : callback check_pixel_size".format((time.time() - start_time), _id, _mode))
     return result
 
 def check_sep_mask(_id, _mode, local_data):
@@ -352,29 +321,22 @@ def check_sep_mask(_id, _mode, local_data):
             - "#MISSING SEP MSK = (F)" : If the sep.gif mask is not present, indicate also the motoda fraction associated with the scan to eliminate the situation where there was no multiple to separate because the sample was very poor and therefore motoda = 1
             - "Sep mask OK" : If a sep.gif mask is present
     """
-    start_time = time.time()
 
     # Get only usefull column :  where path contains /_work/ and extension == .gif
     fs = local_data.get("fs")
-    dataToTest = fs.loc[([True if "/_work/" in i and "_sep" in i else False for i in fs['path'].values])
-                        & (fs['extension'].values == "gif"), ["name", "extension"]].name.values
-
-    result = local_data.get("dataframe")[['scan_id', 'acq_sub_part']].groupby('scan_id').first().reset_index()
-    result["sep_mask"] = ""
-    for id in result.scan_id:
-        if id + "_sep" in dataToTest:
-            result.loc[result["scan_id"] == id, 'sep_mask'] += labels.sucess["process.sep_mask.ok"]
-        else:
-            # get motoda frac from data
-            motoda_frac = result.loc[result["scan_id"] == id, 'acq_sub_part']
-            result.loc[result["scan_id"] == id, 'sep_mask'] = labels.errors["process.sep_mask.missing"] + " = " + motoda_frac
+    dataToTest = fs.loc[(fs['role'] == "sep_gif").values, ["name", "extension"]].name.values
+
+    data = local_data.get("dataframe")
+    result = data[['scan_id']].assign(acq_sub_part=number_or_label(data, "acq_sub_part")).groupby('scan_id', observed=True).first().sort_index().reset_index()
+    # get motoda frac from data if there is no mask
+    has_mask = np.isin((result["scan_id"].astype(str) + "_sep").values, dataToTest)
+    result["sep_mask"] = np.where(has_mask, labels.sucess["process.sep_mask.ok"], labels.errors["process.sep_mask.missing"] + " = " + result["acq_sub_part"].astype(str).values)
 
     result.drop(columns=["acq_sub_part"], inplace=True)
 
     # Rename collums to match the desiered output
     result.rename(columns={'scan_id': 'List scan ID', 'sep_mask': 'SEP MASK'}, inplace=True)
 
-    logging.info("-- TIME : {} seconds -- : {} : {} : callback check_sep_mask".format((time.time() - start_time), _id, _mode))
     return result
 
 def check_process_post_sep(_id, _mode, local_data):
@@ -386,7 +348,6 @@ def check_process_post_sep(_id, _mode, local_data):
             - "#SEP MSK NOT INCLUDED" : if process_particle_sep_mask from ecotaxa.tsv table does not contains "include"
             - "process OK" : if process_particle_sep_mask from ecotaxa.tsv table contains "include"
     """
-    start_time = time.time()
 
     # Get only usefull column : scan_id and process_particle_sep_mask
     result = local_data.get("dataframe")[['scan_id', 'process_particle_sep_mask']]
@@ -403,7 +364,6 @@ def check_process_post_sep(_id, _mode, local_data):
     # Rename collums to match the desiered output
     result.rename(columns={'scan_id': 'List scan ID', 'process_particle_sep_mask': 'POST SEP'}, inplace=True)
 
-    logging.info("-- TIME : {} seconds -- : {} : {} : callback check_process_post_sep".format((time.time() - start_time), _id, _mode))
     return result
 
 ### ACQUISITION
@@ -424,77 +384,48 @@ def check_sieve_bug(_id, _mode, local_data):
         - "#ACQ MIN (dN) ≠ ACQ MAX (dN+1)" : if for the same sampleID whose FracID = d1 or d2 or d3 (comparison between several scanIDs of the same sampleID) the acq_min (dN) ≠ acq_max (d+1)
         - "sieve OK" : If everything is OK
     """
-    start_time = time.time()
 
-    # Get only usefull columns
-    result = local_data.get("dataframe")[['scan_id', 'acq_min_mesh', 'sample_id', 'acq_max_mesh']].drop_duplicates()
-    result["fracID"] = [get_frac_id(e) for e in result["scan_id"]]
-    result['sieve_bug']=""
-
-    # Replace by sieve OK or associated error code
-    result.sieve_bug = result.acq_min_mesh.map(lambda x: x if labels.errors["global.missing_ecotaxa_table"] == x
-                                                           else labels.errors["global.not_numeric"] if not is_int(x)
-                                                           else labels.sucess["acquisition.sieve.bug.ok"]) 
-    result.loc[result["acq_max_mesh"].apply(is_not_int) & result["sieve_bug"]==labels.sucess["acquisition.sieve.bug.ok"], 'sieve_bug']=labels.errors["global.not_numeric"]
-
-    # cast the type
-    result=result.astype({"acq_min_mesh" : "int", "acq_max_mesh" : "int"}, errors='ignore')
+    # Get only usefull columns, meshes as numbers or text if they are not
+    data = local_data.get("dataframe")
+    # Replace by sieve OK or associated error code : the acq_min and the acq_max must be numbers
+    sieve_bug = numeric_status(data, "acq_min_mesh", labels.sucess["acquisition.sieve.bug.ok"])
+    sieve_bug[(sieve_bug == labels.sucess["acquisition.sieve.bug.ok"]) & data["acq_max_mesh"].isna().values] = labels.errors["global.not_numeric"]
+    result = data[['scan_id', 'acq_min_mesh', 'sample_id', 'acq_max_mesh', 'fracID', 'frac_index']].assign(acq_min_mesh=number_or_label(data, "acq_min_mesh"), 
+                                                                                                            acq_max_mesh=number_or_label(data, "acq_max_mesh"),
+                                                                                                            sieve_bug=sieve_bug).drop_duplicates()
 
     # The acq_min is superior or equal to the acq_max **for the same FracID (within the same scanID)**, 
-    # put a warning "ACQ MIN > ACQ MAX" or "ACQ MIN = ACQ MAX" according to the situation:
-    for id in result.scan_id : 
-        sieve_bug_label=result.loc[result["scan_id"] == id, 'sieve_bug'].values[0]
-        if sieve_bug_label == labels.sucess["acquisition.sieve.bug.ok"] :
-            acq_min_mesh = int(result.loc[result["scan_id"] == id, 'acq_min_mesh'].values[0]) if is_int(result.loc[result["scan_id"] == id, 'acq_min_mesh'].values[0]) else result.loc[result["scan_id"] == id, 'acq_min_mesh'].values[0]
-            acq_max_mesh = int(result.loc[result["scan_id"] == id, 'acq_max_mesh'].values[0]) if is_int(result.loc[result["scan_id"] == id, 'acq_max_mesh'].values[0]) else result.loc[result["scan_id"] == id, 'acq_max_mesh'].values[0]
-            
-            # If acq_min_mesh == acq_max_mesh 
-            if acq_min_mesh == acq_max_mesh :
-                result.loc[result["scan_id"] == id, 'sieve_bug'] = labels.errors["acquisition.sieve.bug.min_equ_max"]
-            # If acq_min_mesh > acq_max_mesh 
-            elif acq_min_mesh > acq_max_mesh :
-                result.loc[result["scan_id"] == id, 'sieve_bug'] = labels.errors["acquisition.sieve.bug.min_sup_max"]
+    # put a warning "ACQ MIN > ACQ MAX" or "ACQ MIN = ACQ MAX" according to the situation, from the first line of the scan:
+    first = result.drop_duplicates("scan_id").set_index("scan_id").reindex(result["scan_id"].values)
+    to_test = first["sieve_bug"].values == labels.sucess["acquisition.sieve.bug.ok"]
+    acq_min_mesh, acq_max_mesh = first["acq_min_mesh"].values[to_test], first["acq_max_mesh"].values[to_test]
+    result.loc[to_test, "sieve_bug"] = np.select([acq_min_mesh == acq_max_mesh, acq_min_mesh > acq_max_mesh],
+                                                 [labels.errors["acquisition.sieve.bug.min_equ_max"], labels.errors["acquisition.sieve.bug.min_sup_max"]],
+                                                 result["sieve_bug"].values[to_test])
 
     #For the same sampleID whose FracID = d1 or d2 ... dN (comparison between several scanIDs of the same sampleID), check the following conditions:
     # - the acq_min (dN) ≠ acq_max (dN+1), put a warning "ACQ MIN (dN) ≠ ACQ MAX (dN+1)"
-    data_by_sample_id = result.groupby("sample_id")
-    for key, item in data_by_sample_id:
-        group=data_by_sample_id.get_group(key)
-        if len(group)>1 :
-            for i in range(1,len(group)) :
-                #Get d_i and d_i+1
-                d_i=group[group["fracID"]=="_d"+str(i)+"_"]
-                d_i_plus_1=group[group["fracID"]=="_d"+str(i+1)+"_"]
-
-                #if not d_i and d_i+1 skip test
-                if d_i.empty or d_i_plus_1.empty : 
-                    break
-
-                #Compare d_i and d_i+1
-                #Should respect "acq_min_mesh (N) == acq_max_mesh (N+1)"
-                di_acq_min_mesh = int(d_i.acq_min_mesh.values[0]) if is_int(d_i.acq_min_mesh.values[0]) else d_i.acq_min_mesh.values[0]
-                di_plus_un_acq_max_mesh = int(d_i_plus_1.acq_max_mesh.values[0]) if is_int(d_i_plus_1.acq_max_mesh.values[0]) else d_i_plus_1.acq_max_mesh.values[0]
-                if di_acq_min_mesh != di_plus_un_acq_max_mesh :
-                    result.loc[result["scan_id"] == d_i.scan_id.values[0], 'sieve_bug'] = labels.errors["acquisition.sieve.bug.min_dn_dif_max_dn+1_1"]+str(i)+labels.errors["acquisition.sieve.bug.min_dn_dif_max_dn+1_2"]+str(i+1)+labels.errors["acquisition.sieve.bug.min_dn_dif_max_dn+1_3"]
-                    result.loc[result["scan_id"] == d_i_plus_1.scan_id.values[0], 'sieve_bug'] = labels.errors["acquisition.sieve.bug.min_dn_dif_max_dn+1_1"]+str(i)+labels.errors["acquisition.sieve.bug.min_dn_dif_max_dn+1_2"]+str(i+1)+labels.errors["acquisition.sieve.bug.min_dn_dif_max_dn+1_3"]
+    pairs = frac_chain_pairs(result, ["acq_min_mesh", "acq_max_mesh"])
+    frac_index = pairs["frac_index"].astype(int).astype(str)
+    set_frac_chain_labels(result, "sieve_bug", pairs, 
+                          pairs["acq_min_mesh"].values != pairs["acq_max_mesh_next"].values,
+                          labels.errors["acquisition.sieve.bug.min_dn_dif_max_dn+1_1"] + frac_index + labels.errors["acquisition.sieve.bug.min_dn_dif_max_dn+1_2"] 
+                          + (pairs["frac_index"] + 1).astype(int).astype(str) + labels.errors["acquisition.sieve.bug.min_dn_dif_max_dn+1_3"])
     
     #For the same handled Frac ID 
-    data_by_frac_id = result.groupby("fracID")
-    for key, item in data_by_frac_id:
-        if key!= "frac_type_not_handled" :
-            group=data_by_frac_id.get_group(key)
-            # If the acq of one or more scans differs from the other scans
-            if len(group['acq_min_mesh'].unique())>1 or len(group['acq_max_mesh'].unique())>1 :
-                result.loc[result['fracID'] == key,  'sieve_bug'] = labels.errors["acquisition.sieve.bug.different"]+" ("+key.replace('_', '')+")"
+    # If the acq of one or more scans differs from the other scans
+    by_frac_id = result.groupby("fracID", observed=True)
+    different = (by_frac_id["acq_min_mesh"].transform("nunique") > 1) | (by_frac_id["acq_max_mesh"].transform("nunique") > 1)
+    different = different.values & (result["fracID"].values != localData.FRAC_TYPE_NOT_HANDLED)
+    result.loc[different, 'sieve_bug'] = (labels.errors["acquisition.sieve.bug.different"] + " (" + result.loc[different, "fracID"].str.replace('_', '') + ")").values
     
     # Keep only one usfull lines
     result = result.drop_duplicates()
-    result.drop(columns=["sample_id", "fracID"], inplace=True)
+    result.drop(columns=["sample_id", "fracID", "frac_index"], inplace=True)
 
     # Rename collums to match the desiered output
     result.rename(columns={'scan_id': 'List scan ID', 'acq_min_mesh': 'acq min mesh', 'acq_max_mesh': 'acq max mesh', 'sieve_bug' : 'Sieve Bug'}, inplace=True)
 
-    logging.info("-- TIME : {} seconds -- : {} : {} : callback check_sieve_bug".format((time.time() - start_time), _id, _mode))
     return result
 
 def check_motoda_check(_id, _mode, local_data):
@@ -513,38 +444,33 @@ def check_motoda_check(_id, _mode, local_data):
             - "#Motoda identical": if acq_sub_part is identical throughout the project
             - "Motoda OK" : if everything is OK
     """
-    start_time = time.time()
     # Get only usefull columns
-    dataToTest = local_data.get("dataframe")[['scan_id', 'acq_sub_part', 'sample_net_type']].groupby('scan_id').first().reset_index()
-    dataToTest["fracID"] = [get_frac_id(e) for e in dataToTest["scan_id"]]
-    result = local_data.get("dataframe")[['scan_id','acq_sub_part']].drop_duplicates()
-    result["motoda_check"] = ""
+    data = local_data.get("dataframe")
+    result = data[['scan_id']].assign(acq_sub_part=number_or_label(data, "acq_sub_part"), 
+                                      # fill with motoda OK or associated generic error code
+                                      motoda_check=numeric_status(data, "acq_sub_part", labels.sucess["acquisition.motoda.check.ok"]))
 
-    # fill with motoda OK or associated generic error code
-    result.motoda_check = result.acq_sub_part.map(lambda x: x if labels.errors["global.missing_ecotaxa_table"] == x
-                                                           else labels.errors["global.not_numeric"] if not is_int(x)
-                                                           else labels.sucess["acquisition.motoda.check.ok"]) 
     # If Motoda identique
-    if len(dataToTest.acq_sub_part.unique()) == 1 :
+    if len(pd.unique(result.drop_duplicates("scan_id")["acq_sub_part"].values)) == 1 :
         result['motoda_check'] =  np.where(result['motoda_check'] == labels.sucess["acquisition.motoda.check.ok"],labels.errors["acquisition.motoda.check.identique"], result['motoda_check'])
 
-    for i in range(0, len(dataToTest.scan_id)):
-        id = dataToTest.scan_id.values[i]
-        motoda_check = result.loc[result["scan_id"] == id, 'motoda_check'].values[0]
-        sample_net_type = dataToTest.sample_net_type.values[i]
-        fracID = dataToTest.fracID.values[i]
-        acq_sub_part = dataToTest.acq_sub_part.values[i]
-
-        if motoda_check == labels.sucess["acquisition.motoda.check.ok"]:
-            result.loc[result["scan_id"] == id, 'acq_sub_part'] = int(acq_sub_part) if is_int(acq_sub_part) else acq_sub_part
-            if(fracID=="_d1_" or ( fracID=="_tot_" and sample_net_type=="rg")) :
-                #should be (1 or )puissance de 2
-                if not is_power_of_two(int(acq_sub_part)) : 
-                    result.loc[result["scan_id"] == id, 'motoda_check'] = labels.errors["acquisition.motoda.check.cas1"]
-            elif (fracID.startswith("_d") or fracID=="_tot_" or fracID=="_plankton_") and sample_net_type != "rg"  :
-                if int(acq_sub_part)==1 or not is_power_of_two(int(acq_sub_part)) :
-                    #should be ^2 but not 1
-                    result.loc[result["scan_id"] == id, 'motoda_check'] = labels.errors["acquisition.motoda.check.cas2"]
+    # A scan is tested with the values of its first line
+    first = result.assign(motoda=data["acq_sub_part"].fillna(0).values, frac_index=data["frac_index"].values, 
+                          fracID=data["fracID"].values, sample_net_type=data["sample_net_type"].values).drop_duplicates("scan_id").set_index("scan_id").reindex(result["scan_id"].values)
+    to_test = first["motoda_check"].values == labels.sucess["acquisition.motoda.check.ok"]
+    motoda = first["motoda"].values.astype(np.int64)
+    power_of_two = (motoda > 0) & ((motoda & (motoda - 1)) == 0)
+    net_type_rg = first["sample_net_type"].values == "rg"
+    frac_id = first["fracID"].astype(object).values
+    # The motoda fraction of the first line is reported on all the lines of the scan
+    result.loc[to_test, 'acq_sub_part'] = first["acq_sub_part"].values[to_test]
+    #should be (1 or )puissance de 2
+    cas1 = (frac_id == "_d1_") | ((frac_id == "_tot_") & net_type_rg)
+    #should be ^2 but not 1
+    cas2 = ~cas1 & (first["frac_index"].notna().values | np.isin(frac_id, ["_tot_", "_plankton_"])) & ~net_type_rg
+    result['motoda_check'] = np.select([to_test & cas1 & ~power_of_two, to_test & cas2 & ((motoda == 1) | ~power_of_two)],
+                                       [labels.errors["acquisition.motoda.check.cas1"], labels.errors["acquisition.motoda.check.cas2"]],
+                                       result['motoda_check'].values)
 
     # Keep only one line by couples : id / motoda fraction
     result = result.drop_duplicates()
@@ -552,7 +478,6 @@ def check_motoda_check(_id, _mode, local_data):
     # Rename collums to match the desiered output
     result.rename(columns={'scan_id': 'List scan ID', 'acq_sub_part' : 'MOTODA Fraction','motoda_check': 'MOTODA check'}, inplace=True)
 
-    logging.info("-- TIME : {} seconds -- : {} : {} : callback check_motoda_check".format((time.time() - start_time), _id, _mode))
     return result
 
 def check_motoda_comparaison(_id, _mode, local_data):
@@ -570,68 +495,45 @@ def check_motoda_comparaison(_id, _mode, local_data):
               If the ecotaxa.tsv table is missing it is retrieved from the meta.txt.
             - the Observation, from the meta.txt file of the _work directories.
     """
-    start_time = time.time()
-    # Get only usefull columns
-    dataToTest = local_data.get("dataframe")[['scan_id', 'acq_sub_part', 'sample_id']].groupby('scan_id').first().reset_index()
-    dataToTest["fracID"] = [get_frac_id(e) for e in dataToTest["scan_id"]]
-    result = local_data.get("dataframe")[['scan_id','acq_sub_part', 'sample_comment', 'sample_id']].drop_duplicates()
-    result.insert(loc=2, column='motoda_comp', value="")
+    # Get only usefull columns, the first line of eatch scan is compared
+    data = local_data.get("dataframe")
+    dataToTest = data[['scan_id', 'acq_sub_part', 'sample_id', 'frac_index']].drop_duplicates("scan_id").sort_values("scan_id")
+    # fill with motoda OK or associated generic error code
+    result = data[['scan_id', 'sample_comment', 'sample_id']].astype({'sample_comment' : object}).assign(acq_sub_part=number_or_label(data, "acq_sub_part"), 
+                                                                     motoda_comp=numeric_status(data, "acq_sub_part", labels.sucess["acquisition.motoda.comparaison.ok"]))
+    result = result[['scan_id', 'acq_sub_part', 'motoda_comp', 'sample_comment', 'sample_id']].drop_duplicates()
     result['Observation']=""
     
     #get meta.txt related information
     meta = local_data.get("meta")
 
-    # fill with motoda OK or associated generic error code
-    result.motoda_comp = result.acq_sub_part.map(lambda x: x if labels.errors["global.missing_ecotaxa_table"] == x
-                                                           else labels.errors["global.not_numeric"] if not is_int(x)
-                                                           else labels.sucess["acquisition.motoda.comparaison.ok"]) 
-
-    data_by_sample_id = dataToTest.groupby("sample_id")
+    #Compare d_i and d_i+1 of eatch sample, when both are numbers
+    #Should respect "acq_sub_part (N) < acq_sub_part (N+1)"
+    pairs = frac_chain_pairs(dataToTest, ["acq_sub_part"])
+    set_frac_chain_labels(result, "motoda_comp", pairs, 
+                          (pairs["acq_sub_part"] >= pairs["acq_sub_part_next"]).fillna(False).values.astype(bool),
+                          labels.errors["acquisition.motoda.comparaison.ko"] + " (d" + pairs["frac_index"].astype(int).astype(str) + ") ≥ Motoda frac (d" 
+                          + (pairs["frac_index"] + 1).astype(int).astype(str) + ")")
     
-    for key, item in data_by_sample_id:
-        group=data_by_sample_id.get_group(key)
-
-        if len(group)>1 :
-            for i in range(1,len(group)) :
-                #Get d_i and d_i+1
-                d_i=group[group["fracID"]=="_d"+str(i)+"_"]
-                d_i_plus_1=group[group["fracID"]=="_d"+str(i+1)+"_"]
-
-                #if not d_i and d_i+1 skip test
-                if d_i.empty or d_i_plus_1.empty : 
-                    break
-
-                #Compare d_i and d_i+1
-                #Should respect "acq_sub_part (N) < acq_sub_part (N+1)"
-                di_acq_sub_part = int(d_i.acq_sub_part.values[0]) if is_int(d_i.acq_sub_part.values[0]) else d_i.acq_sub_part.values[0]
-                di_plus_un_acq_sub_part = int(d_i_plus_1.acq_sub_part.values[0]) if is_int(d_i_plus_1.acq_sub_part.values[0]) else d_i_plus_1.acq_sub_part.values[0]
-                if di_acq_sub_part >= di_plus_un_acq_sub_part :
-                    result.loc[result["scan_id"] == d_i.scan_id.values[0], 'motoda_comp'] = labels.errors["acquisition.motoda.comparaison.ko"]+" (d"+str(i)+") ≥ Motoda frac (d"+str(i+1)+")"
-                    result.loc[result["scan_id"] == d_i_plus_1.scan_id.values[0], 'motoda_comp'] = labels.errors["acquisition.motoda.comparaison.ko"]+" (d"+str(i)+") ≥ Motoda frac (d"+str(i+1)+")"
-    
-    # Extract scan ids
-    ids = result["scan_id"].values
     if len(meta) == 0 :
         result['sample_comment'] = labels.errors["global.missing_meta_txt_file"]
         result['Observation'] = labels.errors["global.missing_meta_txt_file"]
     else :
-        # foreatch scan id
-        for id in ids:
-            #get meta related to curent scan_id (opti)
-            for k,v in meta.items() :
-                if id in k :
-                    meta_for_scan_id = v
-                    break
-                
-            if result.loc[result["scan_id"] == id ].motoda_comp.values[0] == labels.errors["global.missing_ecotaxa_table"] :
-                #get sample_comment
-                meta_sample_comment =  meta_for_scan_id if meta_for_scan_id == labels.errors["global.bad_meta_txt_file"] else [a.replace("Sample_comment= ", "") for a in meta_for_scan_id if a.startswith("Sample_comment= ")]
-                #set sample_comment
-                result.loc[result["scan_id"] == id, "sample_comment"] = meta_sample_comment[0] if len(meta_sample_comment)>0 else labels.errors["global.missing_column"]+" in meta.txt"
+        #get meta related to eatch scan_id : its first meta.txt
+        meta_for_scan_id = meta.loc[~meta.index.duplicated()].reindex(result["scan_id"].values)
+        has_meta = meta_for_scan_id["path"].notnull().values
+
+        def meta_field(field, missing) :
+            values = meta_for_scan_id[field].values if field in meta_for_scan_id else np.full(len(result), np.nan, dtype=object)
+            return np.where(~has_meta, labels.errors["global.missing_meta_txt_file"], np.where(pd.isnull(values), missing, values))
+
+        #get and set sample_comment if the ecotaxa table is missing (from the first line of the scan)
+        first = result.drop_duplicates("scan_id").set_index("scan_id").reindex(result["scan_id"].values)
+        missing_table = first["motoda_comp"].values == labels.errors["global.missing_ecotaxa_table"]
+        result.loc[missing_table, "sample_comment"] = meta_field("Sample_comment", labels.errors["global.missing_column"]+" in meta.txt")[missing_table]
             
-            #get and set Observation
-            meta_observation =  meta_for_scan_id if meta_for_scan_id == labels.errors["global.bad_meta_txt_file"] else [a.replace("Observation= ", "") for a in meta_for_scan_id if a.startswith("Observation= ")]
-            result.loc[result["scan_id"] == id, "Observation"] = meta_observation[0] if len(meta_observation)>0 else labels.errors["global.missing_column"]+"  in meta.txt"
+        #get and set Observation
+        result["Observation"] = meta_field("Observation", labels.errors["global.missing_column"]+"  in meta.txt")
 
     # Keep only one line by couples : id / motoda fraction
     result = result.drop_duplicates()
@@ -640,9 +542,19 @@ def check_motoda_comparaison(_id, _mode, local_data):
     # Rename collums to match the desiered output
     result.rename(columns={'scan_id': 'List scan ID', 'motoda_comp': 'MOTODA comparison', 'sample_comment':'Sample comment'}, inplace=True)
 
-    logging.info("-- TIME : {} seconds -- : {} : {} : callback check_motoda_comparaison".format((time.time() - start_time), _id, _mode))
     return result
 
+# Expected number of vignettes in the _work/<scan> folder : 
+# (net type is rg, fraction : d1, dN for d1+N, tot or plankton, None for all, motoda frac > 1 or = 1, min, max)
+MOTODA_QUALITY_RULES = [
+    (True, None, False, 0, 1500),
+    (True, None, True, 800, 1500),
+    (False, "d1", False, 0, 1500),
+    (False, "d1", True, 800, 1500),
+    (False, "dN", False, 0, 2500),
+    (False, "dN", True, 1000, 2500),
+]
+
 def check_motoda_quality(_id, _mode, local_data):
     """ .jpg images, commonly called vignettes, are created in the sub-directories of the _work directory following the initial process step. The number of vignettes created tells us about the quality of the fraction chosen with the motoda to make the scan : sample with insufficient or too many splits.
         
@@ -665,84 +577,50 @@ def check_motoda_quality(_id, _mode, local_data):
                         → the number of .jpg images in the _work subdirectory must be between 1000 and 2500
             - "Motoda OK" : if everything is OK
     """
-    start_time = time.time()
     # Get only usefull columns
-    result = local_data.get("dataframe")[['scan_id', 'sample_net_type', 'acq_sub_part']].drop_duplicates()
-    result["fracID"] = [get_frac_id(e) for e in result["scan_id"]]
-    result['motoda_quality']=""
-    # Get only usefull file name : .jpg in /Zooscan_scan/_work/ folder
+    data = local_data.get("dataframe")
+    # fill with the generic error code of the motoda fraction, if any
+    result = data[['scan_id', 'sample_net_type', 'acq_sub_part', 'fracID']].assign(acq_sub_part=number_or_label(data, "acq_sub_part"), motoda=data["acq_sub_part"].fillna(0).values,
+                                                                                   motoda_quality=numeric_status(data, "acq_sub_part", "")).drop_duplicates()
+    # Count the .jpg in eatch /Zooscan_scan/_work/<scan> folder
     fs = local_data.get("fs")
-    dataToTest = fs.loc[([True if ("/Zooscan_scan/_work/" in i and "multiples_to_separate" not in i)else False for i in fs['path'].values])
-                        & (fs['extension'].values == "jpg"), ["name", "extension"]]
-
-    # fill with motoda OK or associated generic error code
-    result.motoda_quality = result.acq_sub_part.map(lambda x: x if labels.errors["global.missing_ecotaxa_table"] == x
-                                                           else labels.errors["global.not_numeric"] if not is_int(x)
-                                                           else "") 
-    # Extract scan ids
-    ids = result["scan_id"].values
-
-    # foreatch scan id
-    for id in ids:
-        #get lines related to curent id
-        data_img_list = dataToTest.loc[([True if id in i else False for i in dataToTest['name'].values]), ["name", "extension"]]
-
-        # count of scanID.tsv should be 1
-        count_img = len(data_img_list)
-        #get needed infos for that scan id
-        scan_id_data = result.loc[result["scan_id"]==id, ["sample_net_type", "fracID", "acq_sub_part", "motoda_quality"]]
-        # if no img in work, fill result with the associated error msg
-        if count_img==0 :
-            result.loc[result["scan_id"] == id, 'motoda_quality'] = labels.errors["acquisition.motoda.quality.missing"]
-        elif scan_id_data["motoda_quality"].values[0]=="" :
-            #get needed infos for that scan id
-            net_type = scan_id_data["sample_net_type"].values[0]
-            frac_id = scan_id_data["fracID"].values[0]
-            motoda_frac = int(scan_id_data["acq_sub_part"].values[0]) if is_int(scan_id_data["acq_sub_part"].values[0]) else scan_id_data["acq_sub_part"].values[0]
-
-            #start testing
-            if net_type=="rg" :
-                # When Nettype = rg and motoda_frac strictly =1
-                if motoda_frac==1 :
-                    # the number of .jpg images in the _work subdirectory must not be > 1500
-                    result.loc[result["scan_id"] == id, 'motoda_quality'] = labels.sucess["acquisition.motoda.quality.ok"] if count_img <= 1500 else labels.errors["acquisition.motoda.quality.high"]+str(count_img)
-                # When Nettype = rg and motoda_frac strictly >1
-                elif motoda_frac>1 :
-                    # the number of .jpg images in the _work subdirectory must be between 800 and 1500
-                    result.loc[result["scan_id"] == id, 'motoda_quality'] = labels.errors["acquisition.motoda.quality.low"]+str(count_img) if count_img < 800 else labels.errors["acquisition.motoda.quality.high"]+str(count_img) if count_img > 1500 else labels.sucess["acquisition.motoda.quality.ok"] 
-                else : 
-                    result.loc[result["scan_id"] == id, 'motoda_quality'] = labels.sucess["acquisition.motoda.quality.ok"]
-            #For all other Nettype:
-            else :
-                if frac_id=="_d1_" : 
-                    # When Nettype ≠ rg and FracID = d1 and motoda_frac strictly =1
-                    if motoda_frac == 1 :
-                        # the number of .jpg images in the _work subdirectory must not be > 1500
-                        result.loc[result["scan_id"] == id, 'motoda_quality'] = labels.sucess["acquisition.motoda.quality.ok"] if count_img <= 1500 else labels.errors["acquisition.motoda.quality.high"]+str(count_img)
-                    # When Nettype ≠ rg and FracID = d1 and the motoda_frac strictly >1 
-                    elif motoda_frac > 1 :
-                        # the number of .jpg images in the _work subdirectory must be between 800 and 1500
-                        result.loc[result["scan_id"] == id, 'motoda_quality'] = labels.errors["acquisition.motoda.quality.low"]+str(count_img) if count_img < 800 else labels.errors["acquisition.motoda.quality.high"]+str(count_img) if count_img > 1500 else labels.sucess["acquisition.motoda.quality.ok"] 
-                
-                elif (frac_id.startswith("_d") or frac_id=="_tot_" or frac_id=="_plankton_") : 
-                    # When Nettype ≠ rg and FracID = d1+N or = tot or =plankton and motoda_frac strictly =1
-                    if motoda_frac == 1 :
-                        # the number of .jpg images in the _work subdirectory must not be > 2500
-                        result.loc[result["scan_id"] == id, 'motoda_quality'] = labels.sucess["acquisition.motoda.quality.ok"] if count_img <= 2500 else labels.errors["acquisition.motoda.quality.high"]+str(count_img)
-                    # When Nettype ≠ rg and FracID = d1+N or = tot or =plankton and motoda_frac strictly >1
-                    elif motoda_frac > 1 :
-                        # the number of .jpg images in the _work subdirectory must be between 1000 and 2500
-                        result.loc[result["scan_id"] == id, 'motoda_quality'] = labels.errors["acquisition.motoda.quality.low"]+str(count_img) if count_img < 1000 else labels.errors["acquisition.motoda.quality.high"]+str(count_img) if count_img > 2500 else labels.sucess["acquisition.motoda.quality.ok"] 
-                else : 
-                    result.loc[result["scan_id"] == id, 'motoda_quality'] = labels.sucess["acquisition.motoda.quality.ok"]
+    vignettes = fs.loc[(fs['role'] == "vignette").values, "scan_id"]
+    count_img = pd.Series(np.asarray(vignettes.values, dtype=object)).value_counts().reindex(result["scan_id"].values, fill_value=0).values
+
+    # A scan is tested with the values of its first line
+    first = result.drop_duplicates("scan_id").set_index("scan_id").reindex(result["scan_id"].values)
+    net_type_rg = first["sample_net_type"].values == "rg"
+    frac_id = first["fracID"].values
+    frac_d1 = frac_id == "_d1_"
+    frac_dN = ~frac_d1 & np.array([f.startswith("_d") or f in ("_tot_", "_plankton_") for f in frac_id], dtype=bool)
+    motoda_frac = first["motoda"].values.astype(np.int64)
+
+    # Min and max number of vignettes of the rule matching eatch scan, -1 if none
+    rules = [(net_type_rg == rg) & (True if frac is None else frac_d1 if frac == "d1" else frac_dN) & ((motoda_frac > 1) if motoda_gt_1 else (motoda_frac == 1))
+             for rg, frac, motoda_gt_1, min_img, max_img in MOTODA_QUALITY_RULES]
+    min_img = np.select(rules, [rule[3] for rule in MOTODA_QUALITY_RULES], -1)
+    max_img = np.select(rules, [rule[4] for rule in MOTODA_QUALITY_RULES], -1)
+    count_str = count_img.astype(str).astype(object)
+    motoda_quality = np.select([(min_img == -1) & (net_type_rg | ~(frac_d1 | frac_dN)), 
+                                min_img == -1, 
+                                count_img < min_img, 
+                                count_img > max_img],
+                               [labels.sucess["acquisition.motoda.quality.ok"], 
+                                "", 
+                                labels.errors["acquisition.motoda.quality.low"] + count_str, 
+                                labels.errors["acquisition.motoda.quality.high"] + count_str],
+                               labels.sucess["acquisition.motoda.quality.ok"])
+
+    # if no img in work, fill result with the associated error msg, else keep the generic error code of the first line of the scan
+    result['motoda_quality'] = np.where(count_img == 0, labels.errors["acquisition.motoda.quality.missing"],
+                                        np.where(first["motoda_quality"].values == "", motoda_quality, result['motoda_quality'].values))
 
     #Remove result useless columns
-    result.drop(columns=["fracID", "sample_net_type", "acq_sub_part"], inplace=True)
+    result.drop(columns=["fracID", "sample_net_type", "acq_sub_part", "motoda"], inplace=True)
 
     # Rename collums to match the desiered output
     result.rename(columns={'scan_id': 'List scan ID', "motoda_quality" : "Motoda quality"}, inplace=True)
 
-    logging.info("-- TIME : {} seconds -- : {} : {} : callback check_motoda_quality".format((time.time() - start_time), _id, _mode))
     return result
 
 def check_spelling(_id, _mode, local_data):
@@ -750,7 +628,6 @@ def check_spelling(_id, _mode, local_data):
         - analysis operator in "Scan op." column
         - splitting method in "Submethod" column
     """
-    start_time = time.time()
     # Get only usefull columns and drp duplicate to keep uniques values
     result_sample_scan_operator = local_data.get("dataframe")[['sample_scan_operator']].drop_duplicates()
     result_acq_sub_method = local_data.get("dataframe")[['acq_sub_method']].drop_duplicates()
@@ -761,5 +638,4 @@ def check_spelling(_id, _mode, local_data):
     # Rename collums to match the desiered output
     result.rename(columns={'sample_scan_operator': 'Scan op.', "acq_sub_method" : "Submethod"}, inplace=True)
 
-    logging.info("-- TIME : {} seconds -- : {} : {} : callback check_spelling".format((time.time() - start_time), _id, _mode))
     return result
@@ -0,0 +1,73 @@
+import os
+import pickle
+import hashlib
+import logging
+import tempfile
+import pandas as pd
+
+# To increment when the content of a cached scan changes
+CACHE_VERSION = 8
+
+def _cacheFile(cache_path, project_path, cols, first_row_only, distinct_rows=False):
+    """Return the cache file of the given project : one file by project and tsv reading mode (read columns, first row only, distinct rows only), 
+    named after the project and a hash of its absolute path and of the reading mode"""
+    key = hashlib.sha1("|".join([os.path.abspath(project_path)] + list(cols)).encode()).hexdigest()[:16]
+    return os.path.join(cache_path, os.path.basename(os.path.normpath(project_path)) + "_" + key + ("_first_row" if first_row_only else "") + ("_distinct" if distinct_rows else "") + ".pkl")
+
+def load(cache_path, project_path, cols, first_row_only=False, distinct_rows=False):
+    """Return the cached scans of the given project : a dictionary {_work/<scan> folder name : scan signature and meta}, 
+    the fs dataframe of these scans (with the folder name in the "scan" column) and their tsv dataframe. Empty if no cache can be used."""
+    empty = ({}, pd.DataFrame(columns=["scan"]), pd.DataFrame(columns=["scan_id"]))
+    if not cache_path :
+        return empty
+    try :
+        with open(_cacheFile(cache_path, project_path, cols, first_row_only, distinct_rows), "rb") as f:
+            cache = pickle.load(f)
+    except FileNotFoundError :
+        return empty
+    except Exception as e :
+        logging.warning("Unreadable cache for project '{}' : {}".format(project_path, e))
+        return empty
+    # Cache created by another version of the QC, or with other tsv columns
+    if cache.get("version") != CACHE_VERSION or cache.get("project_path") != project_path or cache.get("cols") != list(cols) :
+        return empty
+    return cache["scans"], cache["fs"], cache["tsv"]
+
+def save(cache_path, project_path, cols, first_row_only, scans, fs, tsv, distinct_rows=False):
+    """Save the given scans of the project with their fs dataframe (with the _work/<scan> folder of eatch file in the "scan" column) and their tsv dataframes. 
+    Scans modified while they were read (without signature) are not saved."""
+    if not cache_path :
+        return
+    scans = {name : {k : scan[k] for k in ("signature", "tracked", "dirs", "meta")} for name, scan in scans.items() if scan["signature"] is not None}
+    cache = {"version" : CACHE_VERSION,
+             "project_path" : project_path,
+             "cols" : list(cols),
+             "scans" : scans,
+             # One dataframe for all the scans, way faster to load than one dataframe by scan
+             "fs" : fs.loc[fs["scan"].isin(list(scans))].astype({"scan" : "category", "extension" : "category", "scan_id" : "category"}),
+             "tsv" : pd.concat([df.loc[df["scan_id"].isin(list(scans))] for df in tsv if "scan_id" in df] or [pd.DataFrame(columns=["scan_id"])])}
+    try :
+        os.makedirs(cache_path, exist_ok=True)
+        # Write then rename, so that a concurrent execution never reads a partial cache file
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, _cacheFile(cache_path, project_path, cols, first_row_only, distinct_rows))
+    except OSError as e :
+        logging.warning("Can't save cache for project '{}' : {}".format(project_path, e))
+
+def signature(scan_path, tracked_files, dirs):
+    """Return the signature of a _work/<scan> folder : modification time of the folder and of all its sub folders, size and modification time of the files read by the QC"""
+    sig = []
+    for path in [scan_path] + list(dirs) :
+        try :
+            sig.append(os.stat(path).st_mtime_ns)
+        except OSError :
+            sig.append(None)
+    for path in tracked_files :
+        try :
+            stats = os.stat(path)
+            sig.append((stats.st_size, stats.st_mtime_ns))
+        except OSError :
+            sig.append(None)
+    return tuple(sig)
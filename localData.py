@@ -1,13 +1,25 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 import labels
 from zipfile import ZipFile
 from zipfile import BadZipFile 
 from enums import SUPPORTED_DATA_COMPONANT, Mode
 import logging
 from datetime import datetime
+from functools import lru_cache
+from pandas.api.types import union_categoricals
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import time
+import re
 from fpdf import FPDF
+import localCache
+try :
+    import resource
+except ImportError :
+    # Not available on Windows : the peak memory is not reported
+    resource = None
 
 now= datetime.now()
 logging.basicConfig(filename="logs/"+str(now.year)+"-"+str(now.month)+".log", level = logging.INFO, format="%(asctime)s | %(levelname)s | %(threadName)s |%(message)s")
@@ -24,12 +36,77 @@ try :
 except : 
     env="err"
 base_path=get_path_from_env(env)
+# Folder of the persistent project index cache, an empty QC_CACHE_PATH disable the cache
+try :
+    cache_path = os.environ['QC_CACHE_PATH']
+except :
+    cache_path = "cache/"
+# Pool used to read the _work/<scan> folders : number of workers (1 to read them one after another) and kind ("thread" or "process")
+try :
+    read_workers = int(os.environ['QC_READ_WORKERS'])
+except :
+    read_workers = min(8, (os.cpu_count() or 1) + 4)
+try :
+    read_pool = os.environ['QC_READ_POOL']
+except :
+    read_pool = "thread"
+# Memory ceiling in MB, 0 for none. Under a ceiling, the ecotaxa tables read with all their objects are read by chunks
+# and only the distinct rows of eatch scan are kept : the checks test the values of the objects, not their number
+try :
+    memory_limit = int(os.environ['QC_MEMORY_LIMIT'])
+except :
+    memory_limit = 0
+# Estimated memory of a text cell of the ecotaxa tables, in bytes
+TSV_CELL_BYTES = 100
+# Number of rows of the read ecotaxa tables typed at once
+TYPE_GROUP_ROWS = 50000
 
-def missingCol(cols, path):
-    read_cols = pd.read_csv(path, nrows=0, encoding="ISO-8859-1", sep="\t").columns
-    cols_ko = list(set(cols) - set(read_cols))
-    cols_ok = list(set(cols) - set(cols_ko))
-    return cols_ok, cols_ko
+#needed tsv cols for data testing
+TSV_COLS = [
+        'sample_id',
+        'process_img_background_img', 
+        'process_particle_bw_ratio', 
+        "process_particle_pixel_size_mm",
+        "process_img_resolution", 
+        "acq_sub_part", 
+        "process_particle_sep_mask", 
+        'acq_min_mesh', 
+        'acq_max_mesh',
+        'sample_net_type',
+        'sample_comment',
+        'sample_scan_operator',
+        'acq_sub_method'
+    ]
+#Typed columns of the ecotaxa tables : text columns with few distinct values (constant for a scan), as categories, 
+#and numeric columns, as nullable numbers. The text of the cells that are not numbers (error label, empty or invalid value) is kept in their <col>_error column
+TSV_CATEGORY_COLS = ['scan_id', 'STATUS', 'sample_id', 'sample_net_type', 'sample_scan_operator', 'sample_comment', 'acq_sub_method', 
+                     'process_img_background_img', 'process_particle_sep_mask']
+TSV_NUMERIC_COLS = {'process_particle_bw_ratio' : "Float64",
+                    'process_img_resolution' : "Int64",
+                    'process_particle_pixel_size_mm' : "Float64",
+                    'acq_sub_part' : "Int64",
+                    'acq_min_mesh' : "Int64",
+                    'acq_max_mesh' : "Int64"}
+ERROR_SUFFIX = "_error"
+# Previous result of getdata(Mode.TSV, incremental=True) by project path and reading mode : signatures of the scans, fs (with "scan" column) and dataframe
+_snapshots = {}
+# Number of projects kept in _snapshots
+SNAPSHOTS_MAX = 8
+
+#Folder of eatch file system area that checks can ask for, relative to the project folder
+FS_AREAS = {"Zooscan_config" : "Zooscan_config", 
+            "_raw" : "Zooscan_scan/_raw", 
+            "_work" : "Zooscan_scan/_work"}
+#Fraction of a scan id, in order of priority : d1, d2 ... dN (with its index N), tot or plankton
+FRAC_ID = re.compile(r"^(?:.*?(_d([1-9]+)_)|.*?(_tot_)|.*?(_plankton_))")
+FRAC_TYPE_NOT_HANDLED = "frac_type_not_handled"
+
+#fs dataframe columns
+FS_COLUMNS = ['id', 'path', 'name', 'extension', 'size',
+              'folder', 'num_files', 'depth', 'mtime']
+#fs classification columns, computed once when the files are read : area, owning scan and role of eatch file
+FS_AREA_TYPE = pd.CategoricalDtype(list(FS_AREAS) + ["multiples_to_separate"])
+FS_ROLE_TYPE = pd.CategoricalDtype(["log", "meta", "raw_tif", "raw_zip", "vis_zip", "tsv", "vignette", "sep_gif", "ini"])
 
 def getDrives():
     logging.info("************Get drives in************")
@@ -69,17 +146,36 @@ def getFiles(subpath):
     files = next(os.walk(base_path+subpath))[2]
     return files
 
-def getdata(mode, subpath) :
-    """Read, format, and return usefull data for the selected project"""
+def getdata(mode, subpath, incremental=False, first_row_only=False, cols=None, fs_areas=None, meta_fields=None) :
+    """Read, format, and return usefull data for the selected project.
+    In incremental mode, only the _work/<scan> folders added, removed or modified since the previous incremental call are read again, 
+    the previous result is patched with them : returned data are shared with the next calls and must not be modified.
+    With first_row_only, only the first object of eatch ecotaxa table is read : enough for the per scan constant fields.
+    cols (tsv columns), fs_areas (keys of FS_AREAS) and meta_fields (meta.txt fields) restrict the loaded data to the needs of the checks to run, None for everything.
+    meta.txt files are returned as a dataframe indexed by scan_id (see metaToGlobalData)."""
     if mode==Mode.TSV :
-        # Get all tsv files 
-        tsv_files = getTsv(subpath)
+        project_path = base_path+subpath
+        cols = TSV_COLS if cols is None else cols
+        snapshot_key = (project_path, first_row_only, _distinctRows(first_row_only), tuple(cols))
+        # Get all tsv files, file system and meta data
+        tsv_files, fsData, meta_files, scans = getProjectFiles(subpath, _snapshots.get(snapshot_key) if incremental else None, first_row_only, cols, fs_areas)
         # Format given data 
         dataframe = tsvToGlobalData(tsv_files)
-        fsData = getFileSystem(subpath)
-        #Get meta data
-        meta_files= getMeta(fsData)
-        return {"dataframe" : dataframe, "fs" : fsData, "meta" : meta_files}
+        if incremental :
+            _snapshots.pop(snapshot_key, None)
+            if len(_snapshots) >= SNAPSHOTS_MAX :
+                # Forget the least recently used project
+                _snapshots.pop(next(iter(_snapshots)))
+            _snapshots[snapshot_key] = {"scans" : scans, "fs" : fsData, "dataframe" : dataframe}
+        fs = fsData.drop(columns="scan")
+        if fs_areas is not None and "_work" not in fs_areas :
+            # The _work folder is always walked to list the scans
+            fs = fs.loc[~fs["path"].str.startswith(os.path.join(project_path, FS_AREAS["_work"], ""))]
+        meta = metaToGlobalData(meta_files, os.path.join(project_path, "Zooscan_scan", "_work"))
+        if meta_fields is not None :
+            meta = meta[["path", "STATUS"] + [field for field in meta_fields if field in meta.columns]]
+        reportMemory(subpath)
+        return {"dataframe" : dataframe, "fs" : fs, "meta" : meta}
 
     elif mode==Mode.HEADER :
         # Get all header files 
@@ -88,57 +184,226 @@ def getdata(mode, subpath) :
         dataframe = headerToGlobalData(header_files)
         return dataframe
 
+def getProjectFiles(subpath, snapshot=None, first_row_only=False, cols=TSV_COLS, fs_areas=None):
+    """Read the tsv files, the file system and the meta.txt files of the given project.
+    The _work/<scan> folders that did not change are taken from the given snapshot (previous result of getdata) or else from the persistent cache.
+    With first_row_only, only the first object of eatch ecotaxa table is read, and only the given cols are kept.
+    If fs_areas is given, only these areas of the project are walked, with the _work/<scan> folders.
+    Return the tsv dataframes, the fs dataframe (with the _work/<scan> folder of eatch file in the "scan" column), the meta.txt files and the scans signatures."""
+    project_path = base_path+subpath
+    work_path = os.path.join(project_path, "Zooscan_scan", "_work")
+    if snapshot is None :
+        cached_scans, cached_fs, cached_tsv = localCache.load(cache_path, project_path, cols, first_row_only, _distinctRows(first_row_only))
+    else :
+        # The fraction columns are added again by tsvToGlobalData
+        cached_scans, cached_fs, cached_tsv = snapshot["scans"], snapshot["fs"], snapshot["dataframe"].drop(columns=["fracID", "frac_index"])
+
+    # Walk the project, except the _work/<scan> folders that are listed in scan_entries
+    scan_entries = []
+    data = {col : [] for col in FS_COLUMNS}
+    if fs_areas is None :
+        _scandir_folderstats(project_path, data, scans_root=os.path.normpath(work_path), scan_entries=scan_entries)
+    else :
+        idx = 1
+        for area in sorted(set(fs_areas) | {"_work"}) :
+            folder = FS_AREAS[area]
+            idx, data, foldersize, num_files = _scandir_folderstats(os.path.join(project_path, folder), data, depth=folder.count("/")+1, idx=idx, 
+                                                                    scans_root=os.path.normpath(work_path), scan_entries=scan_entries)
+    fs_frames = [pd.DataFrame(data, columns=FS_COLUMNS).assign(scan=None)]
+    meta_files = getMeta(fs_frames[0])
+
+    if not os.path.isdir(work_path) :
+        return [_typeTsv(pd.concat(getTsv(subpath, first_row_only, cols)))], _classifyFiles(_concatFs(fs_frames), project_path), meta_files, {}
+
+    tsv_files = []
+    scans = {}
+    to_read = []
+    for entry in scan_entries :
+        # A file in _work/ is reported as a scan without ecotaxa table
+        if not entry.is_dir() :
+            tsv_files.append(_readTsv(work_path, entry.name, first_row_only, cols))
+            continue
+        scan = cached_scans.get(entry.name)
+        if scan is None or localCache.signature(entry.path, scan["tracked"], scan["dirs"]) != scan["signature"] :
+            to_read.append(entry.name)
+        else :
+            scans[entry.name] = scan
+            meta_files.update(scan["meta"])
+
+    # Files in _work/ are typed as the read tables
+    tsv_files = [_typeTsv(pd.concat(tsv_files))] if tsv_files else []
+    read, read_tsv = _readScans(work_path, to_read, first_row_only, cols)
+    tsv_files += read_tsv
+    read_scans = dict(zip(to_read, read))
+    for name, scan in read_scans.items() :
+        fs_frames.append(scan["fs"].assign(scan=name))
+        scans[name] = {k : scan[k] for k in ("signature", "tracked", "dirs", "meta")}
+        meta_files.update(scan["meta"])
+    # The read files are classified in one pass, the cached ones already are
+    fs_frames = [_classifyFiles(_concatFs(fs_frames), project_path)]
+
+    # Unchanged scans are taken from the snapshot or the cache, removed and modified ones are left out
+    valid_scans = [name for name in scans if name not in read_scans]
+    if len(valid_scans) :
+        fs_frames.append(cached_fs.loc[cached_fs["scan"].isin(valid_scans)].astype({"extension" : object, "scan" : object, "scan_id" : object}))
+        tsv_files.insert(0, cached_tsv.loc[cached_tsv["scan_id"].isin(valid_scans)])
+    tsv_files = [concatTsv(tsv_files)]
+
+    fs = _concatFs(fs_frames)
+    if read_scans or len(valid_scans) != len(cached_scans) :
+        localCache.save(cache_path, project_path, cols, first_row_only, scans, fs, tsv_files, _distinctRows(first_row_only))
+    fs["scan_id"] = fs["scan_id"].astype("category")
+    return tsv_files, fs, meta_files, scans
+
+def _concatFs(fs_frames):
+    """Concatenate the given fs dataframes, and number their files"""
+    # Empty frames are left out : they would turn the bool and int columns into objects.
+    # num_files (always None for files) is added after : pandas checks its values one by one when concatenating
+    fs_frames = [df for df in fs_frames if len(df)] or fs_frames[:1]
+    fs = pd.concat([df.drop(columns="num_files") for df in fs_frames], ignore_index=True)
+    fs.insert(FS_COLUMNS.index("num_files"), "num_files", None)
+    fs["id"] = np.arange(1, len(fs)+1)
+    if not len(fs) :
+        # Nothing in the walked areas : text columns are typed as such for the checks comparisons
+        fs = fs.astype({"path" : object, "name" : object, "extension" : object})
+    return fs
+
+def _classifyFiles(fs, project_path):
+    """Add to the fs dataframe (with the _work/<scan> folder of eatch file in the "scan" column) the classification columns used by the checks :
+        - area : key of FS_AREAS, or multiples_to_separate for the files of this _work/<scan> sub folder
+        - scan_id : scan the file belongs to, from its _work/<scan> folder or from its name in _raw (<scan_id>_log, <scan_id>_meta, <sample_id>_<frac_id>_raw_1)
+        - role : log, meta, raw_tif, raw_zip, vis_zip, tsv, vignette, sep_gif or ini"""
+    config_path, raw_path, work_path = [os.path.join(project_path, FS_AREAS[area], "") for area in ("Zooscan_config", "_raw", "_work")]
+    # One pass on the paths, the pandas str methods are way slower on the vignettes of big projects
+    area = pd.Categorical([("multiples_to_separate" if "multiples_to_separate" in path else "_work") if path.startswith(work_path) 
+                           else "_raw" if path.startswith(raw_path) else "Zooscan_config" if path.startswith(config_path) else None 
+                           for path in fs["path"].values], dtype=FS_AREA_TYPE)
+    in_config, in_raw = np.asarray(area == "Zooscan_config"), np.asarray(area == "_raw")
+    in_multiples = np.asarray(area == "multiples_to_separate")
+    in_work = in_multiples | np.asarray(area == "_work")
+    extension = np.asarray(fs["extension"].values, dtype=object)
+    # Names are only tested for the few files that are not vignettes
+    not_jpg = np.flatnonzero(extension != "jpg")
+    names = fs["name"].values[not_jpg]
+    def has(part) :
+        mask = np.zeros(len(fs), dtype=bool)
+        mask[not_jpg] = [part in name for name in names]
+        return mask
+
+    scan_id = fs["scan"].values.copy()
+    raw_names = pd.Series(fs["name"].values[in_raw], dtype=object)
+    raw_scan_id = (raw_names.str.extract(r"^(.+)_raw_1", expand=False) + "_1").fillna(raw_names.str.extract(r"^(.+)_(?:log|meta)", expand=False))
+    scan_id[in_raw] = raw_scan_id.values
+
+    role = np.select([in_raw & (extension == "txt") & has("_log"),
+                      (in_raw | in_work) & (extension == "txt") & has("_meta"),
+                      in_raw & (extension == "tif") & has("_raw"),
+                      in_raw & (extension == "zip") & has("_raw"),
+                      in_work & (extension == "zip") & has("_vis"),
+                      in_work & (extension == "tsv"),
+                      in_work & ~in_multiples & (extension == "jpg"),
+                      in_work & (extension == "gif") & has("_sep"),
+                      in_config & (extension == "ini")],
+                     FS_ROLE_TYPE.categories, None)
+    return fs.assign(area=area, scan_id=scan_id, role=pd.Categorical(role, dtype=FS_ROLE_TYPE))
+
+def _readScans(work_path, folder_names, first_row_only=False, cols=TSV_COLS):
+    """Read the given _work/<scan> folders with a pool of read_workers threads or processes. 
+    Return the read scans in the same order, without their tsv, and their typed tsv (see _typeTsv) as a list of dataframes"""
+    start_time = time.time()
+    scans, tsv_files = [], []
+    def collect(read) :
+        # Tables are typed as they are read, by groups of TYPE_GROUP_ROWS rows : the typing cost is by column more than by row, 
+        # and only one group of text tables is kept
+        group = []
+        for scan in read :
+            group.append(scan.pop("tsv"))
+            scans.append(scan)
+            if sum(len(df) for df in group) >= TYPE_GROUP_ROWS or len(scans) == len(folder_names) :
+                tsv_files.append(_typeTsv(pd.concat(group)))
+                group = []
+    if read_workers <= 1 or len(folder_names) <= 1 :
+        collect(_readScan(work_path, folder_name, first_row_only, cols) for folder_name in folder_names)
+    else :
+        Executor = ProcessPoolExecutor if read_pool == "process" else ThreadPoolExecutor
+        with Executor(max_workers=read_workers) as executor :
+            collect(executor.map(_readScan, [work_path]*len(folder_names), folder_names, [first_row_only]*len(folder_names), [cols]*len(folder_names)))
+    logging.info("--- Read {} scans with {} {} workers in : {} seconds ---".format(len(folder_names), read_workers, read_pool, time.time() - start_time))
+    return scans, tsv_files
+
+def _readScan(work_path, folder_name, first_row_only=False, cols=TSV_COLS):
+    """Read the tsv, the file system and the meta.txt files of one _work/<scan> folder, and compute its cache signature"""
+    scan_path = os.path.join(work_path, folder_name)
+    scan_mtime = os.stat(scan_path).st_mtime_ns
+    dirs = []
+    idx, data, foldersize, num_files = _scandir_folderstats(scan_path, {col : [] for col in FS_COLUMNS}, depth=3, dirs=dirs)
+    fs = pd.DataFrame(data, columns=FS_COLUMNS)
+    meta_paths = _listMeta(fs)
+
+    # The signature is taken before reading the files content : a file changed while reading will be read again next time.
+    # The vis zip and sep gif files read by the checks are tracked too : rewritten in place, they do not change the folder mtime
+    checked = np.array([(extension == "zip" and "_vis" in name) or (extension == "gif" and "_sep" in name) 
+                        for name, extension in zip(fs["name"].values, fs["extension"].values)], dtype=bool)
+    tracked = [os.path.join(scan_path, "ecotaxa_"+folder_name+".tsv")] + list(meta_paths) + list(fs["path"].values[checked])
+    # All the sub folders, those without files too : a folder added in one of them only changes its mtime
+    dirs = sorted(dirs)
+    signature = localCache.signature(scan_path, tracked, dirs)
+    if signature[0] != scan_mtime :
+        # Folder modified while walking it : do not reuse it
+        signature = None
+
+    return {"signature" : signature, "tracked" : tracked, "dirs" : dirs,
+            "tsv" : _readTsv(work_path, folder_name, first_row_only, cols), "fs" : fs, "meta" : _readMeta(meta_paths)}
+
+def _listMeta(fs):
+    """List meta.txt paths of all _work/ sub directory"""
+    return fs.loc[np.array([True if ("/Zooscan_scan/_work/" in i) and ("meta" in i) else False for i in fs['path'].values], dtype=bool)
+                        & (fs['extension'] == "txt").values, "path"].values
+
 def getMeta(fs) : 
-    meta_files = {}
     #list meta.txt in all _work/ sub directory 
-    list_meta_paths = fs.loc[([True if ("/Zooscan_scan/_work/" in i) and ("meta" in i) else False for i in fs['path'].values])
-                        & (fs['extension'].values == "txt"), ["path", "name", "extension"]]
-    #for eatch listed meta.txt read file and add an entry in meta_files dictionary
-    for path in list_meta_paths.path.values : 
+    return _readMeta(_listMeta(fs))
+
+def _readMeta(paths) : 
+    """Read the given meta.txt files. Return a dictionary {path : {"STATUS" : "" or error code, field : value}}, the first value of eatch field is kept"""
+    meta_files = {}
+    #for eatch listed meta.txt read file in one pass and add an entry in meta_files dictionary
+    for path in paths : 
+        try :
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError :
+            meta_files[path] = {"STATUS" : labels.errors["global.bad_meta_txt_file"]}
+            continue
+        # Written in utf-8 or in latin-1 (ISO-8859-1, as the ecotaxa tables)
         try :
-            with open(path) as f:
-                lines = f.readlines()
-                meta_files[path] = lines
-        except :
-            meta_files[path] = [labels.errors["global.bad_meta_txt_file"]]
+            text = content.decode("utf-8")
+        except UnicodeDecodeError :
+            text = content.decode("ISO-8859-1")
+        fields = {"STATUS" : ""}
+        for line in text.splitlines() :
+            field, sep, value = line.partition("=")
+            if sep :
+                fields.setdefault(field, value.strip())
+        meta_files[path] = fields
     return meta_files
 
-def  getTsv(subpath):
+def metaToGlobalData(meta_files, work_path) :
+    """Generate from the meta.txt files a dataframe indexed by scan_id (the _work/<scan> folder of the file, None for the files of _work/), 
+    with the path and STATUS of the file and a column by meta.txt field"""
+    records = []
+    for path, fields in meta_files.items() :
+        folders = os.path.relpath(path, work_path).split(os.sep)
+        records.append({"scan_id" : folders[0] if len(folders) > 1 else None, "path" : path, **fields})
+    meta = pd.DataFrame(records) if records else pd.DataFrame(columns=["scan_id", "path", "STATUS"])
+    return meta.set_index("scan_id")
+
+def  getTsv(subpath, first_row_only=False, cols=TSV_COLS):
     """Read all ecotaxa tables (tsv files) for the given project. Return them as list of pandas dataframes"""
     tsv_files = []
-    #needed tsv cols for data testing
-    cols = [
-            'sample_id',
-            'process_img_background_img', 
-            'process_particle_bw_ratio', 
-            "process_particle_pixel_size_mm",
-            "process_img_resolution", 
-            "acq_sub_part", 
-            "process_particle_sep_mask", 
-            'acq_min_mesh', 
-            'acq_max_mesh',
-            'sample_net_type',
-            'sample_comment',
-            'sample_scan_operator',
-            'acq_sub_method'
-        ]
     try : 
         for folder_name in listFolder(base_path+subpath+"/Zooscan_scan/_work/") :
-                try: 
-                    path = base_path+subpath+"/Zooscan_scan/_work/"+folder_name+"/ecotaxa_"+folder_name+".tsv"
-                    cols_ok, cols_ko = missingCol(cols, path)
-
-                    df = pd.read_csv(path, encoding = "ISO-8859-1", usecols=cols_ok, sep="\t")
-                    df['STATUS']=""
-                    df['scan_id'] = folder_name
-                    if cols_ko :
-                        df[cols_ko]=labels.errors["global.missing_column"]
-                    tsv_files.append(df.drop(0))  
-                except IOError as e:
-                    df = pd.DataFrame(data={'scan_id': [folder_name], 'STATUS': labels.errors["global.missing_ecotaxa_table"]})
-                    df[cols]= labels.errors["global.missing_ecotaxa_table"]   
-                    tsv_files.append(df)
-                    logging.warning("{}".format(e))
+            tsv_files.append(_readTsv(base_path+subpath+"/Zooscan_scan/_work/", folder_name, first_row_only, cols))
     except IOError as e:
         df = pd.DataFrame(data={'scan_id': ["NOSCANID"], 'STATUS': labels.errors["global.missing_directory.work"]})
         df[cols]= labels.errors["global.missing_directory.work"]   
@@ -146,6 +411,110 @@ def  getTsv(subpath):
         logging.warning("{}".format(e))
     return tsv_files
 
+def _readTsv(work_path, folder_name, first_row_only=False, cols=TSV_COLS):
+    """Read the ecotaxa table (tsv file) of the given _work/<scan> folder. Return it as a pandas dataframe.
+    With first_row_only, the parsing stops after the first object : the type row and the first data row are read."""
+    try: 
+        start_time = time.time()
+        path = os.path.join(work_path, folder_name, "ecotaxa_"+folder_name+".tsv")
+        chunk_rows = _chunkRows(cols) if _distinctRows(first_row_only) else None
+        # Header and body are read in a single pass, missing columns are the needed ones that were not read.
+        # Values are kept as text, as in the first rows (the type row prevents their conversion) : on big tables the following rows were converted
+        if chunk_rows is None :
+            df = pd.read_csv(path, encoding = "ISO-8859-1", usecols=lambda col : col in cols, sep="\t", nrows=2 if first_row_only else None, dtype=str)
+        else :
+            # Under the memory ceiling : eatch chunk is reduced to its distinct rows (the type row, first one, is kept)
+            df = pd.concat([chunk.drop_duplicates() for chunk in pd.read_csv(path, encoding = "ISO-8859-1", usecols=lambda col : col in cols, sep="\t", dtype=str, chunksize=chunk_rows)]).drop_duplicates()
+        if len(df.columns) == 0 :
+            # None of the needed columns : the first one is read to keep one line by object (one line for all of them if only the distinct rows are kept)
+            df = pd.read_csv(path, encoding = "ISO-8859-1", usecols=[0], sep="\t", nrows=2 if first_row_only or chunk_rows else None, dtype=str).iloc[:, :0]
+        cols_ko = [col for col in cols if col not in df.columns]
+
+        df = df.drop(0)
+        df['STATUS']=""
+        df['scan_id'] = folder_name
+        if cols_ko :
+            df[cols_ko]=labels.errors["global.missing_column"]
+        logging.info("--- Read tsv file '{}' in : {} seconds ---".format(path, time.time() - start_time))
+        return df
+    except IOError as e:
+        df = pd.DataFrame(data={'scan_id': [folder_name], 'STATUS': labels.errors["global.missing_ecotaxa_table"]})
+        df[cols]= labels.errors["global.missing_ecotaxa_table"]   
+        logging.warning("{}".format(e))
+        return df
+
+def _typeTsv(df) :
+    """Convert the text columns of ecotaxa tables with few distinct values to categories, 
+    and their numeric columns to nullable numbers, eatch followed by its <col>_error column.
+    Empty cells take the STATUS of their row : "" in a read table"""
+    columns = {}
+    for col in df.columns :
+        values = df[col].values
+        if col in TSV_NUMERIC_COLS :
+            columns[col], columns[col + ERROR_SUFFIX] = numericColumn(values, TSV_NUMERIC_COLS[col])
+        elif col in TSV_CATEGORY_COLS :
+            columns[col] = categoryColumn(values)
+        else :
+            columns[col] = np.where(pd.isna(values), "", values)
+    return pd.DataFrame(columns, index=df.index)
+
+def categoryColumn(values) :
+    """Return the given text values as a categorical, missing values being "" """
+    codes, uniques = pd.factorize(values)
+    codes, uniques = _emptyMissing(codes, uniques)
+    return pd.Categorical.from_codes(codes, uniques)
+
+def numericColumn(values, dtype) :
+    """Return the given text values as a nullable numeric array of the given dtype ("Int64" or "Float64"), 
+    and the text of the values that are not numbers (NaN for the numbers, "" for the missing values) as a categorical. Only integral values are "Int64" numbers.
+    Eatch distinct value is parsed once."""
+    codes, uniques = pd.factorize(values)
+    numbers = pd.to_numeric(pd.Series(uniques, dtype=object), errors="coerce").astype(float).values
+    if dtype == "Int64" :
+        valid = np.isfinite(numbers) & (numbers == np.round(numbers)) & (np.abs(numbers) < 2**53)
+    else :
+        valid = ~np.isnan(numbers)
+    # code -1 (missing value) takes the appended last value : not a number
+    numbers = np.append(np.where(valid, numbers, np.nan), np.nan)[codes]
+    # Text of the values that are not numbers, code -1 for the numbers
+    text_codes = np.full(len(uniques), -1)
+    text_codes[~valid] = np.arange((~valid).sum())
+    text_codes, texts = _emptyMissing(np.append(text_codes, -2)[codes], uniques[~valid], missing=-2)
+    return pd.array(numbers, dtype=dtype), pd.Categorical.from_codes(text_codes, texts)
+
+def _emptyMissing(codes, uniques, missing=-1) :
+    """Give the missing values (missing code) of the given factorized values the code of "", added to the uniques if needed"""
+    is_missing = codes == missing
+    if is_missing.any() :
+        empty = np.flatnonzero(uniques == "")
+        if not len(empty) :
+            uniques, empty = np.append(uniques, ""), [len(uniques)]
+        codes = np.where(is_missing, empty[0], codes)
+    return codes, uniques
+
+def _distinctRows(first_row_only) :
+    """True if only the distinct rows of eatch ecotaxa table are kept : under a memory ceiling, when all the objects are read"""
+    return memory_limit > 0 and not first_row_only
+
+def _chunkRows(cols) :
+    """Number of objects of an ecotaxa table read at once, for the chunks read by the reading workers to take half of the memory ceiling"""
+    return max(1000, memory_limit * 2**20 // (2 * TSV_CELL_BYTES * (len(cols) + 2) * max(1, read_workers)))
+
+def peakMemory() :
+    """Return the peak resident memory of the current process in MB, None if unknown"""
+    if resource is None :
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return round(peak / 2**20 if sys.platform == "darwin" else peak / 2**10, 1)
+
+def reportMemory(subpath) :
+    """Log the peak memory of the process, with a warning if it is over the memory ceiling"""
+    peak = peakMemory()
+    logging.info("--- Peak memory after reading project '{}' : {} MB ---".format(subpath, peak))
+    if memory_limit > 0 and peak is not None and peak > memory_limit :
+        logging.warning("***** Peak memory of {} MB over the {} MB ceiling after reading project '{}'".format(peak, memory_limit, subpath))
+
 def  getHeader(subpath):
     """Read the two header tables for the given project. Return them as list of pandas dataframes"""
     header_files = []
@@ -163,72 +532,124 @@ def  getHeader(subpath):
         logging.warning("{}".format(e))
     return header_files
 
-def _recursive_folderstats(folderpath, items=None,
-                            depth=0, idx=1):
-    """Helper function that recursively collects folder statistics and returns current id, foldersize and number of files traversed."""
-    items = items if items is not None else []
+def _scandir_folderstats(folderpath, columns, depth=0, idx=1, scans_root=None, scan_entries=None, dirs=None):
+    """Helper function that recursively collects folder statistics in a single os.scandir pass per folder.
+    Files are appended to the given columns dictionary of lists. Returns current id, foldersize and number of files traversed.
+    If scans_root is given, the entries of this folder are appended to scan_entries and its sub folders are not walked.
+    If dirs is given, the path of eatch walked sub folder, empty or not, is appended to it."""
     foldersize, num_files = 0, 0
-    current_idx = idx
-
-    if os.access(folderpath, os.R_OK):
-        dirs = list(filter(lambda x: "DS_Store" not in x, os.listdir(folderpath)))
-        for f in dirs:
-
-            filepath = os.path.join(folderpath, f)
-            stats = os.stat(filepath)
-            foldersize += stats.st_size
-            idx += 1
-
-            if os.path.isdir(filepath):
-                idx, items, _foldersize, _num_files = _recursive_folderstats(filepath, items, depth + 1, idx)
-                foldersize += _foldersize
-                num_files += _num_files
-            else:
-                filename, extension = os.path.splitext(f)
-                extension = extension[1:] if extension else None
-                inside_name="None"
-
-                try :
-                    inside_name = ZipFile(filepath, 'r').namelist() if extension == "zip" else "None"
-                    inside_name = inside_name[0] if inside_name else "None"
-                except BadZipFile : 
-                    inside_name=labels.errors["global.bad_zip_file"]
-
-                item = [idx, filepath, filename, extension, stats.st_size,
-                        False, None, depth, inside_name]
-                items.append(item)
-                num_files += 1
-
-    stats = os.stat(folderpath)
-    foldername = os.path.basename(folderpath)
-    item = [current_idx, folderpath, foldername, None, foldersize,
-            True, num_files, depth, "None"]
-
-    return idx, items, foldersize, num_files
+
+    try :
+        entries = [e for e in os.scandir(folderpath) if "DS_Store" not in e.name]
+    except OSError :
+        # Unreadable folder : skipped, as it is not part of the project data
+        return idx, columns, foldersize, num_files
+
+    is_scans_root = scans_root is not None and os.path.normpath(folderpath) == scans_root
+    if is_scans_root :
+        scan_entries.extend(entries)
+
+    for entry in entries:
+        # DirEntry caches the stat result and the type given by the directory listing
+        stats = entry.stat()
+        foldersize += stats.st_size
+        idx += 1
+
+        if entry.is_dir():
+            if is_scans_root :
+                continue
+            if dirs is not None :
+                dirs.append(entry.path)
+            idx, columns, _foldersize, _num_files = _scandir_folderstats(entry.path, columns, depth + 1, idx, scans_root, scan_entries, dirs)
+            foldersize += _foldersize
+            num_files += _num_files
+        else:
+            filename, extension = os.path.splitext(entry.name)
+            extension = extension[1:] if extension else None
+
+            columns["id"].append(idx)
+            columns["path"].append(entry.path)
+            columns["name"].append(filename)
+            columns["extension"].append(extension)
+            columns["size"].append(stats.st_size)
+            columns["folder"].append(False)
+            columns["num_files"].append(None)
+            columns["depth"].append(depth)
+            columns["mtime"].append(stats.st_mtime_ns)
+            num_files += 1
+
+    return idx, columns, foldersize, num_files
 
 def getFileSystem(subpath):
     """Function that returns a Pandas dataframe from the folders and files from a selected folder."""
-    columns = ['id', 'path', 'name', 'extension', 'size',
-               'folder', 'num_files', 'depth', "inside_name"]
     path = base_path+subpath
-    idx, items, foldersize, num_files = _recursive_folderstats(path)
-    df = pd.DataFrame(items, columns=columns)
+    idx, data, foldersize, num_files = _scandir_folderstats(path, {col : [] for col in FS_COLUMNS})
+    df = pd.DataFrame(data, columns=FS_COLUMNS)
     return df
 
+@lru_cache(maxsize=65536)
+def _zip_inside_name(path, mtime, size):
+    """Return the name of the first file inside the given zip. Memoized by path, modification time and size : an unchanged archive is never reopened."""
+    try :
+        # Only the end of archive record and the central directory are read, members are not decompressed
+        with ZipFile(path, 'r') as zip_file :
+            names = zip_file.namelist()
+        return names[0] if names else "None"
+    except BadZipFile :
+        return labels.errors["global.bad_zip_file"]
+
+def getInsideName(fs):
+    """Return the inside_name of the given fs rows : the name of the first file inside each zip, "None" for other files. Zip files are only opened here, on demand."""
+    inside_name = pd.Series("None", index=fs.index, dtype=object)
+    zips = fs["extension"].values == "zip"
+    inside_name[zips] = [_zip_inside_name(path, *_zip_stats(path)) for path in fs["path"].values[zips]]
+    return inside_name
+
+def _zip_stats(path):
+    """Return the modification time and size of the given zip, stated again : the fs values may be older than the file (cached or incremental fs)"""
+    try :
+        stats = os.stat(path)
+        return stats.st_mtime_ns, stats.st_size
+    except OSError :
+        # Removed since the file system was indexed : not memoized, ZipFile raises as before
+        return None, None
+
 def listFolder(path) :
     """List folder for the given path"""
     dirs = list(filter(lambda x: "DS_Store" not in x, os.listdir(path)))
     return dirs
 
 def tsvToGlobalData(tsv_files) : 
-    """Generate from tsv a common structure of dataframe"""
-    dataframe = pd.concat(tsv_files)
-    for col in dataframe.columns :
-        dataframe[col].fillna(dataframe.STATUS, inplace=True)
+    """Generate from tsv a common structure of dataframe : typed tables (see _typeTsv) of all the scans, with their fraction"""
+    dataframe = concatTsv(tsv_files)
+    # Fraction of eatch scan, parsed once for all the checks
+    dataframe["fracID"], dataframe["frac_index"] = fracColumns(dataframe["scan_id"])
     #     #JCE DO NOT PUSH
     # dataframe.to_csv("export_dataframe.csv", index = False, header=True)
     return dataframe
 
+def concatTsv(tsv_files) :
+    """Concatenate typed tables (see _typeTsv), the categories of their category columns are merged : sorted, only the used ones"""
+    # Categories that differ from one table to another would be concatenated as text : their categories are merged instead
+    columns = pd.concat([df.iloc[:0] for df in tsv_files]).columns
+    category_cols = [col for col in TSV_CATEGORY_COLS + [col + ERROR_SUFFIX for col in TSV_NUMERIC_COLS] if all(col in df.columns for df in tsv_files)]
+    dataframe = pd.concat([df.drop(columns=category_cols) for df in tsv_files])
+    for col in category_cols :
+        dataframe[col] = union_categoricals([pd.Categorical(df[col]) for df in tsv_files], sort_categories=True).remove_unused_categories()
+    return dataframe[columns]
+
+def fracColumns(scan_ids) :
+    """Return the fracID (categorical : _dN_, _tot_, _plankton_ or FRAC_TYPE_NOT_HANDLED) and the frac_index (N of the _dN_ fractions, nullable int) of the given scan ids.
+    Eatch distinct scan id is parsed once."""
+    codes, uniques = pd.factorize(scan_ids)
+    parsed = pd.Series(uniques, dtype=object).str.extract(FRAC_ID)
+    frac_id = parsed[0].fillna(parsed[2]).fillna(parsed[3]).fillna(FRAC_TYPE_NOT_HANDLED)
+    frac_index = pd.to_numeric(parsed[1]).astype("Int64")
+    # code -1 (missing scan id) takes the appended last value
+    frac_id = np.append(frac_id.values, FRAC_TYPE_NOT_HANDLED)[codes]
+    frac_index = pd.concat([frac_index, pd.Series([pd.NA], dtype="Int64")], ignore_index=True).values[codes]
+    return pd.Categorical(frac_id), pd.array(frac_index, dtype="Int64")
+
 def headerToGlobalData(header_files) : 
     """Generate from header a common structure of dataframe"""
     dataframe = pd.concat(header_files)
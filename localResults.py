@@ -0,0 +1,68 @@
+import os
+import uuid
+import logging
+import diskcache
+
+# The results of the QC runs are kept server side in this disk cache, under a run id (QC_RESULTS_CACHE_PATH to change it)
+try :
+    results_path = os.environ['QC_RESULTS_CACHE_PATH']
+except :
+    results_path = "cache/results"
+# Number of seconds a run is kept, 0 for ever (QC_RESULTS_EXPIRE)
+try :
+    results_expire = int(os.environ['QC_RESULTS_EXPIRE'])
+except :
+    results_expire = 7 * 24 * 3600
+
+_cache = None
+
+def _results():
+    """Return the disk cache of the results, opened once by process : it is shared by the app and its background jobs"""
+    global _cache
+    if _cache is None or _cache.directory != os.path.abspath(results_path) :
+        _cache = diskcache.Cache(os.path.abspath(results_path))
+    return _cache
+
+def save(pdfs_data, layout=None):
+    """Keep the given pdf data of the projects of a run (see Block.runCallback), one entry by project, and the dash layout of its result. 
+    Return the id of the run"""
+    run_id = uuid.uuid4().hex
+    results = _results()
+    expire = results_expire or None
+    projects = []
+    for i, data in enumerate(pdfs_data) :
+        results.set((run_id, i), data, expire=expire)
+        projects.append(data["project"])
+    results.set((run_id, "layout"), layout, expire=expire)
+    # Written last : a run is complete once its list of projects is known
+    results.set(run_id, projects, expire=expire)
+    logging.info("--- results of run {} saved : {} projects ---".format(run_id, len(projects)))
+    return run_id
+
+def exists(run_id):
+    """Return True if the results of the given run are still kept"""
+    return run_id in _results()
+
+def project_names(run_id):
+    """Return the names of the projects of the given run. Raise KeyError if the run is unknown or expired"""
+    return _results()[run_id]
+
+def layout(run_id):
+    """Return the dash layout of the result of the given run. Raise KeyError if the run is unknown or expired"""
+    results = _results()
+    # The run is checked first : its layout is written before it is complete
+    results[run_id]
+    return results[(run_id, "layout")]
+
+def projects(run_id):
+    """Yield the pdf data of eatch project of the given run, read one at a time. Raise KeyError if the run is unknown or expired"""
+    results = _results()
+    for i in range(len(results[run_id])) :
+        yield results[(run_id, i)]
+
+def table(run_id, project, sub_block, figure):
+    """Return the result dataframe of the given figure (index) of a sub block (index) of a project of the given run. 
+    Raise KeyError if the run is unknown or expired"""
+    results = _results()
+    data = results[(run_id, results[run_id].index(project))]
+    return data["subBlocks"][sub_block]["data"][figure]["dataframe"]
@@ -1,11 +1,12 @@
-import json
+import logging
 from dash import html, ctx
 from dash.dcc.Tab import Tab
-from dash.dependencies import Input, Output, State
+from dash.dependencies import Input, Output, State, MATCH
 from dash.exceptions import PreventUpdate
 
 from app import app
 import localData as ad
+import localResults
 import componants
 import libQC_zooscan
 import pdf_generator
@@ -66,32 +67,50 @@ def render_content_before_scan(tab, click_run, projects, drive):
 
 # during_analysis Tabs related callbacks ##
 
-@app.callback([Output('tabs-content-during_analysis', 'children'), Output("runQC-btn-during_analysis", 'n_clicks'), Output("tabs-during_analysis", 'value'), Output('intermediate-value-during_analysis', 'data'),Output("saveQC-btn-during_analysis", 'hidden')],
-              [Input("tabs-during_analysis", 'value'), Input("runQC-btn-during_analysis", 'n_clicks'), Input('app-1-dropdown-projects', "value")],
-              [State('app-1-dropdown-drives', 'value')], prevent_initial_call=True)
-def render_content_during_analysis(tab, click_run, projects, drive):
-    if not click_run:
-        if tab == 'tab-details-during_analysis':
-            return componants.generate_details(checksBlocks[1]), 0, tab, None, True
-        elif tab == 'tab-result-during_analysis':
-            return componants.generate_result(componants.emptyResult("during_analysis", projects)), 0, tab, None, True
-        else:
-            return [], 0, tab, None, True
+@app.callback([Output('tabs-content-during_analysis', 'children'), Output("tabs-during_analysis", 'value'), Output('intermediate-value-during_analysis', 'data'),Output("saveQC-btn-during_analysis", 'hidden')],
+              [Input("tabs-during_analysis", 'value'), Input('result-during_analysis', 'data'), Input('app-1-dropdown-projects', "value")], prevent_initial_call=True)
+def render_content_during_analysis(tab, run_id, projects):
+    # A background QC run just ended : show its result, built on the server from the results of the run
+    if ctx.triggered_id == 'result-during_analysis' and run_id:
+        if not localResults.exists(run_id):
+            logging.warning("***** results of run {} expired, they can't be shown".format(run_id))
+            return componants.generate_result(componants.emptyResult("during_analysis", projects or [])), 'tab-result-during_analysis', None, True
+        has_projects = len(localResults.project_names(run_id)) > 0
+        return componants.generate_result(localResults.layout(run_id)), 'tab-result-during_analysis', run_id if has_projects else None, not has_projects
+    if tab == 'tab-details-during_analysis':
+        return componants.generate_details(checksBlocks[1]), tab, None, True
+    elif tab == 'tab-result-during_analysis':
+        return componants.generate_result(componants.emptyResult("during_analysis", projects)), tab, None, True
     else:
-        if len(projects) > 0:
-            QC_execution = lib_qc_zooscan.runCallback(projects, drive, "during_analysis")
-            jstr = json.dumps(QC_execution["pdf"] , default=lambda df: json.loads(df.to_json()))
-            return componants.generate_result(QC_execution["dash"]), 0, 'tab-result-during_analysis', jstr, False
-
-    return componants.generate_result(componants.emptyResult("during_analysis", projects)), 0, 'tab-result-during_analysis', None, True
+        return [], tab, None, True
+
+@app.long_callback(Output('result-during_analysis', 'data'),
+                   Input("runQC-btn-during_analysis", 'n_clicks'),
+                   [State('app-1-dropdown-projects', "value"), State('app-1-dropdown-drives', 'value')],
+                   running=[(Output("runQC-btn-during_analysis", 'hidden'), True, False),
+                            (Output("cancelQC-btn-during_analysis", 'hidden'), False, True),
+                            (Output("progressQC-bar-during_analysis", 'hidden'), False, True)],
+                   cancel=[Input("cancelQC-btn-during_analysis", 'n_clicks')],
+                   progress=[Output("progressQC-bar-during_analysis", 'value'), Output("progressQC-bar-during_analysis", 'max'), Output("progressQC-label-during_analysis", 'children')],
+                   progress_default=[None, None, ""],
+                   prevent_initial_call=True)
+def run_during_analysis(set_progress, click_run, projects, drive):
+    """Run the during analysis QCs of the selected projects as a background job, the page polls its progress and result"""
+    if not click_run or not projects:
+        return localResults.save([], componants.emptyResult("during_analysis", projects or []))
+    set_progress(("0", "1", "Reading data of " + ", ".join(projects)))
+    QC_execution = lib_qc_zooscan.runCallback(projects, drive, "during_analysis",
+                                              lambda done, total, step : set_progress((str(done), str(total), "{}/{} {}".format(done, total, step))))
+    # The results and their layout stay on the server : the page only gets the id of the run
+    return localResults.save(QC_execution["pdf"], QC_execution["dash"])
 
 @app.callback(Output("saveQC-btn-during_analysis", 'n_clicks'),
               [Input("saveQC-btn-during_analysis", 'n_clicks'), Input('intermediate-value-during_analysis', 'data')],
                prevent_initial_call=True)
-def save_report(click_save_pdf, jsonified_pdf_data):
+def save_report(click_save_pdf, run_id):
     
     # if missing infos
-    if click_save_pdf == 0 or not jsonified_pdf_data:
+    if click_save_pdf == 0 or not run_id:
         return 0
     if ctx.triggered_id == 'intermediate-value-during_analysis':
         return 0
@@ -100,10 +119,25 @@ def save_report(click_save_pdf, jsonified_pdf_data):
         return click_save_pdf
     # if everything is ok for save : save
     else :
-        pdf_data = json.loads(jsonified_pdf_data)
-        pdf_generator.generate(pdf_data)
+        if not localResults.exists(run_id):
+            logging.warning("***** results of run {} expired, the pdf reports can't be saved".format(run_id))
+            return 0
+        # The reports are written one project after another, as they are read from the server side results
+        pdf_generator.generate(localResults.projects(run_id))
         return click_save_pdf
 
+# Large result tables : only their visible page, filtered and sorted from the server side results, is sent to the page
+paged_table = {"type" : "result-table-paged", "project" : MATCH, "sub_block" : MATCH, "figure" : MATCH}
+
+@app.callback([Output(paged_table, 'data'), Output(paged_table, 'page_count')],
+              [Input(paged_table, 'page_current'), Input(paged_table, 'page_size'), Input(paged_table, 'sort_by'), Input(paged_table, 'filter_query')],
+              [State(paged_table, 'id'), State('intermediate-value-during_analysis', 'data')], prevent_initial_call=True)
+def page_result_table(page_current, page_size, sort_by, filter_query, table_id, run_id):
+    if not run_id or not localResults.exists(run_id):
+        raise PreventUpdate
+    dataframe = localResults.table(run_id, table_id["project"], table_id["sub_block"], table_id["figure"])
+    return componants.table_page(dataframe, page_current or 0, page_size, sort_by, filter_query)
+
 ## after_ecotaxa_classif Tabs related callbacks ##
 
 @app.callback([Output('tabs-content-after_ecotaxa_classif', 'children'), Output("runQC-btn-after_ecotaxa_classif", 'n_clicks'), Output('tabs-after_ecotaxa_classif', 'value')],
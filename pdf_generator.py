@@ -1,12 +1,34 @@
 # coding: utf-8
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from datetime import datetime
-from fpdf import FPDF
-import pandas as pd
+from fpdf import FPDF, FPDF_VERSION
+from fpdf.fpdf import SubsetMap
 
 from enums import SUPPORTED_DATA_COMPONANT
 import localData
 
 SPACING = 1
+# Fonts of the reports : family, style and TrueType file
+FONTS = [('ArialUnicode', '', 'assets/fonts/Arial-Unicode-Regular.ttf'), 
+         ('ArialUnicode', 'B', 'assets/fonts/Arial-Unicode-Bold.ttf')]
+# Number of texts whose lines are kept by font and column width, the cache is emptied when it is full
+LINES_CACHE_SIZE = 100000
+
+# Width of eatch glyph by font, and lines of eatch text by font and column width : tables repeat the same labels on thousands of rows
+_glyph_widths = {}
+_cell_lines = {}
+# Fonts parsed by this process, shared by all its reports : {font file : (font, font file description)}
+_fonts = {}
+# add_report_fonts copies the font entries that FPDF.add_font writes in this version of fpdf2 (requirements.txt), 
+# other versions parse the fonts for eatch report
+FONTS_CACHE_FPDF_VERSION = "2.5.4"
+
+# Number of project reports written at the same time, in a pool of processes (1 to write them one after another)
+try :
+    pdf_workers = int(os.environ['QC_PDF_WORKERS'])
+except :
+    pdf_workers = min(4, os.cpu_count() or 1)
 
 
 def set_font_size(pdf, weight, size):
@@ -35,16 +57,11 @@ def write_multiline_datatable(pdf, df):
     col_width = pdf.epw /10#(len(df.head())+4)
     pdf.ln(pdf.font_size * 1.5*SPACING)
     
-    write_multiline_row_headers(df.head(), pdf, col_width)
-
-    # for row in data
-    for i in df.index :
-        row=[]
-        # Get row content
-        for index in df.head() :
-            if index!="index" :
-                row.append(str(df[index][i]))
-        write_multiline_row_content(row, pdf, col_width)
+    write_multiline_row_headers(df.columns, pdf, col_width)
+
+    # Rows are rendered as they are read, without copying the table
+    for row in df.itertuples(index=False, name=None) :
+        write_multiline_row_content([str(value) for value in row], pdf, col_width)
            
     return
     
@@ -68,36 +85,58 @@ def write_multiline_row_content(row, pdf, col_width):
     write_multiline_row(row, pdf, line_height, col_width)
 
 def write_multiline_row(row, pdf, line_height, col_width):
-    row_height_lines = 1
-    lines_in_row = []
+    lines_in_row = [split_cell_text(pdf, datum, col_width) for datum in row]
     # determine height of highest cell in the row
-    for datum in row: 
-        output = pdf.multi_cell(col_width, line_height, datum, border=1, ln=3, split_only=True)
-        lines_in_row.append(len(output))
-        if len(output) > row_height_lines:
-            row_height_lines = len(output)
+    row_height_lines = max([1] + [len(lines) for lines in lines_in_row])
 
     if pdf.will_page_break(row_height_lines * line_height):
             pdf.add_page()
-    for tlines , datum in zip(lines_in_row, row):
-        # Adjust text
-        text =datum.rstrip('\n') + (1 + row_height_lines - tlines) * '\n'
-
+    for lines, datum in zip(lines_in_row, row):
         # Set error label color to red
-        if text.startswith("#") :
+        if datum.startswith("#") :
             pdf.set_text_color(237, 67, 55)
-            pdf.multi_cell(col_width, line_height, text, border=1, ln=3)
+        # Frame the cell at the row height, and write its lines without splitting its text again
+        x, y = pdf.x, pdf.y
+        pdf.rect(x, y, col_width, row_height_lines * line_height)
+        for i, line in enumerate(lines) :
+            if line :
+                pdf.set_xy(x, y + i * line_height)
+                pdf.cell(col_width, line_height, line)
+        pdf.set_xy(x + col_width, y)
+        if datum.startswith("#") :
             pdf.set_text_color(51, 51, 51)
-        else :
-            pdf.multi_cell(col_width, line_height, text, border=1, ln=3)
 
     pdf.ln(row_height_lines * line_height)
 
+def split_cell_text(pdf, text, col_width):
+    """Return the lines of the given text in a cell of the given width with the current font, as multi_cell splits it. 
+    A text without line break that fits in the cell is not split"""
+    key = (pdf.font_family, pdf.font_style, pdf.font_size_pt, col_width, text)
+    lines = _cell_lines.get(key)
+    if lines is None :
+        if not any(char in text for char in "\n\r\u00ad") and get_text_width(pdf, text) < col_width - 2 * pdf.c_margin :
+            lines = (text,)
+        else :
+            lines = tuple(pdf.multi_cell(col_width, pdf.font_size, text, split_only=True))
+        if len(_cell_lines) >= LINES_CACHE_SIZE :
+            _cell_lines.clear()
+        _cell_lines[key] = lines
+    return lines
+
+def get_text_width(pdf, text):
+    """Return the width of a one line text with the current font, from the cached width of eatch of its glyphs"""
+    widths = _glyph_widths.setdefault((pdf.font_family, pdf.font_style, pdf.font_size_pt), {})
+    width = 0
+    for char in text :
+        if char not in widths :
+            widths[char] = pdf.get_string_width(char)
+        width += widths[char]
+    return width
+
 def create_pdf_report_for_project(project):
     pdf = FPDF('L','mm', 'A4')
     ## https://github.com/reingart/pyfpdf/issues/86
-    pdf.add_font('ArialUnicode',fname='assets/fonts/Arial-Unicode-Regular.ttf',uni=True)
-    pdf.add_font('ArialUnicode', style='B', fname='assets/fonts/Arial-Unicode-Bold.ttf',uni=True)
+    add_report_fonts(pdf)
     set_font_size(pdf, '', 12)
     pdf.set_text_color(51, 51, 51)
     ##
@@ -105,23 +144,55 @@ def create_pdf_report_for_project(project):
     write_title(pdf, project)
     return pdf
 
+def add_report_fonts(pdf):
+    """Add the report fonts to the given pdf. Eatch font file is parsed once by process, the following reports share its metrics.
+    The shared fonts are only used with fpdf2 FONTS_CACHE_FPDF_VERSION : they rely on the private font entries of FPDF.add_font"""
+    for family, style, fname in FONTS :
+        fontkey = family.lower() + style
+        if FPDF_VERSION != FONTS_CACHE_FPDF_VERSION :
+            pdf.add_font(family, style=style, fname=fname)
+        elif fname not in _fonts :
+            pdf.add_font(family, style=style, fname=fname)
+            _fonts[fname] = (dict(pdf.fonts[fontkey]), dict(pdf.font_files[fontkey]))
+        else :
+            font, font_file = _fonts[fname]
+            # Only the characters used by a report are embedded in it : eatch report has its own subset, as in FPDF.add_font
+            subset = "\x00 " + ("0123456789" + pdf.str_alias_nb_pages if pdf.str_alias_nb_pages else "")
+            pdf.fonts[fontkey] = dict(font, i=len(pdf.fonts) + 1, subset=SubsetMap(map(ord, subset)))
+            pdf.font_files[fontkey] = dict(font_file)
+
 def add_sub_block_execution(pdf, title, data):
     """Save an execution as html (or pdf)"""
     write_sub_title(pdf, title)
 
     for result in data:
         if result["type"] == SUPPORTED_DATA_COMPONANT.DATA_TABLE or result["type"] == SUPPORTED_DATA_COMPONANT.DATA_TABLE_XS:
-            df = pd.DataFrame.from_dict(result["dataframe"]).reset_index()  # make sure indexes pair with number of rows
-            write_multiline_datatable(pdf, df)
+            write_multiline_datatable(pdf, result["dataframe"])
 
 def save_pdf(pdf, path, title):
     localData.saveQcExecution(pdf, path, title)
 
 def generate(pdfs_data):
-    for data in pdfs_data :
-        print(data)
-        if len(data["subBlocks"]) > 0 :
-            pdf = create_pdf_report_for_project(data["project"])
-            for subBlock in data["subBlocks"] :
-                add_sub_block_execution(pdf, subBlock["title"], subBlock["data"])
-            save_pdf(pdf, data["path"], data["title"])
+    """Write the pdf report of eatch project of the given pdf data, that can be read one project at a time (see localResults.projects).
+    pdf_workers reports are written at the same time in separate processes, the projects being read as the workers need them"""
+    if pdf_workers <= 1 :
+        for data in pdfs_data :
+            generate_project(data)
+        return
+    with ProcessPoolExecutor(max_workers=pdf_workers) as executor :
+        running = set()
+        for data in pdfs_data :
+            # At most two projects waiting by worker
+            if len(running) >= 2 * pdf_workers :
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                [future.result() for future in done]
+            running.add(executor.submit(generate_project, data))
+        [future.result() for future in running]
+
+def generate_project(data):
+    """Write the pdf report of one project, if its QC ran"""
+    if len(data["subBlocks"]) > 0 :
+        pdf = create_pdf_report_for_project(data["project"])
+        for subBlock in data["subBlocks"] :
+            add_sub_block_execution(pdf, subBlock["title"], subBlock["data"])
+        save_pdf(pdf, data["path"], data["title"])
@@ -0,0 +1,131 @@
+"""Run the quality checks without the Dash UI, on every Zooscan_ project of one or more drives, and write their results as tables.
+
+Usage (from the repository root, DASH_ENV=PROD to read /piqv/plankton/) :
+    python qc_batch.py --output reports/                                    # during analysis QCs of all the zooscan_ drives, as csv
+    python qc_batch.py zooscan_lov zooscan_embrc --format parquet json --pdf --output reports/
+    python qc_batch.py zooscan_lov --projects "Zooscan_apero*" --workers 8 --output reports/
+
+Written tables, one file by table and format in the output folder :
+    results  : one row by project, check and table row (drive, project, block, sub_block, figure, row, check, value),
+               row is the first column of the result table : the scan id, or the checked value for the spelling table
+    projects : one row by project and block, with the error that stopped its QC if any and the peak memory of the process that ran it
+    timings  : execution time of eatch check
+The exit code is 1 if the QC or the pdf report of a project could not be done, 0 otherwise.
+"""
+import argparse
+import fnmatch
+import logging
+import os
+import sys
+
+import pandas as pd
+
+import libQC_classes
+import libQC_zooscan
+import localData
+import pdf_generator
+
+FORMATS = ["csv", "json", "parquet"]
+RESULT_COLS = ["drive", "project", "block", "sub_block", "figure", "row", "check", "value"]
+
+
+def parse_args(argv, block_ids):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("drives", nargs="*", help="drives to check, relative to localData.base_path (all the zooscan_ drives if not given)")
+    parser.add_argument("--blocks", nargs="+", choices=block_ids, default=["during_analysis"], help="blocks of checks to run")
+    parser.add_argument("--projects", nargs="+", default=[], help="only check the projects matching one of these patterns (Zooscan_apero*)")
+    parser.add_argument("--output", required=True, help="folder of the written tables")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["csv"], dest="formats")
+    parser.add_argument("--pdf", action="store_true", help="also write the pdf report of eatch project in its Zooscan_reports folder")
+    parser.add_argument("--workers", type=int, help="number of projects checked at the same time (QC_PROJECT_WORKERS by default)")
+    args = parser.parse_args(argv)
+    if "parquet" in args.formats :
+        # Fail before the run rather than after it
+        try :
+            pd.io.parquet.get_engine("auto")
+        except ImportError as e:
+            parser.error(str(e))
+    return args
+
+
+def list_projects(drive, patterns):
+    """Return the readable Zooscan_ projects of a drive, matching one of the patterns if any"""
+    return [project["label"] for project in localData.getProjects(drive)
+            if not project["disabled"] and (not patterns or any(fnmatch.fnmatch(project["label"], pattern) for pattern in patterns))]
+
+
+def result_rows(drive, project, block, pdf):
+    """Return the results of a project as a long table : one row by check and result table row"""
+    frames = []
+    for sub_block, sub_block_id in zip(pdf["subBlocks"], [subBlock.id for subBlock in block.subBlocks]):
+        for figure, result in enumerate(sub_block["data"], 1):
+            df = result["dataframe"]
+            df = df.melt(id_vars=[df.columns[0]], var_name="check", value_name="value").rename(columns={df.columns[0] : "row"})
+            df.insert(0, "figure", figure)
+            df.insert(0, "sub_block", sub_block_id)
+            frames.append(df)
+    if not frames :
+        return pd.DataFrame(columns=RESULT_COLS)
+    rows = pd.concat(frames, ignore_index=True)
+    rows.insert(0, "block", block.id)
+    rows.insert(0, "project", project)
+    rows.insert(0, "drive", drive)
+    # Labels, numbers and missing values in the same column : keep them as text
+    rows["value"] = [None if pd.isna(value) else str(value) for value in rows["value"].values]
+    return rows
+
+
+def write_table(df, output, name, formats):
+    for format in formats :
+        path = os.path.join(output, name + "." + format)
+        if format == "csv" :
+            df.to_csv(path, index=False)
+        elif format == "json" :
+            df.to_json(path, orient="records", indent=1)
+        else :
+            df.to_parquet(path, index=False)
+        print("written : " + path)
+
+
+def main(argv=None):
+    lib = libQC_zooscan.Lib_zooscan().lib
+    args = parse_args(argv, [block.id for block in lib.blocks])
+    if args.workers is not None :
+        libQC_classes.project_workers = args.workers
+    drives = args.drives or [drive["label"] for drive in localData.getDrives() if not drive["disabled"]]
+    os.makedirs(args.output, exist_ok=True)
+
+    results, projects_status, timings = [], [], []
+    failed = False
+    for drive in drives :
+        projects = list_projects(drive, args.projects)
+        for block_id in args.blocks :
+            block = lib.getBlock(block_id)
+            print("{} : {} projects, {} QCs".format(drive, len(projects), block.title))
+            logging.info("--- batch run of '{}' on drive '{}' ---".format(block_id, drive))
+            for project, (qcExecutionData, pdf) in zip(projects, block.runProjects(projects, drive)):
+                error = qcExecutionData if isinstance(qcExecutionData, str) else ""
+                rows = result_rows(drive, project, block, pdf)
+                results.append(rows)
+                timings += [dict(timing, drive=drive, project=project, block=block_id) for timing in pdf.get("timings", [])]
+                if args.pdf and not error :
+                    try :
+                        pdf_generator.generate_project(block.setPdfDestination(pdf, project, drive))
+                    except Exception as e:
+                        error = "The pdf report can't be written because of : " + str(e)
+                        logging.warning("***** batch pdf error for project '{}' : {}".format(project, e))
+                failed = failed or bool(error)
+                projects_status.append({"drive" : drive, "project" : project, "block" : block_id,
+                                        "status" : "error" if error else "ok", "message" : error,
+                                        "nb_scans" : rows.loc[rows["figure"] == 1, "row"].nunique(), "peak_memory_mb" : pdf.get("peak_memory_mb")})
+                print("  {:<40} {}".format(project, error or "ok"))
+
+    results = [rows for rows in results if len(rows)]
+    write_table(pd.concat(results, ignore_index=True) if results else pd.DataFrame(columns=RESULT_COLS), args.output, "results", args.formats)
+    write_table(pd.DataFrame(projects_status, columns=["drive", "project", "block", "status", "message", "nb_scans", "peak_memory_mb"]), args.output, "projects", args.formats)
+    write_table(pd.DataFrame(timings, columns=["drive", "project", "block", "sub_block", "check", "seconds", "status"]), args.output, "timings", args.formats)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())